@@ -3,6 +3,8 @@ Raid Metrics Extractor
 Extracts penetration depth, duration, engagement, and other metrics from tracked raid data
 """
 
+import os
+
 import numpy as np
 
 class RaidMetricsExtractor:
@@ -77,15 +79,13 @@ class RaidMetricsExtractor:
         """Maximum penetration depth in METERS"""
         if not positions:
             return 0.0
-        depths = [self.court.get_penetration_depth(pos) for pos in positions]
-        return float(max(depths))
+        return float(self.court.depths(positions).max())
     
     def avg_penetration_depth(self, positions):
         """Average penetration depth"""
         if not positions:
             return 0
-        depths = [self.court.get_penetration_depth(pos) for pos in positions]
-        return np.mean(depths)
+        return np.mean(self.court.depths(positions))
     
     def defender_engagement_count(self, raider_positions, defenders, threshold=80):
         """Count unique defenders engaged (within threshold distance)"""
@@ -108,7 +108,7 @@ class RaidMetricsExtractor:
         
         first_engage = float('inf')
         for def_positions in defenders.values():
-            if def_positions:
+            if len(def_positions) > 0:
                 first_engage = min(first_engage, def_positions[0][2])
         
         if first_engage == float('inf'):
@@ -164,3 +164,14 @@ class RaidMetricsExtractor:
             writer.writerows(raids_metrics)
         
         print(f"✅ Exported {len(raids_metrics)} raids to {output_path}")
+    
+    def append_to_csv(self, raid_metrics, output_path):
+        """Append one raid to a CSV, writing the header if the file is new"""
+        import csv
+        
+        new_file = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        with open(output_path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=raid_metrics.keys())
+            if new_file:
+                writer.writeheader()
+            writer.writerow(raid_metrics)
@@ -0,0 +1,282 @@
+"""
+Benchmark Cases
+Court geometry, raid metrics, profiling, ranking and UI data loading on generated inputs
+"""
+
+import csv
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmarks.harness import Benchmark, SkipBenchmark
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UI_DIR = os.path.join(ROOT_DIR, "src", "ui")
+
+FRAME_SIZE = (1920, 1080)
+FPS = 30.0
+
+# Input sizes
+POINTS = 10_000
+SCALAR_POINTS = 1_000
+LONG_RAID_FRAMES = 300      # 10 s raid
+HISTORY_FRAMES = 30         # RaidParams.history: what extraction hands to the metrics
+DEFENDERS = 7
+PROFILE_RAIDS = 20_000
+LEAGUE_PLAYERS = 10_000
+UI_LEAGUE = {'teams': 50, 'players_per_team': 7, 'matches': 10, 'raids_per_match': 12}
+TABLE_LEAGUE = {'teams': 30, 'players_per_team': 7, 'matches': 3, 'raids_per_match': 12}
+
+LEAGUE_FIELDS = ['match_id', 'player_id', 'raid_duration_sec', 'penetration_px', 'success', 'raid_points']
+
+
+def synthetic_court(rasters=False):
+    """SimplifiedCourtDynamics of the synthetic match court at FRAME_SIZE, so no play_area.json entry is needed"""
+    from court.simplified_court import CourtRaster, SimplifiedCourtDynamics
+    from synthetic.match import SyntheticMatch
+    
+    width, height = FRAME_SIZE
+    court = SimplifiedCourtDynamics(**SyntheticMatch(width, height, FPS, raids=0).court_config())
+    if rasters:
+        # Built in memory: nothing is written to config/court_rasters
+        court.raster = CourtRaster.build(court, (height, width))
+    return court
+
+
+def frame_points(n, seed=0):
+    width, height = FRAME_SIZE
+    rng = np.random.default_rng(seed)
+    return np.stack([rng.uniform(0, width, n), rng.uniform(0, height, n)], axis=1).astype(np.int64)
+
+
+def raid_track(court, frames, start_frame=1, seed=0):
+    """(frames, 3) int32 x, y, frame_count of a raider running to the bonus line and back, like a track view"""
+    rng = np.random.default_rng(seed)
+    mid = court.mid_center
+    reach = court.depth_vector * (court.bonus_depth + 0.5) / court.END_DISTANCE
+    phase = np.sin(np.linspace(0, np.pi, frames))
+    xy = mid + phase[:, None] * reach + rng.normal(0, 8, (frames, 2))
+    frame_counts = np.arange(start_frame, start_frame + frames)
+    return np.column_stack([xy, frame_counts]).astype(np.int32)
+
+
+def defender_tracks(court, raider, count, seed=1):
+    """Defender tracks over the raider's frames; only the first stays close enough to engage"""
+    rng = np.random.default_rng(seed)
+    defenders = {}
+    for d in range(count):
+        offset = np.array([60.0, 0.0]) if d == 0 else rng.uniform(300, 600, 2)
+        xy = raider[:, :2] + offset + rng.normal(0, 5, (len(raider), 2))
+        defenders[100 + d] = np.column_stack([xy, raider[:, 2]]).astype(np.int32)
+    return defenders
+
+
+def league_rows(teams, players_per_team, matches, raids_per_match, seed=0):
+    """Raid rows in the layout of data/synthetic/synthetic_data.csv (see scripts/generate_synthetic_data.py)"""
+    rng = random.Random(seed)
+    rows = []
+    for t in range(teams):
+        for p in range(1, players_per_team + 1):
+            player = f"Team{t + 1}_P{p}"
+            for m in range(matches):
+                for _ in range(raids_per_match):
+                    success = rng.choices([0, 1], weights=[40, 60])[0]
+                    rows.append({
+                        'match_id': f"M{t * matches + m + 1}",
+                        'player_id': player,
+                        'raid_duration_sec': round(rng.uniform(10.0, 25.0), 1),
+                        'penetration_px': float(rng.randint(80, 220)),
+                        'success': success,
+                        'raid_points': rng.choices([1, 2, 3], weights=[60, 30, 10])[0] if success else 0
+                    })
+    return rows
+
+
+def profile_raids(n, seed=0):
+    rng = random.Random(seed)
+    return [{'duration': rng.uniform(2.5, 25.0), 'penetration': rng.uniform(0.5, 5.5),
+             'success': rng.random() < 0.6, 'points': rng.choice([0, 1, 2, 3])} for _ in range(n)]
+
+
+def league_profiles(n, seed=0):
+    from analytics.profiling import build_raider_profile
+    
+    rng = random.Random(seed)
+    profiles = {}
+    for i in range(n):
+        raids = profile_raids(rng.randint(5, 40), seed=seed + i)
+        profiles[f"P{i + 1}"] = build_raider_profile(raids, raids)
+    return profiles
+
+
+def league_rankings(rows):
+    """player_stats and final ranking of league rows, as KabaddiAnalyticsApp.update_rankings builds them"""
+    from analytics.profiling import build_raider_profile
+    from analytics.ranking import assign_ranks, rank_players
+    
+    by_player = {}
+    for row in rows:
+        by_player.setdefault(row['player_id'], []).append({
+            'duration': row['raid_duration_sec'], 'penetration': row['penetration_px'],
+            'success': bool(row['success']), 'points': row['raid_points']})
+    player_stats = {pid: build_raider_profile(raids, raids) for pid, raids in by_player.items()}
+    return player_stats, assign_ranks(rank_players(player_stats))
+
+
+# ----- court geometry -----
+
+def _court_call(method, rasters):
+    def setup():
+        court = synthetic_court(rasters)
+        points = frame_points(POINTS)
+        call = getattr(court, method)
+        return (lambda: call(points)), None
+    return setup
+
+
+def _court_point_queries(rasters):
+    def setup():
+        court = synthetic_court(rasters)
+        points = [tuple(p) for p in frame_points(SCALAR_POINTS).tolist()]
+        
+        def run():
+            for point in points:
+                court.get_penetration_depth(point)
+                court.is_inside_play_box(point)
+        return run, None
+    return setup
+
+
+def _court_raid_path():
+    court = synthetic_court()
+    positions = [tuple(p) for p in raid_track(court, LONG_RAID_FRAMES)[:, :2].tolist()]
+    return (lambda: court.analyze_raid_path(positions)), None
+
+
+# ----- raid metrics -----
+
+def _raid_metrics(frames):
+    def setup():
+        from analytics.raid_extractor import RaidMetricsExtractor
+        
+        court = synthetic_court(rasters=True)
+        extractor = RaidMetricsExtractor(court, FPS)
+        raider = raid_track(court, frames)
+        raid = {'raider_id': 1, 'start_frame': 1, 'end_frame': frames, 'positions': raider,
+                'defenders': defender_tracks(court, raider, DEFENDERS), 'returned_to_baseline': True,
+                'crossed_baulk': True, 'crossed_bonus': True}
+        return (lambda: extractor.extract_raid_metrics(raid)), None
+    return setup
+
+
+# ----- profiling and ranking -----
+
+def _build_raider_profile():
+    from analytics.profiling import build_raider_profile
+    
+    raids = profile_raids(PROFILE_RAIDS)
+    return (lambda: build_raider_profile(raids, raids)), None
+
+
+def _rank_players():
+    from analytics.ranking import rank_players
+    
+    profiles = league_profiles(LEAGUE_PLAYERS)
+    return (lambda: rank_players(profiles)), None
+
+
+def _assign_ranks():
+    from analytics.ranking import assign_ranks, rank_players
+    
+    ranking = rank_players(league_profiles(LEAGUE_PLAYERS))
+    return (lambda: assign_ranks(ranking)), None
+
+
+# ----- UI data -----
+
+def _load_data():
+    if UI_DIR not in sys.path:
+        sys.path.append(UI_DIR)
+    from kabaddi_ui_clean import KabaddiAnalyticsApp
+    
+    directory = tempfile.mkdtemp(prefix="kabaddi_bench_")
+    csv_path = os.path.join(directory, "league.csv")
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=LEAGUE_FIELDS)
+        writer.writeheader()
+        writer.writerows(league_rows(**UI_LEAGUE))
+    
+    # Only the data side of the app: no window is created
+    app = KabaddiAnalyticsApp.__new__(KabaddiAnalyticsApp)
+    return (lambda: app.load_data(csv_path)), (lambda: shutil.rmtree(directory, ignore_errors=True))
+
+
+def _populate_table():
+    import tkinter as tk
+    
+    if UI_DIR not in sys.path:
+        sys.path.append(UI_DIR)
+    from player_table import PlayerTable
+    
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        raise SkipBenchmark(f"no display ({e})")
+    root.withdraw()
+    
+    rows = league_rows(**TABLE_LEAGUE)
+    player_stats, final_ranking = league_rankings(rows)
+    columns = ('Rank', 'Player', 'Score', 'Success Rate', 'Avg Penetration', 'Avg Duration',
+               'Total Points', 'Total Raids', 'Avg Points', 'Matches')
+    table = PlayerTable(tk.Frame(root), columns, None, player_stats, rows, final_ranking, lambda *args: None)
+    return table.populate, root.destroy
+
+
+def _league_size(league):
+    players = league['teams'] * league['players_per_team']
+    return {'players': players, 'rows': players * league['matches'] * league['raids_per_match']}
+
+
+CASES = [
+    Benchmark('court.depths', "SimplifiedCourtDynamics.depths, computed", _court_call('depths', False),
+              {'points': POINTS}),
+    Benchmark('court.depths_raster', "SimplifiedCourtDynamics.depths from rasters", _court_call('depths', True),
+              {'points': POINTS}),
+    Benchmark('court.inside_play_box', "SimplifiedCourtDynamics.inside_play_box, computed",
+              _court_call('inside_play_box', False), {'points': POINTS}),
+    Benchmark('court.inside_play_box_raster', "SimplifiedCourtDynamics.inside_play_box from rasters",
+              _court_call('inside_play_box', True), {'points': POINTS}),
+    Benchmark('court.zones', "SimplifiedCourtDynamics.zones, computed", _court_call('zones', False),
+              {'points': POINTS}),
+    Benchmark('court.point_queries', "get_penetration_depth + is_inside_play_box one point at a time",
+              _court_point_queries(False), {'points': SCALAR_POINTS}),
+    Benchmark('court.point_queries_raster', "get_penetration_depth + is_inside_play_box one point at a time, rasters",
+              _court_point_queries(True), {'points': SCALAR_POINTS}),
+    Benchmark('court.analyze_raid_path', "SimplifiedCourtDynamics.analyze_raid_path of a long raid",
+              _court_raid_path, {'positions': LONG_RAID_FRAMES}),
+    Benchmark('metrics.long_raid', "RaidMetricsExtractor.extract_raid_metrics, long raid, full defence",
+              _raid_metrics(LONG_RAID_FRAMES), {'positions': LONG_RAID_FRAMES, 'defenders': DEFENDERS}),
+    Benchmark('metrics.history_raid', "RaidMetricsExtractor.extract_raid_metrics on a track history",
+              _raid_metrics(HISTORY_FRAMES), {'positions': HISTORY_FRAMES, 'defenders': DEFENDERS}),
+    Benchmark('profiling.build_raider_profile', "build_raider_profile with all-time stats",
+              _build_raider_profile, {'raids': PROFILE_RAIDS}),
+    Benchmark('ranking.rank_players', "rank_players on a large league", _rank_players,
+              {'players': LEAGUE_PLAYERS}),
+    Benchmark('ranking.assign_ranks', "assign_ranks on a large league", _assign_ranks,
+              {'players': LEAGUE_PLAYERS}),
+    Benchmark('ui.load_data', "KabaddiAnalyticsApp.load_data: CSV parsing and rankings", _load_data,
+              _league_size(UI_LEAGUE)),
+    Benchmark('ui.player_table_populate', "PlayerTable.populate with every column", _populate_table,
+              _league_size(TABLE_LEAGUE)),
+]
+
+
+def select(prefixes=None):
+    """Cases whose name starts with any of the prefixes, e.g. 'court' or 'metrics.long_raid' (all cases without prefixes)"""
+    if not prefixes:
+        return list(CASES)
+    return [case for case in CASES if case.name.startswith(tuple(prefixes))]
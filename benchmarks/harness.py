@@ -0,0 +1,154 @@
+"""
+Benchmark Harness
+Timing, JSON baselines and regression checks for the benchmark suite
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+class SkipBenchmark(Exception):
+    """Raised by a benchmark setup that cannot run here (no display, missing input)"""
+
+
+class Benchmark:
+    """
+    One benchmark case.
+    
+    setup() builds the inputs, untimed, and returns (fn, cleanup): fn is the
+    call that is timed, cleanup (or None) runs once afterwards. size
+    describes the inputs; results are only compared between runs of equal
+    size.
+    """
+    
+    def __init__(self, name, description, setup, size=None):
+        self.name = name
+        self.description = description
+        self.setup = setup
+        self.size = size or {}
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    """
+    Seconds per call of fn in each of `repeat` rounds.
+    
+    The loop count is calibrated first (1, 2, 5, 10, 20, ... calls) until a
+    round lasts at least min_time; the calibration doubles as warm-up.
+    Returns (loops, [seconds per call, one per round]).
+    """
+    loops, step = 1, 0
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - start >= min_time:
+            break
+        loops = int(loops * (2, 2.5, 2)[step % 3])
+        step += 1
+    
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        rounds.append((time.perf_counter() - start) / loops)
+    return loops, rounds
+
+
+def run_benchmark(benchmark, repeat=5, min_time=0.2):
+    """Result dict of one benchmark; {'skipped': reason} if it cannot run. Its console output is discarded."""
+    result = {'description': benchmark.description, 'size': benchmark.size}
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn, cleanup = benchmark.setup()
+            try:
+                loops, rounds = measure(fn, repeat, min_time)
+            finally:
+                if cleanup is not None:
+                    cleanup()
+    except SkipBenchmark as e:
+        result['skipped'] = str(e)
+        return result
+    except ImportError as e:
+        result['skipped'] = f"missing dependency: {e.name or e}"
+        return result
+    
+    result.update({
+        'loops': loops,
+        'repeat': repeat,
+        'best_ms': round(1000 * min(rounds), 6),
+        'median_ms': round(1000 * statistics.median(rounds), 6),
+        'mean_ms': round(1000 * statistics.fmean(rounds), 6),
+        'stdev_ms': round(1000 * statistics.stdev(rounds), 6) if len(rounds) > 1 else 0.0
+    })
+    return result
+
+
+def machine_info():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count()
+    }
+
+
+def save_results(results, path, settings=None):
+    """Write a run (benchmark name -> result) as JSON with the machine it ran on"""
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'machine': machine_info(),
+        'settings': settings or {},
+        'benchmarks': results
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    Compare the best time per call of each benchmark in results with the baseline report.
+    
+    Returns one (name, baseline_ms, current_ms, ratio, status) row per
+    benchmark; status is 'regression' (slower by more than tolerance),
+    'faster' (faster by as much), 'same', or 'new', 'size changed' and
+    'skipped' when there is nothing to compare.
+    """
+    rows = []
+    for name, current in results.items():
+        base = baseline.get('benchmarks', {}).get(name)
+        current_ms = current.get('best_ms')
+        base_ms = base.get('best_ms') if base else None
+        if current_ms is None or base_ms is None:
+            status = 'skipped' if base else 'new'
+            rows.append((name, base_ms, current_ms, None, status))
+            continue
+        if base.get('size') != current.get('size'):
+            rows.append((name, base_ms, current_ms, None, 'size changed'))
+            continue
+        
+        ratio = current_ms / base_ms if base_ms > 0 else float('inf')
+        if ratio > 1 + tolerance:
+            status = 'regression'
+        elif ratio < 1 / (1 + tolerance):
+            status = 'faster'
+        else:
+            status = 'same'
+        rows.append((name, base_ms, current_ms, ratio, status))
+    return rows
@@ -5,8 +5,103 @@ Uses 4 parallel lines for accurate penetration calculation
 """
 
 import numpy as np
+import hashlib
 import json
 import os
+import tempfile
+import zipfile
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config')
+
+# Bump when the meaning of the raster arrays changes
+RASTER_VERSION = 1
+
+
+class CourtRaster:
+    """
+    Per-pixel lookup maps of a court at one video resolution.
+    
+    inside is the play box mask, depth the penetration depth in meters and
+    zone the ZONES index of every pixel, so queries on integer pixel points
+    are array indexing. Other points (fractional or outside the frame) are
+    answered by the court's vectorized geometry instead.
+    """
+    
+    def __init__(self, inside, depth, zone):
+        self.inside = inside  # (H, W) bool
+        self.depth = depth    # (H, W) float64 meters
+        self.zone = zone      # (H, W) uint8
+        self.height, self.width = inside.shape
+    
+    @classmethod
+    def build(cls, court, frame_shape):
+        height, width = frame_shape[:2]
+        ys, xs = np.mgrid[0:height, 0:width]
+        points = np.stack([xs.ravel(), ys.ravel()], axis=1)
+        inside = court._compute_inside(points)
+        depth = court._compute_depths(points)
+        zone = court._compute_zones(inside, depth)
+        return cls(inside.reshape(height, width), depth.reshape(height, width), zone.reshape(height, width))
+    
+    @classmethod
+    def load_or_build(cls, court, frame_shape, cache_dir=None):
+        """Load the rasters of this court and resolution from cache_dir, building and saving them if missing"""
+        height, width = frame_shape[:2]
+        key = court.config_digest()
+        path = os.path.join(cache_dir or os.path.join(CONFIG_DIR, 'court_rasters'),
+                            f"court_{width}x{height}_{key[:16]}.npz")
+        
+        if os.path.exists(path):
+            try:
+                with np.load(path) as data:
+                    if int(data['version']) == RASTER_VERSION and str(data['key']) == key:
+                        return cls(data['inside'], data['depth'], data['zone'])
+            except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+                print(f"⚠ Ignoring unreadable court raster {path}: {e}")
+        
+        raster = cls.build(court, frame_shape)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Unique temp file so processes building the same rasters never write into each other's file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.savez_compressed(f, version=np.array(RASTER_VERSION), key=np.array(key),
+                                        inside=raster.inside, depth=raster.depth, zone=raster.zone)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            print(f"🗺 Built court rasters for {width}x{height}: {path}")
+        except OSError as e:
+            print(f"⚠ Could not save court rasters to {path}: {e}")
+        return raster
+    
+    def lookup(self, values, points, fallback):
+        """values at (N, 2) points; fallback(points) answers points that are not integer pixels of the frame"""
+        points = np.asarray(points).reshape(-1, 2)
+        if not np.issubdtype(points.dtype, np.integer):
+            return fallback(points)
+        
+        x, y = points[:, 0], points[:, 1]
+        in_frame = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+        if in_frame.all():
+            return values[y, x]
+        
+        result = np.empty(len(points), dtype=values.dtype)
+        result[in_frame] = values[y[in_frame], x[in_frame]]
+        result[~in_frame] = fallback(points[~in_frame])
+        return result
+    
+    def at(self, values, point):
+        """values at one (x, y) point, or None if it is not an integer pixel of the frame"""
+        x, y = point[:2]
+        if not isinstance(x, (int, np.integer)) or not isinstance(y, (int, np.integer)):
+            return None
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return values[y, x]
+        return None
 
 
 class SimplifiedCourtDynamics:
@@ -15,6 +110,9 @@ class SimplifiedCourtDynamics:
     BONUS_DISTANCE = 4.75
     END_DISTANCE = 6.5
     
+    # Zone ids: outside the play box, then midline-baulk, baulk-bonus and beyond the bonus line
+    ZONES = ('outside', 'midline', 'baulk', 'bonus')
+    
     def __init__(self, play_box, midline, baulk_line, bonus_line, end_line):
         self.play_box = np.array(play_box)
         self.midline = np.array(midline)
@@ -22,6 +120,9 @@ class SimplifiedCourtDynamics:
         self.bonus_line = np.array(bonus_line)
         self.end_line = np.array(end_line)
         
+        # Per-pixel lookup maps, see enable_rasters()
+        self.raster = None
+        
         # Calculate depth direction using all lines
         self._calculate_depth_direction()
     
@@ -41,33 +142,44 @@ class SimplifiedCourtDynamics:
         
         self.mid_center = mid_center
         
+        # Midline as Ax + By + C = 0; every depth query is a perpendicular distance to it
+        x1, y1 = float(self.midline[0][0]), float(self.midline[0][1])
+        x2, y2 = float(self.midline[1][0]), float(self.midline[1][1])
+        self._A = y2 - y1
+        self._B = x1 - x2
+        self._C = x2 * y1 - x1 * y2
+        self._denominator = float(np.sqrt(self._A * self._A + self._B * self._B))
+        
+        # Perpendicular distance from midline to endline (first endline point)
+        ex, ey = float(self.end_line[0][0]), float(self.end_line[0][1])
+        if self._denominator:
+            self._end_pixel_depth = abs(self._A * ex + self._B * ey + self._C) / self._denominator
+        else:
+            self._end_pixel_depth = 0.0
+        
+        # Actual depths of the marked lines (treated as parallel to the midline)
+        self.baulk_depth = self._line_depth(self.baulk_line)
+        self.bonus_depth = self._line_depth(self.bonus_line)
+        
         print(f"✓ Court setup:")
         print(f"  Midline center: {mid_center}")
         print(f"  End line center: {end_center}")
         print(f"  Distance (pixels): {self.depth_magnitude:.1f}px = {self.END_DISTANCE}m")
         print(f"  Ratio: 1 pixel = {self.END_DISTANCE/self.depth_magnitude:.4f}m")
-        
-        # Calculate actual line depths
-        baulk_center = (self.baulk_line[0] + self.baulk_line[1]) / 2
-        baulk_vector = baulk_center - mid_center
-        baulk_projection = np.dot(baulk_vector, self.depth_direction)
-        baulk_depth = (baulk_projection / self.depth_magnitude) * self.END_DISTANCE
-        
-        bonus_center = (self.bonus_line[0] + self.bonus_line[1]) / 2
-        bonus_vector = bonus_center - mid_center
-        bonus_projection = np.dot(bonus_vector, self.depth_direction)
-        bonus_depth = (bonus_projection / self.depth_magnitude) * self.END_DISTANCE
-        
-        print(f"  Baulk line at: {baulk_depth:.2f}m (marked as 3.75m)")
-        print(f"  Bonus line at: {bonus_depth:.2f}m (marked as 4.75m)")
+        print(f"  Baulk line at: {self.baulk_depth:.2f}m (marked as 3.75m)")
+        print(f"  Bonus line at: {self.bonus_depth:.2f}m (marked as 4.75m)")
+    
+    def _line_depth(self, line):
+        """Depth of a line's centre in meters along the depth direction"""
+        line_center = (line[0] + line[1]) / 2
+        line_vector = line_center - self.mid_center
+        line_projection = float(np.dot(line_vector, self.depth_direction))
+        return float((line_projection / self.depth_magnitude) * self.END_DISTANCE)
     
     @classmethod
-    def load_from_config(cls, video_path):
-        """Load court configuration"""
-        config_file = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-            'config', 'play_area.json'
-        )
+    def load_from_config(cls, video_path, config_file=None):
+        """Load court configuration (from config/play_area.json unless config_file is given)"""
+        config_file = config_file or os.path.join(CONFIG_DIR, 'play_area.json')
         
         if not os.path.exists(config_file):
             raise ValueError(f"Config not found: {config_file}")
@@ -103,8 +215,25 @@ class SimplifiedCourtDynamics:
             config['end_line']
         )
     
+    def config_digest(self):
+        """SHA-1 of the court lines, identifying rasters built for this configuration"""
+        config = [a.tolist() for a in (self.play_box, self.midline, self.baulk_line, self.bonus_line, self.end_line)]
+        return hashlib.sha1(json.dumps(config).encode()).hexdigest()
+    
+    def enable_rasters(self, frame_shape, cache_dir=None):
+        """Answer containment, depth and zone queries from per-pixel maps of this frame size (cached on disk)"""
+        if frame_shape[0] <= 0 or frame_shape[1] <= 0:
+            return None
+        self.raster = CourtRaster.load_or_build(self, frame_shape, cache_dir)
+        return self.raster
+    
     def is_inside_play_box(self, point):
         """Check if point inside play box"""
+        if self.raster is not None:
+            inside = self.raster.at(self.raster.inside, point)
+            if inside is not None:
+                return bool(inside)
+        
         x, y = point
         n = len(self.play_box)
         inside = False
@@ -123,78 +252,114 @@ class SimplifiedCourtDynamics:
         
         return inside
     
+    def inside_play_box(self, points):
+        """is_inside_play_box for an (N, 2) array of points; returns a boolean array"""
+        if self.raster is not None:
+            return self.raster.lookup(self.raster.inside, points, self._compute_inside)
+        return self._compute_inside(points)
+    
+    def _compute_inside(self, points):
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        x, y = points[:, 0], points[:, 1]
+        inside = np.zeros(len(points), dtype=bool)
+        
+        n = len(self.play_box)
+        for i in range(n):
+            p1x, p1y = self.play_box[i]
+            p2x, p2y = self.play_box[(i + 1) % n]
+            if p1y == p2y:
+                continue  # Horizontal edges are never crossed
+            crosses = (y > min(p1y, p2y)) & (y <= max(p1y, p2y)) & (x <= max(p1x, p2x))
+            if p1x != p2x:
+                xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+                crosses &= x <= xinters
+            inside ^= crosses
+        
+        return inside
+    
+    def play_box_bounds(self, margin=0, frame_shape=None):
+        """Bounding rectangle (x0, y0, x1, y1) of the play box, grown by margin and clipped to the frame"""
+        x0, y0 = self.play_box.min(axis=0) - margin
+        x1, y1 = self.play_box.max(axis=0) + margin
+        if frame_shape is not None:
+            height, width = frame_shape[:2]
+            x0, y0 = max(0, x0), max(0, y0)
+            x1, y1 = min(width, x1), min(height, y1)
+        return int(x0), int(y0), int(x1), int(y1)
+    
     def get_penetration_depth(self, point):
         """Calculate penetration in METERS using perpendicular distance to midline
         
         Uses true perpendicular distance formula:
         distance = |Ax + By + C| / sqrt(A² + B²)
         """
-        x, y = point[:2] if len(point) > 2 else point
+        if self.raster is not None:
+            depth = self.raster.at(self.raster.depth, point)
+            if depth is not None:
+                return float(depth)
         
-        # Midline coefficients: Ax + By + C = 0
-        x1, y1 = float(self.midline[0][0]), float(self.midline[0][1])
-        x2, y2 = float(self.midline[1][0]), float(self.midline[1][1])
-        
-        A = y2 - y1
-        B = x1 - x2
-        C = x2 * y1 - x1 * y2
+        x, y = point[:2] if len(point) > 2 else point
         
-        # Perpendicular distance from point to midline
-        denominator = np.sqrt(A * A + B * B)
-        if denominator == 0:
+        if self._denominator == 0 or self._end_pixel_depth == 0:
             return 0.0
         
-        pixel_distance = abs(A * float(x) + B * float(y) + C) / denominator
-        
-        # Total perpendicular distance from midline to endline
-        # Use endline center point
-        ex, ey = float(self.end_line[0][0]), float(self.end_line[0][1])
-        total_pixel_depth = abs(A * ex + B * ey + C) / denominator
-        
-        if total_pixel_depth == 0:
-            return 0.0
+        # Perpendicular distance from point to midline
+        pixel_distance = abs(self._A * float(x) + self._B * float(y) + self._C) / self._denominator
         
         # Convert to meters
-        meters = (pixel_distance / total_pixel_depth) * self.END_DISTANCE
+        meters = (pixel_distance / self._end_pixel_depth) * self.END_DISTANCE
         
         return float(max(0.0, meters))
     
+    def depths(self, points):
+        """get_penetration_depth for an (N, 2) array of points; returns meters as a float array"""
+        if self.raster is not None:
+            return self.raster.lookup(self.raster.depth, points, self._compute_depths)
+        return self._compute_depths(points)
+    
+    def _compute_depths(self, points):
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if self._denominator == 0 or self._end_pixel_depth == 0:
+            return np.zeros(len(points))
+        
+        pixel_distance = np.abs(self._A * points[:, 0] + self._B * points[:, 1] + self._C) / self._denominator
+        return np.maximum(0.0, (pixel_distance / self._end_pixel_depth) * self.END_DISTANCE)
+    
+    def zones(self, points):
+        """Zone id (index into ZONES) for an (N, 2) array of points"""
+        if self.raster is not None:
+            return self.raster.lookup(self.raster.zone, points, self._zones_of)
+        return self._zones_of(points)
+    
+    def _zones_of(self, points):
+        return self._compute_zones(self._compute_inside(points), self._compute_depths(points))
+    
+    def _compute_zones(self, inside, depths):
+        zone = np.where(depths >= self.bonus_depth, 3, np.where(depths >= self.baulk_depth, 2, 1))
+        return np.where(inside, zone, 0).astype(np.uint8)
+    
+    def crossed_lines(self, points):
+        """Baulk and bonus crossing for an (N, 2) array of points; returns (crossed_baulk, crossed_bonus) boolean arrays"""
+        depths = self.depths(points)
+        return depths >= self.baulk_depth, depths >= self.bonus_depth
+    
     def crossed_baulk_line(self, point):
         """Check if point crossed the physical baulk line (treat as parallel)"""
-        penetration = self.get_penetration_depth(point)
-        # Get baulk line position in depth direction
-        baulk_center = (self.baulk_line[0] + self.baulk_line[1]) / 2
-        baulk_vector = baulk_center - self.mid_center
-        baulk_projection = float(np.dot(baulk_vector, self.depth_direction))
-        baulk_depth = (baulk_projection / float(self.depth_magnitude)) * self.END_DISTANCE
-        
         # If raider penetration >= baulk line depth, they crossed it
-        return penetration >= baulk_depth
+        return self.get_penetration_depth(point) >= self.baulk_depth
     
     def crossed_bonus_line(self, point):
         """Check if point crossed the physical bonus line (treat as parallel)"""
-        penetration = self.get_penetration_depth(point)
-        # Get bonus line position in depth direction
-        bonus_center = (self.bonus_line[0] + self.bonus_line[1]) / 2
-        bonus_vector = bonus_center - self.mid_center
-        bonus_projection = float(np.dot(bonus_vector, self.depth_direction))
-        bonus_depth = (bonus_projection / float(self.depth_magnitude)) * self.END_DISTANCE
-        
         # If raider penetration >= bonus line depth, they crossed it
-        return penetration >= bonus_depth
+        return self.get_penetration_depth(point) >= self.bonus_depth
     
     def get_line_depth(self, line_name):
         """Get the actual depth of a marked line in meters"""
         if line_name == 'baulk':
-            line_center = (self.baulk_line[0] + self.baulk_line[1]) / 2
+            return self.baulk_depth
         elif line_name == 'bonus':
-            line_center = (self.bonus_line[0] + self.bonus_line[1]) / 2
-        else:
-            return 0.0
-        
-        line_vector = line_center - self.mid_center
-        line_projection = float(np.dot(line_vector, self.depth_direction))
-        return (line_projection / float(self.depth_magnitude)) * self.END_DISTANCE
+            return self.bonus_depth
+        return 0.0
     
     def analyze_raid_path(self, positions):
         """Analyze raid path"""
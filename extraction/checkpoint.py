@@ -0,0 +1,114 @@
+"""
+Extraction Checkpoints
+Resumable state of a long extraction run, saved at frames with no raid active
+"""
+
+import json
+import os
+import zipfile
+
+import numpy as np
+
+from extraction.detections import NUM_KEYPOINTS
+
+CHECKPOINT_DIR = os.path.join("data", "checkpoints")
+CHECKPOINT_VERSION = 1
+
+# baseline_side of a track without one
+_NO_BASELINE = -128
+
+
+def checkpoint_path(checkpoint_dir, video_path):
+    """Checkpoint of a video: <checkpoint_dir>/<video name>.npz"""
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(checkpoint_dir, video_name + '.npz')
+
+
+class ExtractionCheckpoint:
+    """
+    Resumable state of one extraction run in a .npz file.
+    
+    A checkpoint is taken at a frame with no raid active and holds the frame
+    number, the raids found so far and the history of every tracked player,
+    stored columnar like a DetectionCache. The pose tracker itself cannot be
+    restored: a resumed run starts it afresh with new track ids, so the
+    tracks are handed over as seed players (see RaidStateMachine.seed),
+    which is also why no checkpoint is taken during a raid.
+    
+    complete marks the checkpoint written at the end of a finished run;
+    resuming from it processes nothing. A checkpoint written for another
+    fingerprint (video, model or settings) is ignored.
+    """
+    
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.frame = 0
+        self.complete = False
+        self.raids = []
+        self.players = {}
+    
+    def load(self, new_track):
+        """
+        Load the checkpoint file; returns False if it is missing or was
+        written for another fingerprint. new_track(last_seen) creates the
+        empty PlayerTrack each saved history is replayed into.
+        """
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with np.load(self.path) as data:
+                if int(data['version']) != CHECKPOINT_VERSION or str(data['fingerprint']) != self.fingerprint:
+                    return False
+                arrays = {k: data[k] for k in ('tids', 'offsets', 'baselines', 'last_seen', 'positions',
+                                               'keypoints', 'sides', 'confidence')}
+                frame = int(data['frame'])
+                complete = bool(data['complete'])
+                raids = json.loads(str(data['raids']))
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            print(f"⚠ Ignoring unreadable checkpoint {self.path}: {e}")
+            return False
+        
+        players = {}
+        offsets = arrays['offsets']
+        for i, tid in enumerate(arrays['tids'].tolist()):
+            s, e = offsets[i], offsets[i + 1]
+            track = new_track(int(arrays['last_seen'][i]))
+            for (x, y, frame_count), keypoints, side, conf in zip(arrays['positions'][s:e].tolist(),
+                                                                  arrays['keypoints'][s:e],
+                                                                  arrays['sides'][s:e].tolist(),
+                                                                  arrays['confidence'][s:e]):
+                track.append(x, y, frame_count, keypoints, side, conf)
+            baseline = int(arrays['baselines'][i])
+            track.baseline_side = None if baseline == _NO_BASELINE else baseline
+            players[tid] = track
+        
+        self.frame, self.complete, self.raids, self.players = frame, complete, raids, players
+        return True
+    
+    def save(self, frame, players, raids, complete=False):
+        """Write the state at frame: players ({tid: PlayerTrack}) and the raid metrics so far"""
+        tids = [tid for tid, track in players.items() if len(track)]
+        tracks = [players[tid] for tid in tids]
+        offsets = np.zeros(len(tracks) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(track) for track in tracks])
+        
+        empty = {'positions': np.zeros((0, 3), np.int32), 'keypoints': np.zeros((0, NUM_KEYPOINTS, 2), np.float32),
+                 'sides': np.zeros(0, np.int8), 'confidence': np.zeros(0, np.float32)}
+        columns = {name: np.concatenate([array] + [getattr(track, name) for track in tracks])
+                   for name, array in empty.items()}
+        baselines = [_NO_BASELINE if track.baseline_side is None else track.baseline_side for track in tracks]
+        # Metrics hold NumPy scalars
+        raids = [{k: v.item() if hasattr(v, 'item') else v for k, v in raid.items()} for raid in raids]
+        
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, version=np.array(CHECKPOINT_VERSION), fingerprint=np.array(self.fingerprint),
+                                frame=np.array(frame), complete=np.array(complete), raids=np.array(json.dumps(raids)),
+                                tids=np.array(tids, dtype=np.int64), offsets=offsets,
+                                baselines=np.array(baselines, dtype=np.int8),
+                                last_seen=np.array([track.last_seen for track in tracks], dtype=np.int64), **columns)
+        # A kill mid-write leaves the previous checkpoint intact
+        os.replace(tmp_path, self.path)
+        self.frame, self.complete = frame, complete
@@ -0,0 +1,159 @@
+"""
+Frame Detections and Detection Cache
+Per-frame tracking output as NumPy arrays, persisted in a compressed columnar file for re-analysis
+"""
+
+import hashlib
+import os
+import zipfile
+
+import numpy as np
+
+# YOLOv8-pose (COCO) keypoints per person
+NUM_KEYPOINTS = 17
+
+# Bump when the cache layout or the meaning of its arrays changes
+CACHE_VERSION = 1
+
+
+class FrameDetections:
+    """Tracked detections of one frame, one row per track"""
+    
+    __slots__ = ('ids', 'boxes', 'conf', 'keypoints')
+    
+    def __init__(self, ids, boxes, conf, keypoints):
+        self.ids = ids              # (N,) int32 track ids
+        self.boxes = boxes          # (N, 4) float32 x1, y1, x2, y2
+        self.conf = conf            # (N,) float32
+        self.keypoints = keypoints  # (N, 17, 2) float32 xy; undetected keypoints are (0, 0)
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(0, np.int32), np.zeros((0, 4), np.float32), np.zeros(0, np.float32),
+                   np.zeros((0, NUM_KEYPOINTS, 2), np.float32))
+    
+    @classmethod
+    def from_results(cls, results):
+        """Convert model.track output; frames without track ids have no usable detections"""
+        if not results or results[0].boxes is None or results[0].boxes.id is None:
+            return cls.empty()
+        
+        boxes = results[0].boxes
+        ids = boxes.id.cpu().numpy().astype(np.int32)
+        if results[0].keypoints is not None:
+            keypoints = results[0].keypoints.xy.cpu().numpy().astype(np.float32)
+        else:
+            keypoints = np.zeros((len(ids), NUM_KEYPOINTS, 2), np.float32)
+        return cls(ids, boxes.xyxy.cpu().numpy().astype(np.float32),
+                   boxes.conf.cpu().numpy().astype(np.float32), keypoints)
+
+
+def file_digest(path, sample_bytes=None):
+    """
+    SHA-1 of a file. With sample_bytes, only the size and that many bytes at
+    the start, middle and end are hashed, which is enough to tell match
+    videos apart without reading gigabytes.
+    """
+    h = hashlib.sha1()
+    size = os.path.getsize(path)
+    h.update(str(size).encode())
+    with open(path, 'rb') as f:
+        if sample_bytes is None or size <= 3 * sample_bytes:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        else:
+            for offset in (0, size // 2, size - sample_bytes):
+                f.seek(offset)
+                h.update(f.read(sample_bytes))
+    return h.hexdigest()
+
+
+def run_fingerprint(video_path, model_path, settings):
+    """Key for cached detections: video, model weights and every setting that changes tracking output"""
+    h = hashlib.sha1()
+    h.update(f"detections-v{CACHE_VERSION}".encode())
+    h.update(file_digest(video_path, sample_bytes=1 << 20).encode())
+    # ultralytics downloads missing official weights by name on first use
+    model_key = file_digest(model_path) if os.path.exists(model_path) else os.path.basename(model_path)
+    h.update(model_key.encode())
+    h.update(repr(sorted(settings.items())).encode())
+    return h.hexdigest()
+
+
+class DetectionCache:
+    """
+    Per-frame detections of a whole video in one compressed .npz file.
+    
+    Storage is columnar: the detections of all frames are concatenated into
+    flat ids / boxes / conf / keypoints arrays and `offsets` gives each
+    frame's slice. Frames the model did not run on (adaptive scheduling)
+    have no entry and replay as None.
+    """
+    
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.num_frames = 0
+        self._recorded = {}
+        self._arrays = None
+        self._index = {}
+    
+    def load(self):
+        """Load the cache file; returns False if it is missing or was written for another fingerprint"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with np.load(self.path) as data:
+                if str(data['fingerprint']) != self.fingerprint:
+                    return False
+                self._arrays = {k: data[k] for k in ('frame_counts', 'offsets', 'ids', 'boxes', 'conf', 'keypoints')}
+                self.num_frames = int(data['num_frames'])
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            print(f"⚠ Ignoring unreadable detection cache {self.path}: {e}")
+            return False
+        
+        self._index = {int(f): i for i, f in enumerate(self._arrays['frame_counts'])}
+        return True
+    
+    def get(self, frame_count):
+        """FrameDetections of a cached frame, or None if the model skipped it"""
+        i = self._index.get(frame_count)
+        if i is None:
+            return None
+        a = self._arrays
+        s, e = a['offsets'][i], a['offsets'][i + 1]
+        return FrameDetections(a['ids'][s:e], a['boxes'][s:e], a['conf'][s:e], a['keypoints'][s:e])
+    
+    def get_batch(self, frames, frame_counts):
+        """FramePipeline infer_fn that reads detections instead of running the model"""
+        return [self.get(frame_count) for frame_count in frame_counts]
+    
+    def record(self, frame_count, detections):
+        if detections is not None:
+            self._recorded[frame_count] = detections
+    
+    def save(self, num_frames):
+        """Write all recorded frames; num_frames is the number of frames in the video"""
+        order = sorted(self._recorded)
+        frame_counts = np.array(order, dtype=np.int32)
+        frames = [self._recorded[f] for f in order]
+        offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(d) for d in frames])
+        
+        empty = FrameDetections.empty()
+        columns = {
+            name: np.concatenate([getattr(empty, name)] + [getattr(d, name) for d in frames])
+            for name in ('ids', 'boxes', 'conf', 'keypoints')
+        }
+        
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, fingerprint=np.array(self.fingerprint), num_frames=np.array(num_frames),
+                                frame_counts=frame_counts, offsets=offsets, **columns)
+        os.replace(tmp_path, self.path)
+        self.num_frames = num_frames
+        print(f"💾 Cached detections of {len(frames)} frames to {self.path}")
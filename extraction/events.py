@@ -0,0 +1,129 @@
+"""
+Raid Events
+Typed events of the raid state machine, delivered to callbacks or iterated as they happen
+"""
+
+import json
+import os
+import time
+
+# Event types, in the order they can occur within a raid
+RAID_START = 'raid_start'
+BAULK_CROSSED = 'baulk_crossed'
+BONUS_CROSSED = 'bonus_crossed'
+RAIDER_RECOVERED = 'raider_recovered'
+RAIDER_LOST = 'raider_lost'
+RAID_END = 'raid_end'
+EVENT_TYPES = (RAID_START, BAULK_CROSSED, BONUS_CROSSED, RAIDER_RECOVERED, RAIDER_LOST, RAID_END)
+
+# How a raid ended (data['outcome'] of raid_end)
+RETURNED = 'returned'   # raider back on their baseline side
+LOST = 'lost'           # raider missing for more than max_missing frames
+UNFINISHED = 'unfinished'  # still active when processing stopped
+
+
+class RaidEvent:
+    """
+    One raid event.
+    
+    frame is the frame number, timestamp its position in the video in
+    seconds and wall_time the time.time() at which it was emitted (the
+    delay of a live source). raid is the 1-based raid number and
+    raider_id the raider's track id. data holds the type specific fields:
+    - raider_recovered: previous_id, distance (pixels)
+    - raider_lost: missing_frames
+    - raid_end: outcome (returned / lost / unfinished) and metrics, the
+      dict appended to the raid list
+    """
+    
+    __slots__ = ('type', 'frame', 'timestamp', 'wall_time', 'raid', 'raider_id', 'data')
+    
+    def __init__(self, event_type, frame, timestamp, raid, raider_id, data=None):
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown raid event type: {event_type}")
+        self.type = event_type
+        self.frame = frame
+        self.timestamp = timestamp
+        self.wall_time = time.time()
+        self.raid = raid
+        self.raider_id = raider_id
+        self.data = data or {}
+    
+    def __repr__(self):
+        return f"RaidEvent({self.type}, raid={self.raid}, frame={self.frame}, raider={self.raider_id})"
+    
+    def to_dict(self):
+        """JSON-serialisable form; metrics values are converted to plain Python types"""
+        data = dict(self.data)
+        if 'metrics' in data:
+            data['metrics'] = {k: v.item() if hasattr(v, 'item') else v for k, v in data['metrics'].items()}
+        return {'type': self.type, 'frame': self.frame, 'timestamp': round(self.timestamp, 3),
+                'wall_time': round(self.wall_time, 3), 'raid': self.raid, 'raider_id': self.raider_id, **data}
+    
+    def describe(self):
+        """One line for logs"""
+        when = f"{int(self.timestamp // 60)}:{self.timestamp % 60:04.1f}"
+        prefix = f"[{when}] Raid #{self.raid}"
+        if self.type == RAID_START:
+            return f"{prefix}: 🏃 started by player {self.raider_id} (frame {self.frame})"
+        if self.type == BAULK_CROSSED:
+            return f"{prefix}: baulk line crossed"
+        if self.type == BONUS_CROSSED:
+            return f"{prefix}: ⭐ bonus line crossed"
+        if self.type == RAIDER_RECOVERED:
+            return (f"{prefix}: ⚡ raider recovered as player {self.raider_id} "
+                    f"(was {self.data['previous_id']}, {self.data['distance']:.0f}px)")
+        if self.type == RAIDER_LOST:
+            return f"{prefix}: ❌ raider lost after {self.data['missing_frames']} frames"
+        metrics = self.data['metrics']
+        return (f"{prefix}: ✅ ended ({self.data['outcome']}) after {metrics['duration']:.1f}s, "
+                f"max penetration {metrics['max_penetration']:.2f}m")
+
+
+class EventLog:
+    """
+    Raid events written to a file as JSON lines, one per event, flushed as
+    they are written so the file is current during a run and survives a
+    crash.
+    
+    A new log replaces the file unless append=True.
+    """
+    
+    def __init__(self, path, append=False):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a' if append else 'w')
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def discard_after(self, frame_count):
+        """Drop the events after frame_count, which a run resumed from there emits again"""
+        self._file.close()
+        kept = []
+        with open(self.path) as f:
+            for line in f:
+                # A kill mid-write leaves a partial last line
+                if not line.endswith("\n"):
+                    continue
+                try:
+                    frame = json.loads(line)['frame']
+                except (ValueError, KeyError):
+                    continue
+                if frame <= frame_count:
+                    kept.append(line)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.writelines(kept)
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a')
+    
+    def write(self, event):
+        self._file.write(json.dumps(event.to_dict()) + "\n")
+        self._file.flush()
+    
+    def close(self):
+        self._file.close()
@@ -0,0 +1,198 @@
+"""
+Pose Inference and Tracking
+Wraps the YOLO pose model and BoT-SORT tracker for single-frame and batched use
+"""
+
+import math
+
+
+def _copy(data):
+    """Writable copy of a torch tensor or NumPy array"""
+    return data.clone() if hasattr(data, 'clone') else data.copy()
+
+
+class CropRegion:
+    """
+    Fixed rectangle of the frame that is sent to the model.
+    
+    Results are mapped back into full-frame coordinates, so everything
+    downstream of inference is unaware of the crop.
+    """
+    
+    # Players standing on the play box edge extend well outside it
+    DEFAULT_MARGIN = 150
+    
+    def __init__(self, x0, y0, x1, y1, frame_shape):
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.frame_shape = frame_shape[:2]
+    
+    @classmethod
+    def around_play_box(cls, court_dynamics, frame_shape, margin=DEFAULT_MARGIN):
+        x0, y0, x1, y1 = court_dynamics.play_box_bounds(margin, frame_shape)
+        return cls(x0, y0, x1, y1, frame_shape)
+    
+    def __repr__(self):
+        return f"CropRegion(({self.x0}, {self.y0}) -> ({self.x1}, {self.y1}))"
+    
+    def crop(self, frame):
+        return frame[self.y0:self.y1, self.x0:self.x1]
+    
+    def scale_imgsz(self, imgsz):
+        """Shrink imgsz so the crop keeps the same pixels-per-player as the full frame"""
+        frame_side = max(self.frame_shape)
+        crop_side = max(self.x1 - self.x0, self.y1 - self.y0)
+        return max(32, int(math.ceil(imgsz * crop_side / frame_side / 32)) * 32)
+    
+    def to_frame(self, result):
+        """Shift boxes and keypoints of one Results object from crop to frame coordinates"""
+        # Results tensors are created under torch.inference_mode and cannot be
+        # modified in place, so shift a copy
+        boxes = result.boxes
+        if boxes is not None and len(boxes):
+            boxes.data = _copy(boxes.data)
+            boxes.data[:, 0] += self.x0
+            boxes.data[:, 1] += self.y0
+            boxes.data[:, 2] += self.x0
+            boxes.data[:, 3] += self.y0
+        
+        keypoints = result.keypoints
+        if keypoints is not None and len(keypoints):
+            kpts = keypoints.data = _copy(keypoints.data)
+            # Undetected keypoints are reported as (0, 0) and must stay that way
+            visible = (kpts[..., 0] > 0) & (kpts[..., 1] > 0)
+            kpts[..., 0] += visible * self.x0
+            kpts[..., 1] += visible * self.y0
+        
+        result.orig_shape = self.frame_shape
+        return result
+
+
+class PoseTracker:
+    """YOLOv8-pose detector with persistent BoT-SORT tracking"""
+    
+    # Enhanced tracking with multi-scale detection for far players
+    CONF = 0.05         # Very low confidence to detect far players
+    IOU = 0.15          # Lower IOU for better matching
+    IMGSZ = 1920        # Larger image size for better far detection
+    MAX_DET = 50        # Detect more players
+    TRACKER = "botsort.yaml"
+    
+    # ultralytics always builds its trackers with this frame rate
+    TRACKER_FRAME_RATE = 30
+    
+    def __init__(self, model_path, crop=None):
+        """
+        Args:
+            model_path: YOLO pose weights
+            crop: Optional CropRegion; only that part of each frame is inferred
+        """
+        self.model_path = model_path
+        self.crop = crop
+        self._model = None
+        self._tracker = None
+    
+    @property
+    def model(self):
+        """YOLO model, loaded on first use so runs replaying cached detections never load it"""
+        if self._model is None:
+            from ultralytics import YOLO
+            self._model = YOLO(self.model_path)
+        return self._model
+    
+    def cache_settings(self):
+        """Everything besides video and weights that changes the tracking output"""
+        try:
+            from importlib.metadata import version
+            ultralytics_version = version('ultralytics')
+        except Exception:
+            ultralytics_version = None
+        crop = None if self.crop is None else (self.crop.x0, self.crop.y0, self.crop.x1, self.crop.y1)
+        return {
+            'conf': self.CONF,
+            'iou': self.IOU,
+            'imgsz': self.IMGSZ,
+            'max_det': self.MAX_DET,
+            'tracker': self.TRACKER,
+            'tracker_frame_rate': self.TRACKER_FRAME_RATE,
+            'crop': crop,
+            'ultralytics': ultralytics_version
+        }
+    
+    def track_args(self, budget=None):
+        """Model arguments, with image size / detection cap taken from budget if given"""
+        imgsz = budget.imgsz if budget else self.IMGSZ
+        if self.crop is not None:
+            imgsz = self.crop.scale_imgsz(imgsz)
+        return {
+            'conf': self.CONF,
+            'iou': self.IOU,
+            'imgsz': imgsz,
+            'max_det': budget.max_det if budget else self.MAX_DET
+        }
+    
+    def track(self, frame, budget=None):
+        """Detect and track one frame with model.track (persistent tracker)"""
+        image = frame if self.crop is None else self.crop.crop(frame)
+        results = self.model.track(
+            image,
+            persist=True,
+            verbose=False,
+            tracker=self.TRACKER,
+            **self.track_args(budget)
+        )
+        if self.crop is not None:
+            for result in results:
+                self.crop.to_frame(result)
+        return results
+    
+    def track_batch(self, frames, budget=None):
+        """
+        Detect a batch of frames in one forward pass, then track them in order.
+        
+        model.track cannot be used for this: ultralytics gives every image of a
+        batch its own tracker (one per stream). Instead the batch goes through
+        model.predict and a single BoT-SORT tracker is updated frame by frame,
+        exactly as ultralytics' own tracking callback does.
+        
+        Returns one results list per frame, shaped like model.track output.
+        """
+        images = frames if self.crop is None else [self.crop.crop(frame) for frame in frames]
+        predictions = self.model.predict(images, verbose=False, **self.track_args(budget))
+        
+        batch_results = []
+        for result, image in zip(predictions, images):
+            result = self._update_tracker(result, image)
+            if self.crop is not None:
+                self.crop.to_frame(result)
+            batch_results.append([result])
+        return batch_results
+    
+    def _update_tracker(self, result, frame):
+        if self._tracker is None:
+            self._tracker = self._build_tracker()
+        
+        # Frames without detections still go through the tracker: that is
+        # what ages lost tracks out, as in ultralytics' tracking callback
+        det = result.boxes.cpu().numpy()
+        tracks = self._tracker.update(det, frame, getattr(result, 'feats', None))
+        if len(tracks) == 0:
+            return result
+        
+        import torch
+        idx = tracks[:, -1].astype(int)
+        result = result[idx]
+        result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+        return result
+    
+    def _build_tracker(self):
+        from ultralytics.trackers.track import TRACKER_MAP
+        from ultralytics.utils import IterableSimpleNamespace
+        from ultralytics.utils.checks import check_yaml
+        try:
+            from ultralytics.utils import yaml_load
+        except ImportError:  # newer ultralytics releases
+            from ultralytics.utils import YAML
+            yaml_load = YAML.load
+        
+        cfg = IterableSimpleNamespace(**yaml_load(check_yaml(self.TRACKER)))
+        return TRACKER_MAP[cfg.tracker_type](args=cfg, frame_rate=self.TRACKER_FRAME_RATE)
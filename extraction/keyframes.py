@@ -0,0 +1,265 @@
+"""
+Keyframe Container
+Raid keyframes of one video in a single indexed file, written on background threads
+"""
+
+import json
+import os
+import re
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+KEYFRAME_EXTENSION = '.keyframes'
+CONTAINER_VERSION = 1
+
+_RECORD_MAGIC = b'KFR1'
+_INDEX_MAGIC = b'KFX1'
+_RECORD = struct.Struct('<4sIII')  # magic, metadata size, image size, thumbnail size
+_TRAILER = struct.Struct('<Q4s')   # index offset, magic
+
+# Loose keyframe files of older runs: raid_{n}_{event}_frame_{f}.jpg
+_LOOSE_NAME = re.compile(r'raid_(\d+)_([a-z]+)_frame_(\d+)\.jpg$')
+
+
+def container_path(keyframes_dir, video_path):
+    """Keyframe container of a video: <keyframes_dir>/<video name>.keyframes"""
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(keyframes_dir, video_name + KEYFRAME_EXTENSION)
+
+
+class KeyframeContainer:
+    """
+    Read side of a keyframe container.
+    
+    The file is a sequence of records (header, JSON metadata, JPEG image,
+    JPEG thumbnail) followed by a JSON index and a fixed-size trailer that
+    points to it. Opening reads only the trailer and the index; each image
+    is then one seek and read. A file without a valid trailer (the writer
+    was interrupted) is indexed by walking the record headers instead.
+    
+    Index entries are dicts with raid, event, frame and the byte offset and
+    size of the image and thumbnail. info holds what the writer recorded
+    about the run, e.g. the source video path and fps.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.data_end = 0
+        self.info = {}
+        self.entries = self._read_index()
+    
+    def _read_index(self):
+        with open(self.path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size >= _TRAILER.size:
+                f.seek(size - _TRAILER.size)
+                offset, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+                if magic == _INDEX_MAGIC and offset <= size - _TRAILER.size:
+                    f.seek(offset)
+                    index = json.loads(f.read(size - _TRAILER.size - offset))
+                    self.data_end = offset
+                    self.info = index.get('info', {})
+                    return index['entries']
+            return self._scan(f, size)
+    
+    def _scan(self, f, size):
+        entries = []
+        position = 0
+        while position + _RECORD.size <= size:
+            f.seek(position)
+            magic, meta_size, image_size, thumb_size = _RECORD.unpack(f.read(_RECORD.size))
+            end = position + _RECORD.size + meta_size + image_size + thumb_size
+            if magic != _RECORD_MAGIC or end > size:
+                break
+            entry = json.loads(f.read(meta_size))
+            offset = position + _RECORD.size + meta_size
+            entry.update(offset=offset, size=image_size, thumb_offset=offset + image_size, thumb_size=thumb_size)
+            entries.append(entry)
+            position = end
+        self.data_end = position
+        return entries
+    
+    def raids(self):
+        """{raid: {event: entry}}, keeping the first keyframe of each event"""
+        raids = {}
+        for entry in sorted(self.entries, key=lambda e: e['frame']):
+            raids.setdefault(entry['raid'], {}).setdefault(entry['event'], entry)
+        return raids
+    
+    def read(self, entry, thumbnail=False):
+        """Encoded JPEG bytes of an entry (b'' if it has no thumbnail)"""
+        offset, size = (entry['thumb_offset'], entry['thumb_size']) if thumbnail else (entry['offset'], entry['size'])
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return f.read(size)
+    
+    def read_image(self, entry, thumbnail=False):
+        """Decoded BGR image of an entry, or None"""
+        data = self.read(entry, thumbnail)
+        if not data:
+            return None
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+class KeyframeWriter:
+    """
+    Write side of a keyframe container.
+    
+    submit() takes an image the caller no longer touches (a rendered copy of
+    the frame) and returns immediately; JPEG encoding of the image and a
+    thumbnail_width pixel wide thumbnail happens on a small thread pool,
+    which OpenCV runs without holding the GIL, and the encoded record is
+    appended under a lock. At most max_pending images are queued; submit()
+    blocks beyond that so a burst of events cannot pile up full frames.
+    close() waits for the queue and writes the index.
+    
+    A new writer replaces the container unless append=True. info (e.g. the
+    source video) is stored in the index.
+    """
+    
+    def __init__(self, path, jpeg_quality=95, thumbnail_width=320, workers=2, max_pending=8, append=False,
+                 info=None):
+        self.path = path
+        self.info = info
+        self.jpeg_quality = jpeg_quality
+        self.thumbnail_width = thumbnail_width
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="keyframes")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.failed = []
+        self._open(append)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _open(self, append):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if append and os.path.exists(self.path):
+            existing = KeyframeContainer(self.path)
+            self.entries = existing.entries
+            self.info = self.info or existing.info
+            self._end = existing.data_end
+            self._file = open(self.path, 'r+b')
+            self._file.seek(self._end)
+            self._file.truncate()
+        else:
+            self.entries = []
+            self._end = 0
+            self._file = open(self.path, 'wb')
+    
+    def discard_after(self, frame_count):
+        """Drop keyframes after frame_count from the index (a run resumed from there); their bytes stay in the file"""
+        with self._lock:
+            self.entries = [e for e in self.entries if e['frame'] <= frame_count]
+    
+    def submit(self, raid, event, frame_count, image):
+        """Queue one keyframe; after close() it is written synchronously"""
+        if self._closed:
+            with self._lock:
+                self._open(append=True)
+            self._encode(raid, event, frame_count, image)
+            self._finish()
+            return
+        self._slots.acquire()
+        future = self._pool.submit(self._encode, raid, event, frame_count, image)
+        future.add_done_callback(lambda f: self._done(f, raid, event, frame_count))
+    
+    def _done(self, future, raid, event, frame_count):
+        """Release the queue slot and record any other error, which would otherwise vanish with the future"""
+        self._slots.release()
+        error = future.exception()
+        if error is not None:
+            self.failed.append(f"raid {raid} {event} (frame {frame_count}): {error!r}")
+    
+    def _encode(self, raid, event, frame_count, image):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        try:
+            ok, encoded = cv2.imencode('.jpg', image, params)
+            thumbnail = b''
+            if ok and self.thumbnail_width:
+                height, width = image.shape[:2]
+                if width > self.thumbnail_width:
+                    size = (self.thumbnail_width, max(1, round(height * self.thumbnail_width / width)))
+                    image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+                ok, thumbnail = cv2.imencode('.jpg', image, params)
+            if ok:
+                self.add_encoded(raid, event, frame_count, encoded.tobytes(), bytes(thumbnail))
+        except (OSError, cv2.error) as e:
+            self.failed.append(f"raid {raid} {event} (frame {frame_count}): {e}")
+            return
+        if not ok:
+            self.failed.append(f"raid {raid} {event} (frame {frame_count})")
+    
+    def add_encoded(self, raid, event, frame_count, image_bytes, thumbnail_bytes=b''):
+        """Append an already encoded keyframe"""
+        meta = json.dumps({'raid': raid, 'event': event, 'frame': frame_count}).encode()
+        with self._lock:
+            offset = self._end + _RECORD.size + len(meta)
+            self._file.write(_RECORD.pack(_RECORD_MAGIC, len(meta), len(image_bytes), len(thumbnail_bytes)))
+            self._file.write(meta)
+            self._file.write(image_bytes)
+            self._file.write(thumbnail_bytes)
+            self._end = offset + len(image_bytes) + len(thumbnail_bytes)
+            self.entries.append({'raid': raid, 'event': event, 'frame': frame_count,
+                                 'offset': offset, 'size': len(image_bytes),
+                                 'thumb_offset': offset + len(image_bytes), 'thumb_size': len(thumbnail_bytes)})
+    
+    def _finish(self):
+        with self._lock:
+            self.entries.sort(key=lambda e: (e['frame'], e['raid']))
+            index = {'version': CONTAINER_VERSION, 'info': self.info or {}, 'entries': self.entries}
+            self._file.write(json.dumps(index).encode())
+            self._file.write(_TRAILER.pack(self._end, _INDEX_MAGIC))
+            self._file.close()
+    
+    def close(self):
+        """Wait for all queued keyframes and write the index"""
+        if self._closed:
+            return
+        self._closed = True
+        self._pool.shutdown(wait=True)
+        self._finish()
+        for name in self.failed:
+            print(f"⚠ Failed to write keyframe: {name}")
+
+
+def merge_containers(path, sources, info=None):
+    """
+    Write a container with the keyframes of (container path, raid) pairs,
+    renumbering the raids 1, 2, ... in the given order.
+    """
+    opened = {}
+    with KeyframeWriter(path, workers=1, info=info) as writer:
+        for raid, (source, source_raid) in enumerate(sources, 1):
+            if source not in opened:
+                opened[source] = KeyframeContainer(source) if os.path.exists(source) else None
+            container = opened[source]
+            if container is None:
+                continue
+            for entry in container.entries:
+                if entry['raid'] == source_raid:
+                    writer.add_encoded(raid, entry['event'], entry['frame'],
+                                       container.read(entry), container.read(entry, thumbnail=True))
+    return path
+
+
+def pack_loose_keyframes(directory, path):
+    """Pack the raid_{n}_{event}_frame_{f}.jpg files of an older run into a container; returns the count"""
+    count = 0
+    with KeyframeWriter(path, workers=1) as writer:
+        for name in sorted(os.listdir(directory)):
+            match = _LOOSE_NAME.match(name)
+            if not match:
+                continue
+            with open(os.path.join(directory, name), 'rb') as f:
+                writer.add_encoded(int(match.group(1)), match.group(2), int(match.group(3)), f.read())
+            count += 1
+    return count
@@ -0,0 +1,92 @@
+"""
+Frame Overlay Rendering
+Static court overlay rendered once per frame size, plus deferred per-frame annotations
+"""
+
+import cv2
+import numpy as np
+
+
+class CourtOverlay:
+    """Court lines (play box, midline, baulk, bonus, end) pre-rendered into a single layer"""
+    
+    def __init__(self, court_dynamics):
+        self.court = court_dynamics
+        self._shape = None
+        self._layer = None
+        self._mask = None
+    
+    def _build(self, shape):
+        layer = np.zeros(shape, dtype=np.uint8)
+        court = self.court
+        
+        # Play area (works with any polygon)
+        box = court.play_box.astype(int)
+        cv2.polylines(layer, [box.reshape(-1, 1, 2)], True, (255, 255, 0), 2)
+        
+        lines = [
+            (court.midline, (0, 255, 255)),
+            (court.baulk_line, (0, 0, 255)),
+            (court.bonus_line, (0, 255, 0)),
+            (court.end_line, (255, 0, 255))
+        ]
+        for line, color in lines:
+            p1 = tuple(int(v) for v in line[0])
+            p2 = tuple(int(v) for v in line[1])
+            cv2.line(layer, p1, p2, color, 2)
+        
+        e1 = tuple(int(v) for v in court.end_line[0])
+        cv2.putText(layer, "END", e1, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 255), 2)
+        
+        self._layer = layer
+        self._mask = layer.any(axis=2, keepdims=True)
+        self._shape = shape
+    
+    def apply(self, frame):
+        """Blend the court layer into frame in place"""
+        if frame.shape != self._shape:
+            self._build(frame.shape)
+        np.copyto(frame, self._layer, where=self._mask)
+        return frame
+
+
+class FrameAnnotations:
+    """
+    Drawing operations recorded during post-processing.
+    
+    Nothing is drawn until render() is called, so headless runs only pay
+    for drawing on the frames that are actually saved as keyframes.
+    """
+    
+    __slots__ = ('ops',)
+    
+    def __init__(self):
+        self.ops = []
+    
+    def rect(self, p1, p2, color, thickness):
+        self.ops.append((0, p1, p2, color, thickness))
+    
+    def text(self, text, org, scale, color, thickness):
+        self.ops.append((1, text, org, scale, color, thickness))
+    
+    def keypoints(self, keypoints, radius, color):
+        self.ops.append((2, keypoints, radius, color))
+    
+    def circle(self, center, radius, color, thickness):
+        self.ops.append((3, center, radius, color, thickness))
+    
+    def render(self, frame):
+        """Draw all recorded operations onto frame in place"""
+        for op in self.ops:
+            kind = op[0]
+            if kind == 0:
+                cv2.rectangle(frame, op[1], op[2], op[3], op[4])
+            elif kind == 1:
+                cv2.putText(frame, op[1], op[2], cv2.FONT_HERSHEY_SIMPLEX, op[3], op[4], op[5])
+            elif kind == 2:
+                for kpt in op[1]:
+                    if kpt[0] > 0 and kpt[1] > 0:
+                        cv2.circle(frame, (int(kpt[0]), int(kpt[1])), op[2], op[3], -1)
+            else:
+                cv2.circle(frame, op[1], op[2], op[3], op[4])
+        return frame
@@ -0,0 +1,367 @@
+"""
+Staged Frame Pipeline
+Overlaps video decode, pose inference and raid post-processing using bounded queues
+"""
+
+import collections
+import queue
+import threading
+import time
+
+from extraction.profiler import NULL_PROFILER
+
+# Marks the end of the stream in a stage queue
+_END = object()
+
+
+class _StageError:
+    """Wraps an exception raised inside a worker stage"""
+    
+    def __init__(self, stage, error):
+        self.stage = stage
+        self.error = error
+
+
+class FramePipeline:
+    """
+    Runs decode and inference in background threads.
+    
+    decode thread  -> [decode queue] -> inference thread -> [result queue] -> consumer
+    
+    The consumer (post-processing, raid state, display) iterates the pipeline
+    on the calling thread, so cv2.imshow / cv2.waitKey stay on the main thread.
+    Both queues are bounded: a slow stage blocks the stage feeding it instead
+    of buffering the whole video in memory.
+    """
+    
+    def __init__(self, cap, infer_fn, queue_size=8, batch_size=1, start_frame=0):
+        """
+        Args:
+            cap: Opened cv2.VideoCapture
+            infer_fn: Callable([frame, ...], [frame_count, ...]) -> [results, ...],
+                one per frame; results may be None for frames that were skipped
+            queue_size: Capacity of each stage queue
+            batch_size: Maximum number of frames passed to infer_fn at once
+            start_frame: Frame number of the first decoded frame minus one
+        """
+        self.cap = cap
+        self.infer_fn = infer_fn
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.start_frame = start_frame
+        
+        self.decode_queue = queue.Queue(maxsize=queue_size)
+        self.result_queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._threads = []
+        # Set to a StageProfiler to time frame decoding
+        self.profiler = NULL_PROFILER
+        
+        # Queue depth samples taken by the consumer, one per frame
+        self._depth_totals = {'decode': 0, 'infer': 0}
+        self._depth_samples = 0
+    
+    def start(self):
+        self._threads = [
+            threading.Thread(target=self._decode_loop, name="pipeline-decode", daemon=True),
+            threading.Thread(target=self._infer_loop, name="pipeline-infer", daemon=True)
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+    
+    def stop(self):
+        """Stop all stages and wait for the worker threads to exit"""
+        self._stop.set()
+        for q in (self.decode_queue, self.result_queue):
+            self._drain(q)
+        for t in self._threads:
+            t.join(timeout=5)
+        self._threads = []
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+    
+    def __iter__(self):
+        """Yield (frame_count, frame, results) in decode order; results is None for skipped frames"""
+        while True:
+            item = self._get(self.result_queue)
+            if item is _END or item is None:
+                return
+            if isinstance(item, _StageError):
+                raise RuntimeError(f"Pipeline {item.stage} stage failed: {item.error}") from item.error
+            self._sample_depths()
+            yield item
+    
+    def _decode_loop(self):
+        frame_count = self.start_frame
+        try:
+            while not self._stop.is_set():
+                with self.profiler.start('decode'):
+                    ret, frame = self.cap.read()
+                if not ret:
+                    break
+                frame_count += 1
+                if not self._put(self.decode_queue, (frame_count, frame)):
+                    return
+        except Exception as e:
+            self._put(self.decode_queue, _StageError('decode', e))
+            return
+        self._put(self.decode_queue, _END)
+    
+    def _infer_loop(self):
+        finished = False
+        while not finished and not self._stop.is_set():
+            # Collect up to batch_size frames; a partial batch is flushed at end of stream
+            batch = []
+            tail = None
+            while len(batch) < self.batch_size:
+                item = self._get(self.decode_queue)
+                if item is None:
+                    return
+                if item is _END or isinstance(item, _StageError):
+                    tail = item
+                    finished = True
+                    break
+                batch.append(item)
+            
+            if batch:
+                try:
+                    batch_results = self.infer_fn([frame for _, frame in batch],
+                                                  [frame_count for frame_count, _ in batch])
+                except Exception as e:
+                    self._put(self.result_queue, _StageError('inference', e))
+                    return
+                for (frame_count, frame), results in zip(batch, batch_results):
+                    if not self._put(self.result_queue, (frame_count, frame, results)):
+                        return
+            
+            if tail is not None:
+                self._put(self.result_queue, tail)
+    
+    def _put(self, q, item):
+        """Blocking put that gives up once the pipeline is stopping"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _get(self, q):
+        """Blocking get; returns None if the pipeline is stopping"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+    
+    @staticmethod
+    def _drain(q):
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+    
+    def _sample_depths(self):
+        self._depth_totals['decode'] += self.decode_queue.qsize()
+        self._depth_totals['infer'] += self.result_queue.qsize()
+        self._depth_samples += 1
+    
+    def queue_depths(self):
+        """Current number of frames waiting in each queue"""
+        return {
+            'decode': self.decode_queue.qsize(),
+            'infer': self.result_queue.qsize()
+        }
+    
+    def average_depths(self):
+        """Average queue depths over all consumed frames"""
+        if not self._depth_samples:
+            return {'decode': 0.0, 'infer': 0.0}
+        return {k: v / self._depth_samples for k, v in self._depth_totals.items()}
+    
+    def bottleneck(self):
+        """
+        Name the slowest stage from average queue depths.
+        
+        A full decode queue means inference cannot keep up; a full result
+        queue means post-processing cannot keep up; both empty means the
+        consumer is always waiting on decode.
+        """
+        avg = self.average_depths()
+        full = 0.75 * self.queue_size
+        if avg['infer'] >= full:
+            return 'post-processing'
+        if avg['decode'] >= full:
+            return 'inference'
+        if avg['decode'] < 1 and avg['infer'] < 1:
+            return 'decode'
+        return 'balanced'
+    
+    def summary(self):
+        avg = self.average_depths()
+        return (f"Pipeline queues (avg/{self.queue_size}): decode={avg['decode']:.1f} "
+                f"infer={avg['infer']:.1f} | bottleneck: {self.bottleneck()}")
+
+
+class FreshFrameBuffer:
+    """
+    Decode queue of a live pipeline.
+    
+    put() never blocks the capture thread. get() returns the oldest frame
+    that can still be processed within max_age seconds of its capture,
+    allowing service_time seconds (set by the consumer) for processing;
+    older frames, and the oldest frames beyond maxlen, are dropped. The
+    newest frame and the end-of-stream and error markers are never dropped.
+    """
+    
+    def __init__(self, max_age, maxlen):
+        self.max_age = max_age
+        self.maxlen = max(1, maxlen)
+        self.service_time = 0.0
+        self.dropped = 0
+        self._items = collections.deque()  # (capture time, item)
+        self._ready = threading.Condition()
+    
+    def put(self, item, timeout=None):
+        with self._ready:
+            self._items.append((time.monotonic(), item))
+            while len(self._items) > self.maxlen and isinstance(self._items[0][1], tuple):
+                self._items.popleft()
+                self.dropped += 1
+            self._ready.notify()
+    
+    def get(self, timeout=None):
+        with self._ready:
+            oldest = time.monotonic() - max(0.0, self.max_age - self.service_time)
+            while len(self._items) > 1 and isinstance(self._items[0][1], tuple) and self._items[0][0] < oldest:
+                self._items.popleft()
+                self.dropped += 1
+            if not self._ready.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            return self._items.popleft()[1]
+    
+    def get_nowait(self):
+        return self.get(timeout=0)
+    
+    def qsize(self):
+        return len(self._items)
+
+
+class LiveFramePipeline(FramePipeline):
+    """
+    FramePipeline for live sources (camera index, stream URL).
+    
+    The capture thread reads frames as fast as the source delivers them and
+    never waits for inference. Frames that could no longer be processed
+    within latency_budget seconds of capture, given the recent inference
+    time, are dropped (FreshFrameBuffer), so under load the pipeline skips
+    frames instead of falling further behind. Frame numbers count
+    every captured frame, so dropped frames leave gaps and times derived
+    from frame numbers stay true to the source.
+    
+    realtime=True replays a video file at its native frame rate as a local
+    stand-in for a live source.
+    """
+    
+    def __init__(self, cap, infer_fn, fps, latency_budget=0.5, realtime=False, queue_size=2):
+        super().__init__(cap, self._timed_infer, queue_size=queue_size, batch_size=1)
+        self._infer = infer_fn
+        self.fps = fps
+        self.latency_budget = latency_budget
+        self.realtime = realtime
+        self.decode_queue = FreshFrameBuffer(latency_budget, int(latency_budget * fps) + 1)
+        self.frames_captured = 0
+        self.frames_consumed = 0
+        
+        # (frame_count, capture time) of captured frames, for capture-to-consumer latency
+        self._captured = collections.deque()
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+    
+    def __iter__(self):
+        for item in super().__iter__():
+            frame_count = item[0]
+            while self._captured and self._captured[0][0] < frame_count:
+                self._captured.popleft()
+            if self._captured and self._captured[0][0] == frame_count:
+                latency = time.monotonic() - self._captured.popleft()[1]
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+            self.frames_consumed += 1
+            yield item
+    
+    def _timed_infer(self, frames, frame_counts):
+        start = time.monotonic()
+        results = self._infer(frames, frame_counts)
+        # Smoothed inference time, reserved out of the latency budget when picking frames
+        buffer = self.decode_queue
+        buffer.service_time = 0.8 * buffer.service_time + 0.2 * (time.monotonic() - start)
+        return results
+    
+    def _decode_loop(self):
+        frame_count = self.start_frame
+        started = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                if self.realtime:
+                    delay = started + self.frames_captured / self.fps - time.monotonic()
+                    if delay > 0 and self._stop.wait(delay):
+                        return
+                with self.profiler.start('decode'):
+                    ret, frame = self.cap.read()
+                if not ret:
+                    break
+                frame_count += 1
+                self.frames_captured += 1
+                self._captured.append((frame_count, time.monotonic()))
+                self.decode_queue.put((frame_count, frame))
+        except Exception as e:
+            self._put(self.decode_queue, _StageError('decode', e))
+            return
+        self._put(self.decode_queue, _END)
+    
+    def summary(self):
+        average = self._latency_total / self.frames_consumed if self.frames_consumed else 0.0
+        return (f"Live: {self.frames_consumed}/{self.frames_captured} frames processed, "
+                f"{self.decode_queue.dropped} dropped over the {self.latency_budget:.2f}s latency budget | "
+                f"latency avg {average * 1000:.0f}ms, max {self._latency_max * 1000:.0f}ms")
+
+
+class CachedFrames:
+    """
+    Frame source replaying a DetectionCache without decoding the video.
+    
+    Iterates like FramePipeline but yields frame=None, so it is only usable
+    when nothing is displayed; keyframes are read from the video on demand.
+    """
+    
+    def __init__(self, cache, start_frame=0):
+        self.cache = cache
+        self.start_frame = start_frame
+        self.frames_replayed = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+    
+    def __iter__(self):
+        for frame_count in range(self.start_frame + 1, self.cache.num_frames + 1):
+            self.frames_replayed += 1
+            yield frame_count, None, self.cache.get(frame_count)
+    
+    def queue_depths(self):
+        return {'decode': 0, 'infer': 0}
+    
+    def summary(self):
+        return f"Replayed {self.frames_replayed} frames from {self.cache.path} (no decode, no inference)"
@@ -0,0 +1,179 @@
+"""
+Stage Profiler
+Opt-in per-stage timings of an extraction run, reported as JSON and on the console
+"""
+
+import json
+import os
+import threading
+import time
+from array import array
+
+import numpy as np
+
+# Report order; other stage names are accepted and listed after these
+STAGES = ('decode', 'inference', 'geometry', 'tracking', 'raid_state', 'overlay', 'keyframes', 'display')
+
+
+class _Timer:
+    """One running stage; stop() records its exclusive time"""
+    
+    __slots__ = ('profiler', 'stage', 'stack', 'nested', 'started')
+    
+    def __init__(self, profiler, stage, stack):
+        self.profiler = profiler
+        self.stage = stage
+        self.stack = stack
+        self.nested = 0.0
+        stack.append(self)
+        self.started = time.perf_counter()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+    
+    def stop(self):
+        elapsed = time.perf_counter() - self.started
+        self.stack.pop()
+        if self.stack:
+            self.stack[-1].nested += elapsed
+        self.profiler.add(self.stage, elapsed - self.nested)
+
+
+class _NullTimer:
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def stop(self):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullProfiler:
+    """Profiler stand-in while profiling is off: every call is a no-op"""
+    
+    enabled = False
+    
+    def start(self, stage):
+        return _NULL_TIMER
+    
+    def add(self, stage, seconds):
+        pass
+    
+    def frame(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class StageProfiler:
+    """
+    Wall-clock time per extraction stage.
+    
+    A stage is timed with `with profiler.start(stage):` on any thread, so a
+    stage that raises still records its time and leaves the nesting intact.
+    Timings are exclusive: a stage started while another runs on the same
+    thread (a keyframe write inside raid state logic) is only counted for
+    the inner stage.
+    Every sample is kept (8 bytes each) so percentiles are exact.
+    
+    frame() marks one processed frame; throughput is reported as frames per
+    second for every `interval` seconds of the run.
+    """
+    
+    enabled = True
+    
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self.samples = {stage: array('d') for stage in STAGES}
+        self.frames = 0
+        self.started = time.perf_counter()
+        self._timeline = []  # frames processed per interval
+        self._local = threading.local()
+    
+    def start(self, stage):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return _Timer(self, stage, stack)
+    
+    def add(self, stage, seconds):
+        samples = self.samples.get(stage)
+        if samples is None:
+            samples = self.samples.setdefault(stage, array('d'))
+        samples.append(seconds)
+    
+    def frame(self):
+        self.frames += 1
+        bucket = int((time.perf_counter() - self.started) / self.interval)
+        while len(self._timeline) <= bucket:
+            self._timeline.append(0)
+        self._timeline[bucket] += 1
+    
+    def report(self):
+        """Timings of every stage that ran, plus overall and per-interval throughput"""
+        wall = time.perf_counter() - self.started
+        stages = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            values = np.array(samples, dtype=np.float64)
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            total = float(values.sum())
+            stages[stage] = {
+                'count': len(values),
+                'total_s': round(total, 4),
+                'share': round(total / wall, 4) if wall > 0 else 0.0,
+                'mean_ms': round(1000 * total / len(values), 3),
+                'p50_ms': round(1000 * p50, 3),
+                'p90_ms': round(1000 * p90, 3),
+                'p99_ms': round(1000 * p99, 3),
+                'max_ms': round(1000 * values.max(), 3)
+            }
+        
+        # The last interval is usually partial
+        timeline = []
+        for i, frames in enumerate(self._timeline):
+            seconds = min(self.interval, wall - i * self.interval)
+            timeline.append(round(frames / seconds, 2) if seconds > 0 else 0.0)
+        
+        return {
+            'wall_seconds': round(wall, 3),
+            'frames': self.frames,
+            'fps': round(self.frames / wall, 2) if wall > 0 else 0.0,
+            'interval_seconds': self.interval,
+            'fps_timeline': timeline,
+            'stages': stages
+        }
+    
+    def summary(self, report=None):
+        report = report or self.report()
+        lines = [f"⏱ Profile: {report['frames']} frames in {report['wall_seconds']:.1f}s ({report['fps']:.1f} fps); "
+                 f"share of wall time, decode/inference overlap the rest"]
+        for stage, s in report['stages'].items():
+            lines.append(f"  {stage:<11} {s['total_s']:8.2f}s {100 * s['share']:5.1f}% | mean {s['mean_ms']:7.2f}ms "
+                         f"p50 {s['p50_ms']:7.2f} p90 {s['p90_ms']:7.2f} p99 {s['p99_ms']:7.2f} "
+                         f"max {s['max_ms']:7.2f} (n={s['count']})")
+        if report['fps_timeline']:
+            low, high = min(report['fps_timeline']), max(report['fps_timeline'])
+            lines.append(f"  fps per {report['interval_seconds']:g}s: min {low:.1f}, max {high:.1f}")
+        return "\n".join(lines)
+    
+    def save(self, path):
+        """Write the report as JSON; returns it"""
+        report = self.report()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        return report
@@ -0,0 +1,606 @@
+"""
+Raid State Machine
+Player baselines, raider lock, raid start/end and recovery driven by per-frame detections
+"""
+
+import numpy as np
+
+from analytics.raid_extractor import RaidMetricsExtractor
+from extraction.events import (BAULK_CROSSED, BONUS_CROSSED, LOST, RAID_END, RAID_START, RAIDER_LOST,
+                               RAIDER_RECOVERED, RETURNED, UNFINISHED, RaidEvent)
+from extraction.overlay import FrameAnnotations
+from extraction.profiler import NULL_PROFILER
+from extraction.tracks import PlayerTrack, TrackExpiry
+
+# Shoulders and hips: the most stable keypoints for a player's centre
+TORSO_KEYPOINTS = [5, 6, 11, 12]
+
+
+def _masked_mean(points, mask):
+    """Mean of the masked points of each row as (N, 2) float, plus the number of points used"""
+    counts = mask.sum(axis=1)
+    sums = (points * mask[..., None]).sum(axis=1, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts[:, None], counts
+
+
+class RaidParams:
+    """
+    Thresholds of the raid state machine.
+    
+    Frame counts are in video frames, including frames skipped by adaptive
+    inference (see RaidStateMachine.skip_frame), except history, which is in
+    inferred frames. Distances are in pixels.
+    """
+    
+    def __init__(self, baseline_frames=15, baseline_votes=11, cross_window=7, cross_votes=6,
+                 return_window=5, return_votes=4, max_missing=120, lost_player_frames=90,
+                 recovery_radius=400, new_track_radius=300, switch_radius=200,
+                 smoothing_alpha=0.7, far_smoothing_alpha=0.5, history=30, max_tracks=64):
+        # A player's baseline side is the majority of their first
+        # baseline_frames sides, if at least baseline_votes agree
+        self.baseline_frames = baseline_frames
+        self.baseline_votes = baseline_votes
+        # Raid starts: cross_votes of the last cross_window sides are across the midline
+        self.cross_window = cross_window
+        self.cross_votes = cross_votes
+        # Raid ends: return_votes of the last return_window sides are back on the baseline
+        self.return_window = return_window
+        self.return_votes = return_votes
+        # Raid is lost after the raider is missing this many frames
+        self.max_missing = max_missing
+        # Players not seen for this many frames are forgotten
+        self.lost_player_frames = lost_player_frames
+        # Raider recovery: search radius for known players across the midline,
+        # for new track ids, and the distance below which the raider id may switch
+        self.recovery_radius = recovery_radius
+        self.new_track_radius = new_track_radius
+        self.switch_radius = switch_radius
+        # Position smoothing weight of the new position (near / far players)
+        self.smoothing_alpha = smoothing_alpha
+        self.far_smoothing_alpha = far_smoothing_alpha
+        # Per-player history length
+        self.history = history
+        # Live tracks kept at most (None: no limit); beyond it the least
+        # recently seen tracks are dropped, those without a baseline side
+        # first. The raider and the defenders of an active raid are never evicted
+        self.max_tracks = max_tracks
+    
+    def as_dict(self):
+        return dict(self.__dict__)
+    
+    def __repr__(self):
+        return "RaidParams(" + ", ".join(f"{k}={v}" for k, v in self.__dict__.items()) + ")"
+
+
+class FrameGeometry:
+    """
+    Per-detection geometry of one frame, computed with array operations.
+    
+    Boxes are truncated to integer pixels like the rest of the tracking code.
+    The centre of a player is the torso mean (or the mean of all visible
+    keypoints) when at least 4 keypoints are visible, else the box centre.
+    Penetration candidates are the feet, every visible keypoint and the
+    bottom box corners; the deepest one is the player's position.
+    """
+    
+    def __init__(self, detections, court, p1, p2):
+        self.court = court
+        self.p1, self.p2 = p1, p2
+        
+        boxes = detections.boxes.astype(np.int64)
+        x1, y1, x2, y2 = boxes.T
+        kpts = detections.keypoints
+        self.boxes = boxes
+        self.box_centres = np.stack([(x1 + x2) // 2, (y1 + y2) // 2], axis=1)
+        
+        valid = kpts[..., 0] > 0
+        self.valid_mean, n_valid = _masked_mean(kpts, valid)
+        self.has_pose = n_valid >= 4
+        
+        torso = kpts[:, TORSO_KEYPOINTS]
+        torso_mean, n_torso = _masked_mean(torso, (torso[..., 0] > 0) & (torso[..., 1] > 0))
+        centres = self.box_centres.copy()
+        pose_centres = np.where((n_torso >= 2)[:, None], torso_mean, self.valid_mean)
+        centres[self.has_pose] = pose_centres[self.has_pose].astype(np.int64)
+        self.centres = centres
+        
+        # Small boxes are far from the camera
+        self.far = ((y2 - y1) < 80) | ((x2 - x1) < 40)
+        self.inside = court.inside_play_box(centres)
+        self.sides = self.side_of(centres)
+        
+        # Penetration candidates (feet, keypoints, corners), in tie-break order
+        feet = np.stack([(x1 + x2) // 2, y2], axis=1)
+        corners = np.stack([np.stack([x1, y2], axis=1), np.stack([x2, y2], axis=1), feet], axis=1)
+        candidates = np.concatenate([feet[:, None], kpts.astype(np.int64), corners], axis=1)
+        visible = (kpts[..., 0] > 0) & (kpts[..., 1] > 0)
+        depths = court.depths(candidates.reshape(-1, 2)).reshape(candidates.shape[:2])
+        depths[:, 1:1 + kpts.shape[1]][~visible] = -np.inf
+        # argmax keeps the first of equal depths, like a strict > scan would
+        deepest = depths.argmax(axis=1) if len(boxes) else np.zeros(0, np.int64)
+        self.deepest_points = candidates[np.arange(len(boxes)), deepest]
+    
+    def side_of(self, points):
+        """Side of the midline (sign of the cross product) for an (N, 2) array"""
+        return np.sign((self.p2[0] - self.p1[0]) * (points[:, 1] - self.p1[1]) -
+                       (self.p2[1] - self.p1[1]) * (points[:, 0] - self.p1[0]))
+    
+    def recovery_candidates(self):
+        """Centres (plain keypoint mean, no torso priority), play box membership and sides for raider recovery"""
+        centres = np.where(self.has_pose[:, None], self.valid_mean, self.box_centres).astype(np.int64)
+        return centres, self.court.inside_play_box(centres), self.side_of(centres)
+
+
+class RaidStateMachine:
+    """
+    Raid detection state for one video, updated one frame at a time.
+    
+    update() takes the FrameDetections of a frame, so the same logic runs
+    on live inference output and on detections replayed from a cache.
+    Drawing is recorded into a FrameAnnotations when one is passed; keyframe
+    events ('start', 'bonus', 'baulk', 'end', 'lost') are reported through
+    keyframe_fn(event, annotations).
+    
+    Set on_event to a callable to receive a RaidEvent (see extraction.events)
+    for every raid start, line crossing, raider recovery, raider loss and
+    raid end as it happens.
+    """
+    
+    def __init__(self, court_dynamics, fps, params=None, verbose=True):
+        self.court = court_dynamics
+        self.fps = fps
+        self.params = params or RaidParams()
+        self.verbose = verbose
+        self.metrics_extractor = RaidMetricsExtractor(court_dynamics, fps)
+        self.p1, self.p2 = tuple(court_dynamics.midline[0]), tuple(court_dynamics.midline[1])
+        
+        # Set to a distance in meters to report players near the midline
+        self.near_midline_m = None
+        
+        self.players = {}
+        self.players_in_frame = 0
+        # Players tracked on the last inferred frame, see skip_frame()
+        self.last_frame_players = set()
+        self.expiry = TrackExpiry(self.params.lost_player_frames)
+        # Set to a StageProfiler to time geometry, tracking and raid logic separately
+        self.profiler = NULL_PROFILER
+        # Set to a callable taking a RaidEvent
+        self.on_event = None
+        self.evicted_tracks = 0
+        self.raids = []
+        self.current_raid = None
+        self.raider_id = None
+        self.raid_active = False
+        self.missing_frames = 0
+        self.raider_locked = False
+        # Last known baseline side and position of the raider, see protected_tracks()
+        self.raider_side = None
+        self.raider_position = None
+        
+        # Player state handed over from a previous run (see seed())
+        self.seed_players = []
+        self.seed_until = 0
+    
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+    
+    def _keyframe(self, keyframe_fn, event, annotations):
+        if keyframe_fn is not None:
+            keyframe_fn(event, annotations)
+    
+    def _emit(self, event_type, frame_count, raid=None, raider_id=None, **data):
+        """Send a RaidEvent of the active raid (or the given one) to on_event"""
+        if self.on_event is None:
+            return
+        raid = raid or len(self.raids) + 1
+        raider_id = self.raider_id if raider_id is None else raider_id
+        timestamp = max(0, frame_count - 1) / self.fps if self.fps else 0.0
+        self.on_event(RaidEvent(event_type, frame_count, timestamp, raid, raider_id, data))
+    
+    def detections_near_midline(self, detections):
+        """
+        True if a detection inside the play box is within near_midline_m of the
+        midline. Uses no tracking state, so the inference stage can check a
+        frame before update() has caught up with it.
+        """
+        if self.near_midline_m is None or detections is None or not len(detections):
+            return False
+        geometry = FrameGeometry(detections, self.court, self.p1, self.p2)
+        centres = geometry.centres[geometry.inside]
+        return bool(np.any(self.court.depths(centres) < self.near_midline_m))
+    
+    def seed(self, seed_players, frame_count):
+        """
+        Hand over the player state ({tid: player}) of a previous run at
+        frame_count with no raid active. The tracker restarts with new ids,
+        so newly tracked players near a seed player inherit its history and
+        baseline instead of establishing a new one.
+        """
+        # Seeds not picked up before the lost-player timeout are dropped
+        self.seed_players = list(seed_players.values()) if seed_players else []
+        self.seed_until = frame_count + self.params.lost_player_frames
+    
+    def update(self, frame_count, detections, annotations=None, keyframe_fn=None):
+        """
+        Advance the raid state by one frame of detections.
+        
+        detections=None marks a frame the model skipped, see skip_frame().
+        
+        Returns True if a tracked player is across the midline or within
+        near_midline_m of it (only checked when near_midline_m is set).
+        """
+        if detections is None:
+            self.skip_frame(frame_count)
+            return False
+        if annotations is None:
+            annotations = FrameAnnotations()
+        p = self.params
+        
+        current_frame_players = set()
+        raider_detected_this_frame = False
+        near_midline = False
+        
+        # All per-detection geometry at once; the loop below only does the
+        # (order-dependent) tracking and raid state updates
+        with self.profiler.start('geometry'):
+            geometry = FrameGeometry(detections, self.court, self.p1, self.p2)
+        with self.profiler.start('tracking'):
+            ids = detections.ids.tolist()
+            
+            if len(detections):
+                boxes = geometry.boxes.tolist()
+                centres = geometry.centres.tolist()
+                inside = geometry.inside.tolist()
+                sides = geometry.sides.tolist()
+                far = geometry.far.tolist()
+                deepest_points = geometry.deepest_points.tolist()
+                confs = detections.conf.tolist()
+                
+                for i in range(len(detections)):
+                    x1, y1, x2, y2 = boxes[i]
+                    tid = ids[i]
+                    
+                    # FILTER: Only track players inside play box
+                    if not inside[i]:
+                        # Draw gray box for outside players
+                        annotations.rect((x1, y1), (x2, y2), (128, 128, 128), 1)
+                        annotations.text("OUT", (x1, y1-5), 0.4, (128, 128, 128), 1)
+                        continue  # Skip this player
+                    
+                    conf = confs[i]
+                    keypoints = detections.keypoints[i]
+                    cx, cy = centres[i]
+                    is_far_player = far[i]  # Small = far from camera
+                    
+                    current_frame_players.add(tid)
+                    side = sides[i]
+                    
+                    # Initialize or update player tracking
+                    player = self.players.get(tid)
+                    if player is None:
+                        player = self.players[tid] = self.new_track(frame_count)
+                    player.last_seen = frame_count
+                    self.expiry.touch(tid, frame_count)
+                    
+                    # Position smoothing (less aggressive for far players)
+                    if len(player) > 0:
+                        last_pos = player.last_position()
+                        alpha = p.far_smoothing_alpha if is_far_player else p.smoothing_alpha  # Less smoothing for far players
+                        smooth_cx = int(alpha * cx + (1 - alpha) * last_pos[0])
+                        smooth_cy = int(alpha * cy + (1 - alpha) * last_pos[1])
+                        cx, cy = smooth_cx, smooth_cy
+                    
+                    # Maximum penetration from ANY body part (feet, keypoints, box corners)
+                    max_penetration_point = deepest_points[i]
+                    
+                    if len(player) == 0:
+                        self.adopt_seed_player(player, max_penetration_point, frame_count)
+                    
+                    # Fixed-size history: the oldest frame is dropped once p.history are kept
+                    player.append(max_penetration_point[0], max_penetration_point[1], frame_count, keypoints, side, conf)
+                    
+                    # Determine baseline side
+                    if player.votes >= p.baseline_frames and player.baseline_side is None:
+                        most_common, votes = player.baseline_vote()
+                        if votes >= p.baseline_votes:
+                            player.baseline_side = most_common
+                            self._log(f"✓ Player {tid} baseline established: side={most_common}")
+                    
+                    # Raider locking - STRICT to prevent ID switching
+                    is_raider = False
+                    
+                    if self.raid_active and self.raider_locked and tid == self.raider_id:
+                        is_raider = True
+                        raider_detected_this_frame = True
+                    elif not self.raid_active:
+                        if player.baseline_side is not None and player.votes >= p.cross_window:
+                            opposite_count = p.cross_window - player.count_recent(p.cross_window, player.baseline_side)
+                            if opposite_count >= p.cross_votes:
+                                is_raider = True
+                                self._log(f"🎯 Raid detected! Player {tid} crossed midline (baseline={player.baseline_side}, current_side={side})")
+                    
+                    # Adaptive inference: anyone across or close to the midline keeps full resolution
+                    if self.near_midline_m is not None and not near_midline:
+                        baseline_side = player.baseline_side
+                        if baseline_side is not None and side != baseline_side:
+                            near_midline = True
+                        elif self.court.get_penetration_depth((cx, cy)) < self.near_midline_m:
+                            near_midline = True
+                    
+                    # Draw player with keypoints for ALL players
+                    if is_raider:
+                        annotations.rect((x1, y1), (x2, y2), (0, 255, 0), 3)
+                        annotations.text(f"RAIDER (ID:{tid}) LOCKED", (x1, y1-10), 0.7, (0, 255, 0), 2)
+                        
+                        if not self.raid_active:
+                            self.start_raid(tid, frame_count)
+                            raider_detected_this_frame = True
+                            # Save key frame: Raid Start
+                            self._keyframe(keyframe_fn, 'start', annotations)
+                            self._emit(RAID_START, frame_count)
+                        elif self.raider_id == tid:
+                            raider_detected_this_frame = True
+                            
+                            # Check and save bonus/baulk crossing
+                            if self.current_raid and not ('crossed_bonus' in self.current_raid and
+                                                          'crossed_baulk' in self.current_raid):
+                                crossed_baulk, crossed_bonus = self.court.crossed_lines((cx, cy))
+                                if crossed_bonus[0] and 'crossed_bonus' not in self.current_raid:
+                                    self.current_raid['crossed_bonus'] = True
+                                    self._keyframe(keyframe_fn, 'bonus', annotations)
+                                    self._emit(BONUS_CROSSED, frame_count)
+                                
+                                if crossed_baulk[0] and 'crossed_baulk' not in self.current_raid:
+                                    self.current_raid['crossed_baulk'] = True
+                                    self._keyframe(keyframe_fn, 'baulk', annotations)
+                                    self._emit(BAULK_CROSSED, frame_count)
+                        
+                        # Draw keypoints for raider
+                        if keypoints is not None:
+                            annotations.keypoints(keypoints, 3, (255, 0, 255))
+                    else:
+                        # Draw all other players with keypoints
+                        color_intensity = int(255 * min(conf * 2, 1.0))  # Boost visibility
+                        thickness = 2 if is_far_player else 1
+                        annotations.rect((x1, y1), (x2, y2), (color_intensity, 0, 0), thickness)
+                        annotations.text(f"ID:{tid} ({conf:.2f})", (x1, y1-5), 0.4, (color_intensity, 0, 0), 1)
+                        
+                        # Draw keypoints for ALL players
+                        if keypoints is not None:
+                            annotations.keypoints(keypoints, 2, (0, 255, 255))
+            
+            # Clean up lost players; only tracks that time out at this frame are visited
+            for tid in self.expiry.expired(frame_count):
+                del self.players[tid]
+            if p.max_tracks is not None and len(self.players) > p.max_tracks:
+                self.evict_tracks()
+        with self.profiler.start('raid_state'):
+            # Check if raider returned to baseline (immediate raid end)
+            if self.raid_active and self.raider_id in self.players:
+                raider = self.players[self.raider_id]
+                if raider.baseline_side is not None:
+                    if raider.votes >= p.return_window:
+                        baseline_count = raider.count_recent(p.return_window, raider.baseline_side)
+                        if baseline_count >= p.return_votes:
+                            self._log(f"🔙 Raider returned to baseline, ending raid (SUCCESS)")
+                            # Mark as successful return
+                            self.current_raid['returned_to_baseline'] = True
+                            # Save key frame: Raid End
+                            self._keyframe(keyframe_fn, 'end', annotations)
+                            self.end_raid(frame_count)
+            
+            # AGGRESSIVE RAIDER RECOVERY - Enhanced
+            if self.raid_active and not raider_detected_this_frame:
+                self.missing_frames += 1
+                
+                # Try to recover raider immediately
+                if len(detections) and self.raider_id in self.players:
+                    if len(self.players[self.raider_id]) > 0:
+                        last_raider_pos = self.players[self.raider_id].last_position()
+                        best_candidate = None
+                        min_distance = float('inf')
+                        
+                        centres, inside, sides = (a.tolist() for a in geometry.recovery_candidates())
+                        for i in range(len(detections)):
+                            tid = ids[i]
+                            
+                            # Only consider players inside play box
+                            if not inside[i]:
+                                continue
+                            
+                            cx, cy = centres[i]
+                            side = sides[i]
+                            
+                            # Check if on opposite side (potential raider)
+                            if tid in self.players and self.players[tid].baseline_side is not None:
+                                if side != self.players[tid].baseline_side:
+                                    dist = np.sqrt((cx - last_raider_pos[0])**2 + (cy - last_raider_pos[1])**2)
+                                    if dist < p.recovery_radius and dist < min_distance:
+                                        min_distance = dist
+                                        best_candidate = tid
+                            # Also check unknown players (new detections)
+                            elif tid not in self.players:
+                                dist = np.sqrt((cx - last_raider_pos[0])**2 + (cy - last_raider_pos[1])**2)
+                                if dist < p.new_track_radius and dist < min_distance:
+                                    min_distance = dist
+                                    best_candidate = tid
+                        
+                        # Recover immediately if found
+                        if best_candidate:
+                            # STRICT: Only switch if very close or same ID reappeared
+                            if min_distance < p.switch_radius or best_candidate == self.raider_id:
+                                self._log(f"⚡ Raider recovered: {self.raider_id} -> {best_candidate} (dist: {min_distance:.0f}px)")
+                                previous_id = self.raider_id
+                                self.raider_id = best_candidate
+                                self.missing_frames = 0
+                                raider_detected_this_frame = True
+                                self.raider_locked = True
+                                self._emit(RAIDER_RECOVERED, frame_count, previous_id=previous_id,
+                                           distance=float(min_distance))
+                
+                if self.missing_frames > 0 and self.raider_id in self.players:
+                    if len(self.players[self.raider_id]) > 0:
+                        last_pos = self.players[self.raider_id].last_position()
+                        annotations.circle((last_pos[0], last_pos[1]), 30, (0, 165, 255), 3)
+                        annotations.text(f"SEARCHING {self.missing_frames}", 
+                                         (last_pos[0]-50, last_pos[1]-40), 0.6, (0, 165, 255), 2)
+                
+                if self.missing_frames > p.max_missing:
+                    self._log(f"❌ Raider lost, ending raid")
+                    # Save key frame: Raid Lost
+                    self._keyframe(keyframe_fn, 'lost', annotations)
+                    self._emit(RAIDER_LOST, frame_count, missing_frames=self.missing_frames)
+                    self.end_raid(frame_count, LOST)
+            
+            # Remembered for protected_tracks(), in case the raider's track is dropped
+            raider = self.players.get(self.raider_id) if self.raid_active else None
+            if raider is not None and len(raider):
+                self.raider_position = raider.last_position()[:2]
+                if raider.baseline_side is not None:
+                    self.raider_side = raider.baseline_side
+            
+        self.players_in_frame = len(current_frame_players)
+        self.last_frame_players = current_frame_players
+        return near_midline
+    
+    def skip_frame(self, frame_count):
+        """
+        Advance the clock over a frame the model skipped (adaptive inference
+        while idle). Players tracked on the last inferred frame vote their
+        side again, so the baseline, crossing and return windows keep
+        counting video frames; nothing is tracked, no history is written and
+        no raid starts or ends until the next inferred frame.
+        """
+        for tid in self.last_frame_players:
+            player = self.players.get(tid)
+            if player is not None:
+                player.repeat_vote()
+        for tid in self.expiry.expired(frame_count):
+            del self.players[tid]
+        if self.raid_active and self.raider_id not in self.last_frame_players:
+            self.missing_frames += 1
+    
+    def finish(self, frame_count):
+        """End the raid still active at the end of the video"""
+        if self.raid_active:
+            self.end_raid(frame_count)
+    
+    def evict_tracks(self):
+        """
+        Drop the least recently seen tracks beyond max_tracks, never the
+        raider or a defender of the active raid. Tracks without a baseline
+        side go first: an established baseline cannot be rebuilt from a
+        track's later frames, so those are only dropped when no other track
+        is left to drop.
+        """
+        excess = len(self.players) - self.params.max_tracks
+        protected = self.protected_tracks()
+        candidates = [tid for tid in self.expiry.least_recent() if tid not in protected]
+        victims = [tid for tid in candidates if self.players[tid].baseline_side is None][:excess]
+        if len(victims) < excess:
+            victims += [tid for tid in candidates
+                        if self.players[tid].baseline_side is not None][:excess - len(victims)]
+        for tid in victims:
+            del self.players[tid]
+            self.expiry.discard(tid)
+        self.evicted_tracks += len(victims)
+    
+    def protected_tracks(self):
+        """
+        Ids of the raider and, while a raid is active, the defenders end_raid()
+        will report. While the raider's track is missing, the defenders of its
+        last known side and the tracks recovery may pick up near its last
+        known position are protected instead.
+        """
+        raider = self.players.get(self.raider_id)
+        protected = {self.raider_id} if raider is not None else set()
+        if not self.raid_active:
+            return protected
+        
+        if raider is not None and raider.baseline_side is not None:
+            raider_side = raider.baseline_side
+        else:
+            raider_side = self.raider_side
+        if raider_side is not None:
+            protected.update(tid for tid, track in self.players.items() if track.baseline_side == -raider_side)
+        
+        if raider is None and self.raider_position is not None:
+            rx, ry = self.raider_position
+            radius = self.params.recovery_radius
+            for tid, track in self.players.items():
+                if len(track):
+                    x, y, _ = track.last_position()
+                    if (x - rx) ** 2 + (y - ry) ** 2 < radius * radius:
+                        protected.add(tid)
+        return protected
+    
+    def new_track(self, frame_count):
+        """Empty PlayerTrack sized and voting with this machine's RaidParams"""
+        p = self.params
+        return PlayerTrack(p.history, frame_count, windows=(p.cross_window, p.return_window),
+                           prefix=p.baseline_frames)
+    
+    def adopt_seed_player(self, player, point, frame_count, max_distance=150):
+        """Give a newly tracked player the history of the nearest seed player, if one is close enough"""
+        if not self.seed_players or frame_count > self.seed_until:
+            return
+        
+        last_positions = [s.last_position() for s in self.seed_players]
+        distances = [np.hypot(x - point[0], y - point[1]) for x, y, _ in last_positions]
+        best = int(np.argmin(distances))
+        if distances[best] > max_distance:
+            return
+        
+        player.adopt(self.seed_players.pop(best))
+    
+    def start_raid(self, raider_id, frame):
+        self.raid_active = True
+        self.raider_id = raider_id
+        self.raider_locked = True
+        self.missing_frames = 0
+        self.raider_side = None
+        self.raider_position = None
+        
+        self.current_raid = {
+            'raider_id': raider_id,
+            'start_frame': frame,
+            'positions': [],
+            'defenders': {}
+        }
+        
+        self._log(f"🏃 Raid started - Raider {raider_id} LOCKED at frame {frame}")
+    
+    def end_raid(self, frame, outcome=None):
+        """Compute the metrics of the active raid; outcome defaults to returned or unfinished"""
+        if not self.current_raid:
+            return
+        if outcome is None:
+            outcome = RETURNED if self.current_raid.get('returned_to_baseline') else UNFINISHED
+        
+        all_players = self.players
+        self.current_raid['end_frame'] = frame
+        
+        # Track views, not copies: the metrics are computed right here, before the next append
+        if self.raider_id in all_players:
+            self.current_raid['positions'] = all_players[self.raider_id].positions
+        
+        raider_side = all_players[self.raider_id].baseline_side if self.raider_id in all_players else None
+        for tid, track in all_players.items():
+            if tid != self.raider_id and raider_side is not None and track.baseline_side is not None and track.baseline_side == -raider_side:
+                self.current_raid['defenders'][tid] = track.positions
+        
+        metrics = self.metrics_extractor.extract_raid_metrics(self.current_raid)
+        self.raids.append(metrics)
+        
+        success_status = "SUCCESS" if metrics.get('success', 0) == 1 else "INCOMPLETE"
+        self._log(f"✅ Raid ended ({success_status}) - Duration: {metrics['duration']:.2f}s, Max Penetration: {metrics['max_penetration']:.2f}m")
+        
+        raider_id = self.raider_id
+        self.raid_active = False
+        self.raider_id = None
+        self.raider_locked = False
+        self.current_raid = None
+        self.missing_frames = 0
+        self._emit(RAID_END, frame, raid=len(self.raids), raider_id=raider_id, outcome=outcome, metrics=metrics)
@@ -0,0 +1,100 @@
+"""
+Adaptive Inference Scheduler
+Runs cheap inference between raids and full-resolution inference around the midline
+"""
+
+import threading
+
+
+class InferenceBudget:
+    """One inference configuration: frame stride, image size and detection cap"""
+    
+    def __init__(self, name, stride, imgsz, max_det):
+        self.name = name
+        self.stride = stride
+        self.imgsz = imgsz
+        self.max_det = max_det
+    
+    def __repr__(self):
+        return f"{self.name}(stride={self.stride}, imgsz={self.imgsz}, max_det={self.max_det})"
+
+
+class AdaptiveScheduler:
+    """
+    Chooses the inference budget for each batch of frames.
+    
+    The post-processing stage calls update() after every processed frame with
+    the current raid state; the inference stage calls plan() before running
+    the model. While idle, only every `stride`-th frame is inferred at a lower
+    resolution. The scheduler escalates to full resolution on every frame as
+    soon as a raid is active or any tracked player is near (or across) the
+    midline, and stays escalated for `cooldown_seconds` afterwards so that
+    short dips near the line do not flap between budgets.
+    
+    Post-processing runs up to a queue and a batch of frames behind
+    inference, which would leave the first frames of a midline approach
+    strided. The inference stage therefore also calls observe() with whether
+    anyone is near the midline on the newest frame it inferred.
+    """
+    
+    # A player closer than this to the midline may be about to cross it
+    NEAR_MIDLINE_M = 1.0
+    
+    def __init__(self, fps, full, idle=None, cooldown_seconds=2.0, start_frame=0):
+        self.full = full
+        self.idle = idle or InferenceBudget('idle', stride=3, imgsz=960, max_det=25)
+        self.cooldown_frames = int(cooldown_seconds * (fps or 30))
+        
+        # Start escalated so the first seconds are seen at full resolution
+        self._escalated_until = start_frame + self.cooldown_frames
+        self._last_frame = start_frame
+        # update() and observe() run on different threads
+        self._lock = threading.Lock()
+        self.frames_full = 0
+        self.frames_idle = 0
+        self.frames_skipped = 0
+    
+    def update(self, frame_count, raid_active, near_midline):
+        """Record the raid state after post-processing frame_count"""
+        self._last_frame = frame_count
+        if raid_active or near_midline:
+            self._escalate(frame_count)
+    
+    def observe(self, frame_count, near_midline):
+        """Record whether anyone is near the midline on frame_count, as soon as it is inferred"""
+        if near_midline:
+            self._escalate(frame_count)
+    
+    def _escalate(self, frame_count):
+        with self._lock:
+            self._escalated_until = max(self._escalated_until, frame_count + self.cooldown_frames)
+    
+    def is_escalated(self):
+        return self._last_frame < self._escalated_until
+    
+    def plan(self, frame_counts):
+        """
+        Pick the budget for a batch of frames.
+        
+        Returns (budget, selected) where selected lists the indices into
+        frame_counts that should be inferred; the rest are skipped.
+        """
+        budget = self.full if self.is_escalated() else self.idle
+        if budget.stride <= 1:
+            selected = list(range(len(frame_counts)))
+        else:
+            selected = [i for i, f in enumerate(frame_counts) if f % budget.stride == 0]
+        
+        if budget is self.full:
+            self.frames_full += len(selected)
+        else:
+            self.frames_idle += len(selected)
+        self.frames_skipped += len(frame_counts) - len(selected)
+        return budget, selected
+    
+    def summary(self):
+        total = self.frames_full + self.frames_idle + self.frames_skipped
+        if not total:
+            return "Adaptive inference: no frames scheduled"
+        return (f"Adaptive inference: full={self.frames_full} idle={self.frames_idle} "
+                f"skipped={self.frames_skipped} ({self.frames_skipped / total * 100:.0f}% of frames not inferred)")
@@ -0,0 +1,228 @@
+"""
+Player Tracks
+Fixed-size per-player history in NumPy ring buffers with running side votes
+"""
+
+import heapq
+from collections import OrderedDict
+
+import numpy as np
+
+from extraction.detections import NUM_KEYPOINTS
+
+
+class PlayerTrack:
+    """
+    Recent history of one tracked player.
+    
+    The last `capacity` entries (position, keypoints, midline side and
+    confidence per processed frame) live in preallocated buffers of twice
+    that length: every entry is written at i and i + capacity, so the
+    history is always one contiguous slice and positions / sides are
+    returned as views without copying. Views are only valid until the next
+    append().
+    
+    Side votes are kept as running counters over their own ring of the
+    last `capacity` votes: for every window in `windows` the count of each
+    side among the last `window` votes, and for the oldest `prefix` votes
+    the count used for the baseline vote. append() adds one vote;
+    repeat_vote() adds one for a frame without inference, so the windows
+    keep counting video frames while no history entry is written.
+    """
+    
+    __slots__ = ('capacity', 'baseline_side', 'last_seen', '_positions', '_keypoints', '_sides',
+                 '_confidence', '_start', '_size', '_votes', '_vote_start', '_vote_size',
+                 '_window_counts', '_prefix', '_prefix_counts')
+    
+    def __init__(self, capacity, last_seen=0, windows=(), prefix=0):
+        self.capacity = capacity
+        self.baseline_side = None
+        self.last_seen = last_seen
+        
+        self._positions = np.zeros((2 * capacity, 3), np.int32)          # x, y, frame_count
+        self._keypoints = np.zeros((2 * capacity, NUM_KEYPOINTS, 2), np.float32)
+        self._sides = np.zeros(2 * capacity, np.int8)                   # -1, 0 (on the line), 1
+        self._confidence = np.zeros(2 * capacity, np.float32)
+        self._start = 0
+        self._size = 0
+        
+        self._votes = np.zeros(2 * capacity, np.int8)
+        self._vote_start = 0
+        self._vote_size = 0
+        # Side counts are indexed by side + 1
+        self._window_counts = {w: [0, 0, 0] for w in windows}
+        self._prefix = prefix
+        self._prefix_counts = [0, 0, 0]
+    
+    def __len__(self):
+        return self._size
+    
+    def __repr__(self):
+        return f"PlayerTrack(len={self._size}, baseline_side={self.baseline_side}, last_seen={self.last_seen})"
+    
+    @property
+    def positions(self):
+        """(N, 3) int32 view of x, y, frame_count, oldest first"""
+        return self._positions[self._start:self._start + self._size]
+    
+    @property
+    def keypoints(self):
+        return self._keypoints[self._start:self._start + self._size]
+    
+    @property
+    def sides(self):
+        return self._sides[self._start:self._start + self._size]
+    
+    @property
+    def confidence(self):
+        return self._confidence[self._start:self._start + self._size]
+    
+    def last_position(self):
+        """(x, y, frame_count) of the newest entry as Python ints"""
+        return tuple(self._positions[self._start + self._size - 1].tolist())
+    
+    @property
+    def votes(self):
+        """Number of side votes held (at most capacity)"""
+        return self._vote_size
+    
+    def _vote_at(self, i):
+        return int(self._votes[self._vote_start + i])
+    
+    def _vote(self, side):
+        s = side + 1
+        n = self._vote_size + 1  # votes held before the oldest is dropped
+        full = self._vote_size == self.capacity
+        oldest = self._vote_at(0) + 1 if full else None
+        
+        for w, counts in self._window_counts.items():
+            counts[s] += 1
+            if n > w:
+                counts[self._vote_at(n - 1 - w) + 1] -= 1
+            elif full:
+                counts[oldest] -= 1
+        
+        if self._prefix > 0:
+            counts = self._prefix_counts
+            if n <= self._prefix:
+                counts[s] += 1
+            if full:
+                counts[oldest] -= 1
+                if self._prefix < n:
+                    counts[self._vote_at(self._prefix) + 1 if self._prefix < self._vote_size else s] += 1
+        
+        i = (self._vote_start + self._vote_size) % self.capacity
+        self._votes[i] = side
+        self._votes[i + self.capacity] = side
+        if full:
+            self._vote_start = (self._vote_start + 1) % self.capacity
+        else:
+            self._vote_size += 1
+    
+    def append(self, x, y, frame_count, keypoints, side, conf):
+        """Add one frame and its side vote; the oldest entry is dropped once capacity is reached"""
+        self._vote(side)
+        full = self._size == self.capacity
+        i = (self._start + self._size) % self.capacity
+        for buffer, value in ((self._positions, (x, y, frame_count)), (self._keypoints, keypoints),
+                              (self._sides, side), (self._confidence, conf)):
+            buffer[i] = value
+            buffer[i + self.capacity] = value
+        
+        if full:
+            self._start = (self._start + 1) % self.capacity
+        else:
+            self._size += 1
+    
+    def repeat_vote(self):
+        """Vote the newest side again, for a frame the player was not inferred on"""
+        if self._vote_size:
+            self._vote(self._vote_at(self._vote_size - 1))
+    
+    def count_recent(self, window, side):
+        """How many of the last `window` votes equal side (window must be one of `windows`)"""
+        return self._window_counts[window][side + 1]
+    
+    def baseline_vote(self):
+        """Most common side among the oldest `prefix` votes and its count; ties go to the side seen first"""
+        counts = self._prefix_counts
+        best = max(counts)
+        winners = [s - 1 for s in range(3) if counts[s] == best]
+        if len(winners) > 1:
+            prefix = self._votes[self._vote_start:self._vote_start + min(self._prefix, self._vote_size)]
+            winners = [next(s for s in prefix.tolist() if s in winners)]
+        return winners[0], best
+    
+    def adopt(self, other):
+        """Take over the history and baseline of another track (seed handover); self must be empty"""
+        for (x, y, frame_count), keypoints, side, conf in zip(other.positions.tolist(), other.keypoints,
+                                                              other.sides.tolist(), other.confidence):
+            self.append(x, y, frame_count, keypoints, side, conf)
+        self.baseline_side = other.baseline_side
+
+
+class TrackExpiry:
+    """
+    Expiry index of live tracks.
+    
+    Tracks are bucketed by the frame at which they expire (a timing wheel
+    keyed by frame, with a heap of the occupied slots), so expired() only
+    visits tracks that actually time out instead of scanning every track.
+    Seeing a track again moves it to a later slot in O(1). The same index
+    keeps tracks in least-recently-seen order for eviction.
+    """
+    
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._slots = {}      # expiry frame -> set of track ids
+        self._heap = []       # expiry frames with a slot
+        self._expires = {}    # track id -> expiry frame
+        self._recent = OrderedDict()  # track ids, least recently seen first
+    
+    def __len__(self):
+        return len(self._expires)
+    
+    def touch(self, tid, frame_count):
+        """Record that tid was seen at frame_count; it expires after `timeout` unseen frames"""
+        expires = frame_count + self.timeout + 1
+        old = self._expires.get(tid)
+        if old != expires:
+            if old is not None:
+                self._remove_from_slot(tid, old)
+            slot = self._slots.get(expires)
+            if slot is None:
+                slot = self._slots[expires] = set()
+                heapq.heappush(self._heap, expires)
+            slot.add(tid)
+            self._expires[tid] = expires
+        self._recent[tid] = frame_count
+        self._recent.move_to_end(tid)
+    
+    def discard(self, tid):
+        expires = self._expires.pop(tid, None)
+        if expires is not None:
+            self._remove_from_slot(tid, expires)
+            del self._recent[tid]
+    
+    def _remove_from_slot(self, tid, expires):
+        slot = self._slots[expires]
+        slot.discard(tid)
+        if not slot:
+            # Its heap entry is skipped when popped
+            del self._slots[expires]
+    
+    def expired(self, frame_count):
+        """Remove and return the ids of tracks unseen for more than `timeout` frames at frame_count"""
+        expired = []
+        while self._heap and self._heap[0] <= frame_count:
+            slot = self._slots.pop(heapq.heappop(self._heap), None)
+            if slot:
+                for tid in sorted(slot):
+                    del self._expires[tid]
+                    del self._recent[tid]
+                    expired.append(tid)
+        return expired
+    
+    def least_recent(self):
+        """Track ids from least to most recently seen"""
+        return iter(self._recent)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Batch Raid Extraction
+Processes a directory or glob of match videos concurrently in a process pool
+"""
+
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from court.simplified_court import SimplifiedCourtDynamics
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+
+def find_videos(inputs):
+    """Expand directories and glob patterns into a sorted list of video files"""
+    videos = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = [os.path.join(item, f) for f in os.listdir(item)]
+        else:
+            matches = glob.glob(item)
+        videos.extend(m for m in matches if m.lower().endswith(VIDEO_EXTENSIONS))
+    return sorted(set(videos))
+
+
+def has_court_config(video_path):
+    try:
+        SimplifiedCourtDynamics.load_from_config(video_path)
+        return True
+    except (ValueError, KeyError) as e:
+        print(f"⚠ Skipping {video_path}: {e}")
+        return False
+
+
+def limit_threads(threads):
+    """Cap intra-op threads so several workers do not oversubscribe the CPU"""
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+    
+    import cv2
+    cv2.setNumThreads(threads)
+    
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def extract_video(video_path, output_dir, options):
+    """Worker: run DataExtractor on one video and write its raid metrics CSV"""
+    from scripts.data_extract import DataExtractor
+    
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    output_path = os.path.join(output_dir, f"{video_name}_raid_metrics.csv")
+    summary = {'video': video_path, 'output': output_path, 'frames': 0, 'raids': 0, 'seconds': 0.0, 'error': None,
+               'resumed_from': None}
+    
+    start = time.perf_counter()
+    try:
+        # Keyframes go to one container per video, so concurrent videos do not collide
+        extractor = DataExtractor(video_path)
+        # Raids are appended as they end; with checkpoints a pre-empted batch resumes where it stopped
+        raids = extractor.extract_data(display=False, csv_path=output_path, **options)
+        
+        summary['frames'] = extractor.frames_processed
+        summary['raids'] = len(raids)
+        summary['resumed_from'] = extractor.resumed_from
+    except Exception as e:
+        summary['error'] = str(e)
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def print_summary(summaries, wall_seconds, workers):
+    print("\n" + "=" * 70)
+    print("📊 BATCH EXTRACTION SUMMARY")
+    print("=" * 70)
+    
+    total_frames = 0
+    for s in summaries:
+        name = os.path.basename(s['video'])
+        if s['error']:
+            print(f"❌ {name}: {s['error']}")
+            continue
+        fps = s['frames'] / s['seconds'] if s['seconds'] > 0 else 0
+        total_frames += s['frames']
+        resumed = f" (resumed at frame {s['resumed_from']})" if s['resumed_from'] is not None else ""
+        print(f"✓ {name}: {s['raids']} raids | {s['frames']} frames in {s['seconds']:.1f}s ({fps:.1f} FPS){resumed}")
+    
+    failed = sum(1 for s in summaries if s['error'])
+    print("-" * 70)
+    print(f"Videos: {len(summaries) - failed} done, {failed} failed | Workers: {workers}")
+    print(f"Wall time: {wall_seconds:.1f}s | Total frames: {total_frames} | "
+          f"Throughput: {total_frames / wall_seconds if wall_seconds > 0 else 0:.1f} FPS")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract raid metrics from many match videos in parallel")
+    parser.add_argument("inputs", nargs="+", help="Video files, directories or glob patterns")
+    parser.add_argument("--workers", type=int, default=2, help="Number of videos processed at once")
+    parser.add_argument("--threads-per-worker", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="torch/OpenCV threads per worker")
+    parser.add_argument("--output-dir", default=os.path.join(ROOT_DIR, "data", "extracted"),
+                        help="Where *_raid_metrics.csv files are written")
+    parser.add_argument("--batch-size", type=int, default=1, help="Frames per pose inference batch")
+    parser.add_argument("--adaptive", action="store_true", help="Cheaper inference between raids")
+    parser.add_argument("--crop-court", action="store_true", help="Only run pose inference on the play box region")
+    parser.add_argument("--cache", action="store_true", help="Replay cached detections when valid (see data_extract.py)")
+    parser.add_argument("--jpeg-quality", type=int, default=95, help="JPEG quality of saved keyframes (0-100)")
+    parser.add_argument("--checkpoint-every", type=float, default=60.0, metavar="SECONDS",
+                        help="Save a resumable checkpoint per video every this many seconds of video (0 disables)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue every video from its last checkpoint; finished videos are not processed again")
+    args = parser.parse_args()
+    
+    videos = [v for v in find_videos(args.inputs) if has_court_config(v)]
+    if not videos:
+        print("❌ No videos with a court configuration found")
+        print("Run: python court/setup_play_area.py <video>")
+        sys.exit(1)
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    options = {'batch_size': args.batch_size, 'adaptive': args.adaptive, 'crop_to_court': args.crop_court,
+               'use_cache': args.cache, 'jpeg_quality': args.jpeg_quality,
+               'checkpoint_seconds': args.checkpoint_every, 'resume': args.resume}
+    workers = max(1, min(args.workers, len(videos)))
+    
+    print(f"🎬 Processing {len(videos)} videos with {workers} workers x {args.threads_per_worker} threads")
+    
+    start = time.perf_counter()
+    summaries = []
+    # spawn: torch and OpenCV thread pools do not survive fork reliably
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=limit_threads, initargs=(args.threads_per_worker,)) as pool:
+        futures = {pool.submit(extract_video, v, args.output_dir, options): v for v in videos}
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            status = "❌ failed" if summary['error'] else f"✅ {summary['raids']} raids"
+            print(f"{status}: {os.path.basename(summary['video'])} ({summary['seconds']:.1f}s)")
+    
+    summaries.sort(key=lambda s: s['video'])
+    print_summary(summaries, time.perf_counter() - start, workers)
+
+
+if __name__ == "__main__":
+    main()
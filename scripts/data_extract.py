@@ -5,65 +5,215 @@ Extracts basic raid metrics from video for player ranking
 """
 
 import cv2
-import numpy as np
+import queue
 import sys
 import os
+import threading
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from ultralytics import YOLO
 from court.simplified_court import SimplifiedCourtDynamics
-from analytics.raid_extractor import RaidMetricsExtractor
+from extraction.pipeline import CachedFrames, FramePipeline, LiveFramePipeline
+from extraction.checkpoint import CHECKPOINT_DIR, ExtractionCheckpoint, checkpoint_path
+from extraction.detections import DetectionCache, FrameDetections, run_fingerprint
+from extraction.events import RAID_END, EventLog
+from extraction.inference import CropRegion, PoseTracker
+from extraction.scheduler import AdaptiveScheduler, InferenceBudget
+from extraction.overlay import CourtOverlay, FrameAnnotations
+from extraction.keyframes import KeyframeWriter, container_path
+from extraction.profiler import NULL_PROFILER, StageProfiler
+from extraction.raid_state import RaidStateMachine
 import json
 
+def capture_source(source):
+    """cv2.VideoCapture argument for a source string: camera index, stream URL or file path"""
+    return int(source) if str(source).isdigit() else source
+
+
 class DataExtractor:
-    def __init__(self, video_path):
+    def __init__(self, video_path, raid_params=None, live=False, rasters=False, config_file=None):
+        """
+        video_path is a video file, or with live=True any cv2.VideoCapture
+        source (camera index, stream URL, or a file replayed in real time).
+        The court configuration is looked up by the same string, in
+        config_file if given, else config/play_area.json. rasters=True
+        answers court queries from per-pixel maps (see enable_rasters).
+        """
         self.video_path = video_path
+        self.live = live
         
         # Check if video exists
-        if not os.path.exists(video_path):
+        if not live and not os.path.exists(video_path):
             raise FileNotFoundError(f"Video not found: {video_path}")
         
         model_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "yolov8n-pose.pt")
-        self.model = YOLO(model_path)
+        self.pose_tracker = PoseTracker(model_path)
         
         # Load simplified court dynamics
         try:
-            self.court_dynamics = SimplifiedCourtDynamics.load_from_config(video_path)
+            self.court_dynamics = SimplifiedCourtDynamics.load_from_config(video_path, config_file)
         except ValueError as e:
             raise ValueError(f"{e}\nRun: python court/setup_play_area.py")
         
         # Get midline from court dynamics
         self.p1, self.p2 = tuple(self.court_dynamics.midline[0]), tuple(self.court_dynamics.midline[1])
         
-        self.cap = cv2.VideoCapture(video_path)
+        self.cap = cv2.VideoCapture(capture_source(video_path))
         if not self.cap.isOpened():
             raise RuntimeError(f"Failed to open video: {video_path}")
         
         self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        if not self.fps or self.fps <= 0:
+            # Some cameras and streams do not report a frame rate
+            self.fps = 30.0
+            print(f"⚠ Source does not report its FPS, assuming {self.fps:.0f}")
+        self.frame_shape = (int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
         total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        print(f"✓ Video loaded: {total_frames} frames @ {self.fps:.2f} FPS")
+        if live and total_frames <= 0:
+            print(f"✓ Live source opened: {self.frame_shape[1]}x{self.frame_shape[0]} @ {self.fps:.2f} FPS")
+        else:
+            print(f"✓ Video loaded: {total_frames} frames @ {self.fps:.2f} FPS")
         
-        self.metrics_extractor = RaidMetricsExtractor(self.court_dynamics, self.fps)
+        # Off by default: per-frame court queries are negligible next to pose inference
+        if rasters:
+            self.court_dynamics.enable_rasters(self.frame_shape)
         
-        self.raids = []
-        self.current_raid = None
-        self.raider_id = None
-        self.raid_active = False
-        self.missing_frames = 0
-        self.max_missing = 60
-        self.raider_locked = False
+        # Player tracking and raid detection (thresholds in raid_params)
+        self.raid_state = RaidStateMachine(self.court_dynamics, self.fps, raid_params)
+        self.metrics_extractor = self.raid_state.metrics_extractor
+        self.court_overlay = CourtOverlay(self.court_dynamics)
+        self.scheduler = None
+        self.batch_size = 1
+        self.frames_processed = 0
+        # Replaced by a StageProfiler for profiled runs (see extract_data)
+        self.profiler = NULL_PROFILER
+        # Set by stop() to end a running extract_data
+        self.stop_requested = threading.Event()
         
         # Key frames directory
         self.keyframes_dir = os.path.join("data", "keyframes")
         os.makedirs(self.keyframes_dir, exist_ok=True)
+        # Created by extract_data; keyframes are appended synchronously without one
+        self.keyframe_writer = None
+        
+        # Cached per-frame detections (see extract_data)
+        self.cache_dir = os.path.join("data", "cache")
+        self.detection_cache = None
+        
+        # Resumable run state (see extract_data)
+        self.checkpoint_dir = CHECKPOINT_DIR
+        self.resumed_from = None
+    
+    @property
+    def raids(self):
+        return self.raid_state.raids
     
-    def point_side(self, x, y):
-        return np.sign((self.p2[0] - self.p1[0]) * (y - self.p1[1]) - 
-                      (self.p2[1] - self.p1[1]) * (x - self.p1[0]))
+    @property
+    def raid_active(self):
+        return self.raid_state.raid_active
     
-    def extract_data(self, display=True):
-        frame_count = 0
-        all_players = {}
+    def infer_frames(self, frames, frame_counts):
+        """
+        Run pose detection + BoT-SORT tracking on a list of consecutive frames.
+        
+        Returns one FrameDetections per frame, or None for frames skipped by
+        the adaptive scheduler.
+        """
+        budget = None
+        selected = list(range(len(frames)))
+        if self.scheduler is not None:
+            budget, selected = self.scheduler.plan(frame_counts)
+        
+        batch_results = [None] * len(frames)
+        if not selected:
+            return batch_results
+        
+        with self.profiler.start('inference'):
+            if self.batch_size == 1:
+                outputs = [self.pose_tracker.track(frames[i], budget) for i in selected]
+            else:
+                outputs = self.pose_tracker.track_batch([frames[i] for i in selected], budget)
+        
+        for i, results in zip(selected, outputs):
+            batch_results[i] = FrameDetections.from_results(results)
+        
+        if self.scheduler is not None:
+            # Post-processing lags by up to a queue and a batch: escalate on the newest frame directly
+            latest = selected[-1]
+            self.scheduler.observe(frame_counts[latest], self.raid_state.detections_near_midline(batch_results[latest]))
+        return batch_results
+    
+    def extract_data(self, display=True, queue_size=8, batch_size=1, adaptive=False, crop_to_court=False,
+                     start_frame=0, end_frame=None, seed_players=None, on_frame=None, use_cache=False,
+                     jpeg_quality=95, thumbnail_width=320, on_raid=None, latency_budget=0.5, profile_path=None,
+                     on_event=None, csv_path=None, events_path=None, checkpoint_seconds=None, resume=False):
+        """
+        Process the video and return the extracted raid metrics.
+        
+        Decode and inference run in background threads (see FramePipeline)
+        while post-processing, raid state and display run on this thread.
+        
+        batch_size > 1 runs the pose model on batches of frames and tracks
+        them in frame order afterwards; meant for offline (display=False) runs
+        where the added latency does not matter.
+        
+        adaptive=True runs a cheaper inference budget (frame stride, lower
+        resolution, fewer detections) while no raid is active and nobody is
+        near the midline, escalating to full resolution every frame otherwise.
+        
+        crop_to_court=True only sends the play box bounding rectangle (plus a
+        margin) to the model; detections are mapped back to frame coordinates.
+        
+        start_frame / end_frame limit processing to part of the video (frame
+        numbers stay absolute). Past end_frame, processing continues until
+        the active raid, if any, has ended.
+        
+        seed_players is the player state of a previous run at start_frame
+        with no raid active (see RaidStateMachine.seed).
+        
+        on_frame(frame_count, all_players) is called after every processed frame.
+        on_raid(metrics) is called for every raid as soon as it ends.
+        on_event(event) receives every RaidEvent (raid start, line crossings,
+        raider recovered / lost, raid end) the moment the raid state machine
+        produces it; see also iter_events().
+        
+        With csv_path, every raid is appended to that CSV as soon as it ends
+        (an existing file is replaced), so a crash loses no finished raid.
+        With events_path, every event is written to that file as a JSON line
+        (see EventLog) as it happens.
+        
+        checkpoint_seconds saves a resumable checkpoint (see
+        checkpoint_file()) at the first frame with no raid active after every
+        checkpoint_seconds of video, and a final one when the run completes.
+        resume=True continues from this video's checkpoint if there is a
+        valid one, instead of from start_frame: the raids found before it are
+        restored (and rewritten to csv_path), events after it are dropped
+        from events_path, keyframes are appended to the container and the
+        tracked players are handed over as seed players.
+        Resuming a completed run processes nothing. Live runs are not
+        checkpointed.
+        
+        use_cache=True replays the per-frame detections cached by an earlier
+        run with the same video, weights and tracking settings instead of
+        running the model; headless replays do not decode the video at all.
+        Without a valid cache, a run over the whole video writes one.
+        
+        Keyframes are encoded at jpeg_quality on background threads, each
+        with a thumbnail_width pixel wide thumbnail (0 disables thumbnails),
+        into this video's keyframe container (see keyframe_path()), which
+        the run replaces.
+        
+        A live extractor reads the source through a LiveFramePipeline:
+        frames are processed in batches of one and frames older than
+        latency_budget seconds are dropped. Detection caching and
+        start_frame do not apply. Processing stops at the end of the
+        stream, on 'q' in the display window, or on Ctrl+C. Any run also
+        stops after the current frame when stop() is called.
+        
+        With profile_path, every stage (decode, inference, geometry,
+        tracking, raid state, overlay, keyframes, display) is timed by a
+        StageProfiler; its report is printed and saved there as JSON.
+        """
+        all_players = self.raid_state.players
         DISPLAY_SCALE = 0.6
         
         print(f"Video FPS: {self.fps}")
@@ -73,401 +223,347 @@ class DataExtractor:
         if display:
             cv2.namedWindow("Data Extraction", cv2.WINDOW_NORMAL)
         
-        while True:
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-            
-            frame_count += 1
-            
-            # Draw play area (works with any polygon)
-            n = len(self.court_dynamics.play_box)
-            for i in range(n):
-                p1 = tuple(self.court_dynamics.play_box[i].astype(int))
-                p2 = tuple(self.court_dynamics.play_box[(i+1)%n].astype(int))
-                cv2.line(frame, p1, p2, (255, 255, 0), 2)
-            
-            # Draw midline
-            cv2.line(frame, self.p1, self.p2, (0, 255, 255), 2)
-            
-            # Draw baulk line
-            b1 = tuple(self.court_dynamics.baulk_line[0].astype(int))
-            b2 = tuple(self.court_dynamics.baulk_line[1].astype(int))
-            cv2.line(frame, b1, b2, (0, 0, 255), 2)
-            
-            # Draw bonus line
-            bo1 = tuple(self.court_dynamics.bonus_line[0].astype(int))
-            bo2 = tuple(self.court_dynamics.bonus_line[1].astype(int))
-            cv2.line(frame, bo1, bo2, (0, 255, 0), 2)
-            
-            # Draw end line
-            e1 = tuple(self.court_dynamics.end_line[0].astype(int))
-            e2 = tuple(self.court_dynamics.end_line[1].astype(int))
-            cv2.line(frame, e1, e2, (255, 0, 255), 2)
-            cv2.putText(frame, "END", e1, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 255), 2)
-            
-            # Enhanced tracking with multi-scale detection for far players
-            results = self.model.track(
-                frame, 
-                persist=True, 
-                conf=0.05,      # Very low confidence to detect far players
-                iou=0.15,       # Lower IOU for better matching
-                verbose=False,
-                tracker="botsort.yaml",
-                imgsz=1920,     # Larger image size for better far detection
-                max_det=50      # Detect more players
-            )
-            
-            current_frame_players = set()
-            raider_detected_this_frame = False
-            
-            # Debug: Print detection info every 30 frames
-            if frame_count % 30 == 0:
-                print(f"Frame {frame_count}: Detected {len(results[0].boxes) if results and results[0].boxes.id is not None else 0} players, Tracking {len(all_players)} players")
-            
-            if results and results[0].boxes.id is not None:
-                for i, box in enumerate(results[0].boxes):
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    tid = int(box.id[0])
-                    conf = float(box.conf[0])
-                    
-                    # Get pose keypoints for better center calculation
-                    keypoints = None
-                    if results[0].keypoints is not None and i < len(results[0].keypoints):
-                        kpts = results[0].keypoints[i].xy.cpu().numpy()[0]
-                        if len(kpts) > 0:
-                            keypoints = kpts
-                            valid_kpts = kpts[kpts[:, 0] > 0]
-                            if len(valid_kpts) >= 4:
-                                # Prioritize torso keypoints for stability
-                                torso_kpts = [kpts[5], kpts[6], kpts[11], kpts[12]]
-                                valid_torso = [k for k in torso_kpts if k[0] > 0 and k[1] > 0]
-                                if len(valid_torso) >= 2:
-                                    cx = int(np.mean([k[0] for k in valid_torso]))
-                                    cy = int(np.mean([k[1] for k in valid_torso]))
-                                else:
-                                    cx = int(np.mean(valid_kpts[:, 0]))
-                                    cy = int(np.mean(valid_kpts[:, 1]))
-                            else:
-                                cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-                    else:
-                        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-                    
-                    # Calculate player size (for far player detection)
-                    player_height = y2 - y1
-                    player_width = x2 - x1
-                    is_far_player = player_height < 80 or player_width < 40  # Small = far from camera
-                    
-                    # FILTER: Only track players inside play box
-                    if not self.court_dynamics.is_inside_play_box((cx, cy)):
-                        # Draw gray box for outside players
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (128, 128, 128), 1)
-                        cv2.putText(frame, "OUT", (x1, y1-5), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (128, 128, 128), 1)
-                        continue  # Skip this player
-                    
-                    current_frame_players.add(tid)
-                    side = self.point_side(cx, cy)
-                    
-                    # Initialize or update player tracking
-                    if tid not in all_players:
-                        all_players[tid] = {
-                            'positions': [],
-                            'keypoints': [],
-                            'side_history': [],
-                            'confidence': [],
-                            'baseline_side': None,
-                            'last_seen': frame_count
-                        }
-                    
-                    # Update player data
-                    all_players[tid]['last_seen'] = frame_count
-                    all_players[tid]['confidence'].append(conf)
-                    
-                    # Position smoothing (less aggressive for far players)
-                    if len(all_players[tid]['positions']) > 0:
-                        last_pos = all_players[tid]['positions'][-1]
-                        alpha = 0.5 if is_far_player else 0.7  # Less smoothing for far players
-                        smooth_cx = int(alpha * cx + (1 - alpha) * last_pos[0])
-                        smooth_cy = int(alpha * cy + (1 - alpha) * last_pos[1])
-                        cx, cy = smooth_cx, smooth_cy
-                    
-                    # Use bottom center (feet) for penetration calculation
-                    feet_x = (x1 + x2) // 2
-                    feet_y = y2  # Bottom of bounding box
-                    
-                    # Track maximum penetration from ANY body part
-                    max_penetration_point = (feet_x, feet_y)
-                    max_penetration_depth = self.court_dynamics.get_penetration_depth((feet_x, feet_y))
-                    
-                    # Check all keypoints for maximum penetration
-                    if keypoints is not None:
-                        for kpt in keypoints:
-                            if kpt[0] > 0 and kpt[1] > 0:
-                                kpt_depth = self.court_dynamics.get_penetration_depth((int(kpt[0]), int(kpt[1])))
-                                if kpt_depth > max_penetration_depth:
-                                    max_penetration_depth = kpt_depth
-                                    max_penetration_point = (int(kpt[0]), int(kpt[1]))
-                    
-                    # Also check bounding box corners for extended limbs
-                    for corner in [(x1, y2), (x2, y2), (feet_x, y2)]:
-                        corner_depth = self.court_dynamics.get_penetration_depth(corner)
-                        if corner_depth > max_penetration_depth:
-                            max_penetration_depth = corner_depth
-                            max_penetration_point = corner
-                    
-                    all_players[tid]['positions'].append((max_penetration_point[0], max_penetration_point[1], frame_count))
-                    all_players[tid]['keypoints'].append(keypoints)
-                    all_players[tid]['side_history'].append(side)
+        if self.live:
+            batch_size = 1
+            use_cache = False
+            start_frame = 0
+        
+        self.batch_size = max(1, batch_size)
+        if crop_to_court:
+            self.pose_tracker.crop = CropRegion.around_play_box(self.court_dynamics, self.frame_shape)
+            print(f"Inference crop: {self.pose_tracker.crop} (imgsz {self.pose_tracker.track_args()['imgsz']})")
+        
+        checkpoint = None
+        self.resumed_from = None
+        if (checkpoint_seconds or resume) and not self.live:
+            checkpoint = self.open_checkpoint(adaptive)
+            if resume and checkpoint.load(self.raid_state.new_track):
+                start_frame, seed_players = checkpoint.frame, checkpoint.players
+                self.raid_state.raids[:] = checkpoint.raids
+                self.resumed_from = start_frame
+                state = "complete run" if checkpoint.complete else f"frame {start_frame}"
+                print(f"♻ Resuming from {state} with {len(checkpoint.raids)} raids: {checkpoint.path}")
+            elif resume:
+                print(f"⚠ No checkpoint to resume from, starting at frame {start_frame}")
+        
+        if adaptive:
+            full = InferenceBudget('full', stride=1, imgsz=PoseTracker.IMGSZ, max_det=PoseTracker.MAX_DET)
+            self.scheduler = AdaptiveScheduler(self.fps, full, start_frame=start_frame)
+            self.raid_state.near_midline_m = self.scheduler.NEAR_MIDLINE_M
+        
+        frame_count = start_frame
+        if start_frame:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        
+        self.raid_state.seed(seed_players, start_frame)
+        
+        replay = False
+        if use_cache:
+            self.detection_cache = self.open_detection_cache(adaptive)
+            replay = self.detection_cache.load()
+            print(f"{'✓ Replaying' if replay else '⚠ No valid'} cached detections: {self.detection_cache.path}")
+        
+        if self.live:
+            pipeline = LiveFramePipeline(self.cap, self.infer_frames, self.fps, latency_budget,
+                                         realtime=os.path.isfile(self.video_path))
+        elif replay and not display:
+            pipeline = CachedFrames(self.detection_cache, start_frame=start_frame)
+        else:
+            infer_fn = self.detection_cache.get_batch if replay else self.infer_frames
+            pipeline = FramePipeline(self.cap, infer_fn, queue_size=queue_size, batch_size=batch_size,
+                                     start_frame=start_frame)
+        record = use_cache and not replay and start_frame == 0 and end_frame is None
+        stopped = False
+        self.stop_requested.clear()
+        
+        if csv_path is not None:
+            # A resumed run rewrites the raids before its checkpoint: the file may hold later ones
+            if os.path.exists(csv_path):
+                os.remove(csv_path)
+            for metrics in self.raids:
+                self.metrics_extractor.append_to_csv(metrics, csv_path)
+        
+        events_log = None
+        if events_path is not None:
+            # Events after the checkpoint are emitted again by a resumed run
+            events_log = EventLog(events_path, append=self.resumed_from is not None)
+            if self.resumed_from is not None:
+                events_log.discard_after(self.resumed_from)
+        
+        def dispatch(event):
+            if on_event is not None:
+                on_event(event)
+            if events_log is not None:
+                events_log.write(event)
+            if event.type == RAID_END:
+                if csv_path is not None:
+                    self.metrics_extractor.append_to_csv(event.data['metrics'], csv_path)
+                if on_raid is not None:
+                    on_raid(event.data['metrics'])
+        if on_event is not None or on_raid is not None or csv_path is not None or events_log is not None:
+            self.raid_state.on_event = dispatch
+        
+        # The first checkpoint is taken right away, so an interrupted run always has one
+        checkpoint_frames = int((checkpoint_seconds or 0) * self.fps)
+        next_checkpoint = start_frame if checkpoint_frames > 0 else None
+        
+        if profile_path is not None:
+            self.profiler = self.raid_state.profiler = pipeline.profiler = StageProfiler()
+        resumed = self.resumed_from is not None
+        self.keyframe_writer = KeyframeWriter(self.keyframe_path(), jpeg_quality, thumbnail_width,
+                                              append=resumed, info=self.keyframe_info())
+        if resumed:
+            self.keyframe_writer.discard_after(start_frame)
+        
+        with pipeline, self.keyframe_writer:
+            try:
+                for frame_count, frame, detections in pipeline:
+                    if record:
+                        self.detection_cache.record(frame_count, detections)
                     
-                    # Keep only recent history
-                    if len(all_players[tid]['positions']) > 30:
-                        all_players[tid]['positions'].pop(0)
-                        all_players[tid]['keypoints'].pop(0)
-                        all_players[tid]['side_history'].pop(0)
-                        all_players[tid]['confidence'].pop(0)
+                    self.process_frame(frame_count, frame, detections, render=display)
+                    self.profiler.frame()
+                    if on_frame is not None:
+                        on_frame(frame_count, all_players)
+                    if next_checkpoint is not None and frame_count >= next_checkpoint and not self.raid_active:
+                        checkpoint.save(frame_count, all_players, self.raids)
+                        next_checkpoint = frame_count + checkpoint_frames
                     
-                    # Determine baseline side
-                    if len(all_players[tid]['side_history']) >= 15 and all_players[tid]['baseline_side'] is None:
-                        sides = all_players[tid]['side_history'][:15]
-                        side_counts = {}
-                        for s in sides:
-                            side_counts[s] = side_counts.get(s, 0) + 1
-                        most_common = max(side_counts, key=side_counts.get)
-                        if side_counts[most_common] >= 11:
-                            all_players[tid]['baseline_side'] = most_common
-                            print(f"✓ Player {tid} baseline established: side={most_common}")
+                    # Debug: Print detection and queue info every 30 frames
+                    if frame_count % 30 == 0:
+                        depths = pipeline.queue_depths()
+                        print(f"Frame {frame_count}: Detected {len(detections) if detections is not None else 0} players, "
+                              f"Tracking {len(all_players)} players | queues decode={depths['decode']} infer={depths['infer']}")
                     
-                    # Raider locking - STRICT to prevent ID switching
-                    is_raider = False
+                    if display:
+                        with self.profiler.start('display'):
+                            display_frame = cv2.resize(frame, None, fx=DISPLAY_SCALE, fy=DISPLAY_SCALE)
+                            cv2.imshow("Data Extraction", display_frame)
+                            key = cv2.waitKey(1) & 0xFF
+                        if key == ord('q'):
+                            stopped = True
+                            break
                     
-                    if self.raid_active and self.raider_locked and tid == self.raider_id:
-                        is_raider = True
-                        raider_detected_this_frame = True
-                    elif not self.raid_active:
-                        if all_players[tid]['baseline_side'] is not None:
-                            recent_sides = all_players[tid]['side_history'][-7:]
-                            if len(recent_sides) >= 7:
-                                opposite_count = sum(1 for s in recent_sides if s != all_players[tid]['baseline_side'])
-                                if opposite_count >= 6:
-                                    is_raider = True
-                                    print(f"🎯 Raid detected! Player {tid} crossed midline (baseline={all_players[tid]['baseline_side']}, current_side={side})")
+                    if end_frame is not None and frame_count >= end_frame and not self.raid_active:
+                        break
                     
-                    # Draw player with keypoints for ALL players
-                    if is_raider:
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 3)
-                        cv2.putText(frame, f"RAIDER (ID:{tid}) LOCKED", 
-                                  (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                        
-                        if not self.raid_active:
-                            self.start_raid(tid, frame_count, all_players)
-                            raider_detected_this_frame = True
-                            # Save key frame: Raid Start
-                            cv2.imwrite(f"{self.keyframes_dir}/raid_{len(self.raids)+1}_start_frame_{frame_count}.jpg", frame)
-                        elif self.raider_id == tid:
-                            raider_detected_this_frame = True
-                            
-                            # Check and save bonus/baulk crossing
-                            if self.current_raid and 'crossed_bonus' not in self.current_raid:
-                                if self.court_dynamics.crossed_bonus_line((cx, cy)):
-                                    self.current_raid['crossed_bonus'] = True
-                                    cv2.imwrite(f"{self.keyframes_dir}/raid_{len(self.raids)+1}_bonus_frame_{frame_count}.jpg", frame)
-                            
-                            if self.current_raid and 'crossed_baulk' not in self.current_raid:
-                                if self.court_dynamics.crossed_baulk_line((cx, cy)):
-                                    self.current_raid['crossed_baulk'] = True
-                                    cv2.imwrite(f"{self.keyframes_dir}/raid_{len(self.raids)+1}_baulk_frame_{frame_count}.jpg", frame)
-                        
-                        # Draw keypoints for raider
-                        if keypoints is not None:
-                            for kpt in keypoints:
-                                if kpt[0] > 0 and kpt[1] > 0:
-                                    cv2.circle(frame, (int(kpt[0]), int(kpt[1])), 3, (255, 0, 255), -1)
-                    else:
-                        # Draw all other players with keypoints
-                        color_intensity = int(255 * min(conf * 2, 1.0))  # Boost visibility
-                        thickness = 2 if is_far_player else 1
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (color_intensity, 0, 0), thickness)
-                        cv2.putText(frame, f"ID:{tid} ({conf:.2f})", (x1, y1-5), 
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.4, (color_intensity, 0, 0), 1)
-                        
-                        # Draw keypoints for ALL players
-                        if keypoints is not None:
-                            for kpt in keypoints:
-                                if kpt[0] > 0 and kpt[1] > 0:
-                                    cv2.circle(frame, (int(kpt[0]), int(kpt[1])), 2, (0, 255, 255), -1)
-            
-            # Clean up lost players (longer timeout for far players)
-            lost_players = [tid for tid, data in all_players.items() 
-                          if frame_count - data['last_seen'] > 90]  # Increased from 60 to 90
-            for tid in lost_players:
-                del all_players[tid]
-            
-            # Check if raider returned to baseline (immediate raid end)
-            if self.raid_active and self.raider_id in all_players:
-                if all_players[self.raider_id]['baseline_side'] is not None:
-                    recent_sides = all_players[self.raider_id]['side_history'][-5:]
-                    if len(recent_sides) >= 5:
-                        baseline_count = sum(1 for s in recent_sides if s == all_players[self.raider_id]['baseline_side'])
-                        if baseline_count >= 4:
-                            print(f"🔙 Raider returned to baseline, ending raid (SUCCESS)")
-                            # Mark as successful return
-                            self.current_raid['returned_to_baseline'] = True
-                            # Save key frame: Raid End
-                            cv2.imwrite(f"{self.keyframes_dir}/raid_{len(self.raids)+1}_end_frame_{frame_count}.jpg", frame)
-                            self.end_raid(frame_count, all_players)
-            
-            # AGGRESSIVE RAIDER RECOVERY - Enhanced
-            if self.raid_active and not raider_detected_this_frame:
-                self.missing_frames += 1
-                
-                # Try to recover raider immediately
-                if results and results[0].boxes.id is not None and self.raider_id in all_players:
-                    if len(all_players[self.raider_id]['positions']) > 0:
-                        last_raider_pos = all_players[self.raider_id]['positions'][-1]
-                        best_candidate = None
-                        min_distance = float('inf')
-                        
-                        for i, box in enumerate(results[0].boxes):
-                            x1, y1, x2, y2 = map(int, box.xyxy[0])
-                            tid = int(box.id[0])
-                            
-                            # Get center with pose if available
-                            if results[0].keypoints is not None and i < len(results[0].keypoints):
-                                kpts = results[0].keypoints[i].xy.cpu().numpy()[0]
-                                valid_kpts = kpts[kpts[:, 0] > 0]
-                                if len(valid_kpts) >= 4:
-                                    cx = int(np.mean(valid_kpts[:, 0]))
-                                    cy = int(np.mean(valid_kpts[:, 1]))
-                                else:
-                                    cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-                            else:
-                                cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-                            
-                            # Only consider players inside play box
-                            if not self.court_dynamics.is_inside_play_box((cx, cy)):
-                                continue
-                            
-                            side = self.point_side(cx, cy)
-                            
-                            # Check if on opposite side (potential raider)
-                            if tid in all_players and all_players[tid]['baseline_side'] is not None:
-                                if side != all_players[tid]['baseline_side']:
-                                    dist = np.sqrt((cx - last_raider_pos[0])**2 + (cy - last_raider_pos[1])**2)
-                                    if dist < 400 and dist < min_distance:  # Increased search radius
-                                        min_distance = dist
-                                        best_candidate = tid
-                            # Also check unknown players (new detections)
-                            elif tid not in all_players:
-                                dist = np.sqrt((cx - last_raider_pos[0])**2 + (cy - last_raider_pos[1])**2)
-                                if dist < 300 and dist < min_distance:
-                                    min_distance = dist
-                                    best_candidate = tid
-                        
-                        # Recover immediately if found
-                        if best_candidate:
-                            # STRICT: Only switch if very close or same ID reappeared
-                            if min_distance < 200 or best_candidate == self.raider_id:
-                                print(f"⚡ Raider recovered: {self.raider_id} -> {best_candidate} (dist: {min_distance:.0f}px)")
-                                self.raider_id = best_candidate
-                                self.missing_frames = 0
-                                raider_detected_this_frame = True
-                                self.raider_locked = True
-                
-                if self.missing_frames > 0 and self.raider_id in all_players:
-                    if len(all_players[self.raider_id]['positions']) > 0:
-                        last_pos = all_players[self.raider_id]['positions'][-1]
-                        cv2.circle(frame, (last_pos[0], last_pos[1]), 30, (0, 165, 255), 3)
-                        cv2.putText(frame, f"SEARCHING {self.missing_frames}", 
-                                   (last_pos[0]-50, last_pos[1]-40), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 165, 255), 2)
-                
-                if self.missing_frames > 120:  # Increased from 60 to 120 frames (4 seconds)
-                    print(f"❌ Raider lost, ending raid")
-                    # Save key frame: Raid Lost
-                    cv2.imwrite(f"{self.keyframes_dir}/raid_{len(self.raids)+1}_lost_frame_{frame_count}.jpg", frame)
-                    self.end_raid(frame_count, all_players)
-            
-            # Display status
-            status = f"Raids: {len(self.raids)} | Frame: {frame_count} | Players: {len(current_frame_players)}"
-            if self.raid_active:
-                raid_duration = (frame_count - self.current_raid['start_frame']) / self.fps
-                status += f" | RAID - P{self.raider_id} ({raid_duration:.1f}s)"
-                if self.missing_frames > 0:
-                    status += f" [LOST:{self.missing_frames}]"
-                if self.raider_locked:
-                    status += " [LOCKED]"
-            cv2.putText(frame, status, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            
-            if display:
-                display_frame = cv2.resize(frame, None, fx=DISPLAY_SCALE, fy=DISPLAY_SCALE)
-                cv2.imshow("Data Extraction", display_frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+                    if self.stop_requested.is_set():
+                        stopped = True
+                        print("\n⏹ Extraction stopped")
+                        break
+            except KeyboardInterrupt:
+                if not self.live:
+                    raise
+                stopped = True
+                print("\n⏹ Live extraction stopped")
+        
+        self.frames_processed = frame_count - start_frame
+        print(pipeline.summary())
+        if record and not stopped:
+            self.detection_cache.save(frame_count)
+        if self.scheduler is not None:
+            print(self.scheduler.summary())
+        if self.raid_state.evicted_tracks:
+            print(f"⚠ Dropped {self.raid_state.evicted_tracks} tracks over the limit of "
+                  f"{self.raid_state.params.max_tracks} live tracks")
         
-        if self.raid_active:
-            self.end_raid(frame_count, all_players)
+        self.raid_state.finish(frame_count)
+        self.raid_state.on_event = None
+        if events_log is not None:
+            events_log.close()
+        if next_checkpoint is not None:
+            if stopped:
+                print(f"💾 Checkpoint kept at frame {checkpoint.frame}: {checkpoint.path}")
+            else:
+                checkpoint.save(frame_count, all_players, self.raids, complete=True)
         
         self.cap.release()
         if display:
             cv2.destroyAllWindows()
+        if self.profiler.enabled:
+            # Keyframe writes have finished: the report covers the whole run
+            print(self.profiler.summary(self.profiler.save(profile_path)))
+            print(f"Profile saved to: {profile_path}")
+            self.profiler = self.raid_state.profiler = NULL_PROFILER
         
         return self.raids
     
-    def start_raid(self, raider_id, frame, all_players):
-        self.raid_active = True
-        self.raider_id = raider_id
-        self.raider_locked = True
-        self.missing_frames = 0
-        
-        self.current_raid = {
-            'raider_id': raider_id,
-            'start_frame': frame,
-            'positions': [],
-            'defenders': {}
-        }
-        
-        print(f"🏃 Raid started - Raider {raider_id} LOCKED at frame {frame}")
+    def stop(self):
+        """Ask a running extract_data to stop after the current frame; safe to call from any thread"""
+        self.stop_requested.set()
     
-    def end_raid(self, frame, all_players):
-        if not self.current_raid:
-            return
+    def iter_events(self, **kwargs):
+        """
+        Run extract_data(**kwargs) on a worker thread and yield its RaidEvents
+        as they happen, e.g. to drive a UI or forward raids while the video is
+        still being processed. display defaults to False. An on_event
+        callback in kwargs is still called, on the worker thread, before
+        each event is yielded.
+        
+        Closing the generator early stops the extraction; an exception raised
+        by the extraction is re-raised here once the events before it have
+        been yielded. The raids are in self.raids afterwards as usual.
+        """
+        kwargs.setdefault('display', False)
+        on_event = kwargs.pop('on_event', None)
+        events = queue.Queue()
+        done = object()
+        errors = []
+        
+        def put(event):
+            if on_event is not None:
+                on_event(event)
+            events.put(event)
+        
+        def run():
+            try:
+                self.extract_data(on_event=put, **kwargs)
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                events.put(done)
+        
+        worker = threading.Thread(target=run, name="raid-events", daemon=True)
+        worker.start()
+        try:
+            while True:
+                event = events.get()
+                if event is done:
+                    break
+                yield event
+        finally:
+            self.stop()
+            worker.join()
+        if errors:
+            raise errors[0]
+    
+    def checkpoint_file(self):
+        """Checkpoint of this video in checkpoint_dir"""
+        return checkpoint_path(self.checkpoint_dir, self.video_path)
+    
+    def open_checkpoint(self, adaptive=False):
+        """ExtractionCheckpoint of this video for the current model, tracking and raid settings"""
+        settings = self.pose_tracker.cache_settings()
+        settings['adaptive'] = adaptive
+        settings['raid_params'] = self.raid_state.params.as_dict()
+        fingerprint = run_fingerprint(self.video_path, self.pose_tracker.model_path, settings)
+        return ExtractionCheckpoint(self.checkpoint_file(), fingerprint)
+    
+    def open_detection_cache(self, adaptive=False):
+        """DetectionCache for this video and the current model / tracking settings"""
+        settings = self.pose_tracker.cache_settings()
+        settings['adaptive'] = adaptive
+        fingerprint = run_fingerprint(self.video_path, self.pose_tracker.model_path, settings)
+        video_name = os.path.splitext(os.path.basename(self.video_path))[0]
+        return DetectionCache(os.path.join(self.cache_dir, f"{video_name}_{fingerprint[:16]}.npz"), fingerprint)
+    
+    def process_frame(self, frame_count, frame, detections, render=True):
+        """
+        Post-process one frame: player tracking and raid state.
         
-        self.current_raid['end_frame'] = frame
+        Frames skipped by the adaptive scheduler (detections=None) still
+        advance the raid state, on the newest inferred detections.
         
-        if self.raider_id in all_players:
-            self.current_raid['positions'] = all_players[self.raider_id]['positions'].copy()
+        With render=True the court overlay and annotations are drawn onto
+        frame in place; otherwise only keyframes are rendered.
+        """
+        # Drawing is recorded, not performed: the frame is only rendered when
+        # it is displayed or saved as a keyframe
+        annotations = FrameAnnotations()
         
-        raider_side = all_players[self.raider_id]['baseline_side'] if self.raider_id in all_players else None
-        for tid, data in all_players.items():
-            if tid != self.raider_id and raider_side is not None and data['baseline_side'] is not None and data['baseline_side'] == -raider_side:
-                self.current_raid['defenders'][tid] = data['positions'].copy()
+        def keyframe_fn(event, annotations):
+            self.save_keyframe(event, frame_count, frame, annotations)
         
-        metrics = self.metrics_extractor.extract_raid_metrics(self.current_raid)
-        self.raids.append(metrics)
+        near_midline = self.raid_state.update(frame_count, detections, annotations, keyframe_fn)
         
-        success_status = "SUCCESS" if metrics.get('success', 0) == 1 else "INCOMPLETE"
-        print(f"✅ Raid ended ({success_status}) - Duration: {metrics['duration']:.2f}s, Max Penetration: {metrics['max_penetration']:.2f}m")
+        if self.scheduler is not None:
+            self.scheduler.update(frame_count, self.raid_active, near_midline)
         
-        self.raid_active = False
-        self.raider_id = None
-        self.raider_locked = False
-        self.current_raid = None
-        self.missing_frames = 0
+        if not render:
+            return
+        
+        # Display status
+        state = self.raid_state
+        status = f"Raids: {len(state.raids)} | Frame: {frame_count} | Players: {state.players_in_frame}"
+        if state.raid_active:
+            raid_duration = (frame_count - state.current_raid['start_frame']) / self.fps
+            status += f" | RAID - P{state.raider_id} ({raid_duration:.1f}s)"
+            if state.missing_frames > 0:
+                status += f" [LOST:{state.missing_frames}]"
+            if state.raider_locked:
+                status += " [LOCKED]"
+        annotations.text(status, (10, 30), 0.7, (255, 255, 255), 2)
+        
+        with self.profiler.start('overlay'):
+            self.court_overlay.apply(frame)
+            annotations.render(frame)
+    
+    def keyframe_path(self):
+        """Keyframe container of this video in keyframes_dir"""
+        return container_path(self.keyframes_dir, self.video_path)
+    
+    def keyframe_info(self):
+        """Source of the keyframes, stored in the container so raids can be played back from the video"""
+        video = os.path.abspath(self.video_path) if os.path.isfile(self.video_path) else self.video_path
+        return {'video': video, 'fps': self.fps}
+    
+    def save_keyframe(self, event, frame_count, frame, annotations):
+        """Render the annotations recorded so far onto a copy of frame and queue it for writing"""
+        with self.profiler.start('keyframes'):
+            if frame is None:
+                # Replaying cached detections without decoding: read just this frame
+                frame = self.read_frame(frame_count)
+                if frame is None:
+                    return
+            with self.profiler.start('overlay'):
+                image = self.court_overlay.apply(frame.copy())
+                annotations.render(image)
+            raid_number = len(self.raids) + 1
+            if self.keyframe_writer is not None:
+                self.keyframe_writer.submit(raid_number, event, frame_count, image)
+            else:
+                with KeyframeWriter(self.keyframe_path(), append=True, info=self.keyframe_info()) as writer:
+                    writer.submit(raid_number, event, frame_count, image)
+    
+    def read_frame(self, frame_count):
+        """Seek to and decode a single frame (frame numbers start at 1)"""
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count - 1)
+        ret, frame = self.cap.read()
+        return frame if ret else None
     
     def save_results(self, output_path):
         self.metrics_extractor.export_to_csv(self.raids, output_path)
 
 
 if __name__ == "__main__":
-    video_path = "../data/videos/jan2.mp4"
+    import argparse
     
-    if len(sys.argv) >= 2:
-        video_path = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Extract raid metrics from a kabaddi match video")
+    parser.add_argument("video", nargs="?", default="../data/videos/jan2.mp4",
+                        help="Match video path, or with --live a camera index or stream URL")
+    parser.add_argument("--headless", action="store_true", help="Do not open a display window")
+    parser.add_argument("--batch-size", type=int, default=1, help="Frames per pose inference batch (offline runs)")
+    parser.add_argument("--adaptive", action="store_true", help="Cheaper inference between raids, full resolution near the midline")
+    parser.add_argument("--crop-court", action="store_true", help="Only run pose inference on the play box region")
+    parser.add_argument("--cache", action="store_true", help="Reuse cached detections of an earlier run, or cache this run's")
+    parser.add_argument("--rasters", action="store_true", help="Answer court queries from cached per-pixel maps")
+    parser.add_argument("--jpeg-quality", type=int, default=95, help="JPEG quality of saved keyframes (0-100)")
+    parser.add_argument("--live", action="store_true",
+                        help="Treat the source as live (files are replayed in real time); raids are written as they end")
+    parser.add_argument("--latency-budget", type=float, default=0.5,
+                        help="Live mode: drop frames waiting longer than this many seconds")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="REPORT",
+                        help="Time every pipeline stage; JSON report path (default: data/profiles/<video>_profile.json)")
+    parser.add_argument("--events", nargs="?", const="", default=None, metavar="PATH",
+                        help="Write raid events as JSON lines while processing (default: data/extracted/<video>_events.jsonl)")
+    parser.add_argument("--checkpoint-every", type=float, default=60.0, metavar="SECONDS",
+                        help="Save a resumable checkpoint every this many seconds of video (0 disables)")
+    parser.add_argument("--resume", action="store_true", help="Continue from this video's last checkpoint")
+    args = parser.parse_args()
+    video_path = args.video
     
     try:
-        extractor = DataExtractor(video_path)
-        print("🎬 Starting data extraction...")
-        raids = extractor.extract_data(display=True)
+        extractor = DataExtractor(video_path, live=args.live, rasters=args.rasters)
         
         # Save to data/extracted directory
         video_name = os.path.splitext(os.path.basename(video_path))[0]
@@ -475,12 +571,32 @@ if __name__ == "__main__":
         os.makedirs(output_dir, exist_ok=True)
         output_path = os.path.join(output_dir, f"{video_name}_raid_metrics.csv")
         
-        extractor.save_results(output_path)
+        profile_path = args.profile
+        if profile_path == "":
+            profile_path = os.path.join(os.path.dirname(output_dir), "profiles", f"{video_name}_profile.json")
+        
+        # Raids are appended as they end, so the CSV is current during the match and survives a crash
+        def on_raid(metrics):
+            print(f"📤 Raid {len(extractor.raids)} written to {output_path}")
+        
+        events_path = None
+        if args.events is not None:
+            events_path = args.events or os.path.join(output_dir, f"{video_name}_events.jsonl")
+        
+        print("🎬 Starting data extraction...")
+        raids = extractor.extract_data(display=not args.headless, batch_size=args.batch_size,
+                                       adaptive=args.adaptive, crop_to_court=args.crop_court, use_cache=args.cache,
+                                       jpeg_quality=args.jpeg_quality, on_raid=on_raid,
+                                       latency_budget=args.latency_budget, profile_path=profile_path,
+                                       csv_path=output_path, events_path=events_path,
+                                       checkpoint_seconds=args.checkpoint_every, resume=args.resume)
+        if events_path is not None:
+            print(f"Events saved to: {events_path}")
         
         print(f"\n📊 Extraction complete!")
         print(f"Total raids: {len(raids)}")
         print(f"Saved to: {output_path}")
-        
+    
     except Exception as e:
         print(f"❌ Error: {e}")
         import traceback
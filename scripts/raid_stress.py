@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Raid State Stress Test
+Pushes synthetic tracking streams through the raid state machine at full speed and checks the raids it finds
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from court.simplified_court import SimplifiedCourtDynamics
+from extraction.events import RAIDER_RECOVERED
+from extraction.profiler import StageProfiler
+from extraction.raid_state import RaidStateMachine
+from synthetic.match import SyntheticMatch
+from synthetic.tracking_stream import TrackingStream
+
+
+def run(stream, court, profiler=None, verbose=False):
+    """
+    Feed every frame of the stream to a RaidStateMachine. Only update()
+    is timed, so the generator's own cost is not counted.
+    
+    Returns the state machine and a dict of run statistics.
+    """
+    state = RaidStateMachine(court, stream.match.fps, verbose=verbose)
+    if profiler is not None:
+        state.profiler = profiler
+    
+    stats = {'frames': 0, 'detections': 0, 'max_detections': 0, 'max_tracks': 0,
+             'recoveries': 0, 'update_seconds': 0.0}
+    
+    def on_event(event):
+        if event.type == RAIDER_RECOVERED:
+            stats['recoveries'] += 1
+    state.on_event = on_event
+    
+    start = time.perf_counter()
+    for frame_count, detections in stream:
+        tick = time.perf_counter()
+        state.update(frame_count, detections)
+        stats['update_seconds'] += time.perf_counter() - tick
+        if profiler is not None:
+            profiler.frame()
+        
+        stats['frames'] += 1
+        stats['detections'] += len(detections)
+        stats['max_detections'] = max(stats['max_detections'], len(detections))
+        stats['max_tracks'] = max(stats['max_tracks'], len(state.players))
+    
+    tick = time.perf_counter()
+    state.finish(stream.num_frames)
+    stats['update_seconds'] += time.perf_counter() - tick
+    stats['wall_seconds'] = time.perf_counter() - start
+    return state, stats
+
+
+def outcome_counts(pairs, injected, max_missing):
+    """Returns / losses of the found raids, overall and per kind of injected raider failure"""
+    counts = {'returned': 0, 'lost': 0}
+    kinds = {kind: {'injected': 0, 'returned': 0, 'lost': 0} for kind in ('switch', 'short_gap', 'long_gap')}
+    for (_, found), failures in zip(pairs, injected):
+        hit = []
+        if failures['switch'] is not None:
+            hit.append('switch')
+        if failures['gap'] is not None:
+            hit.append('long_gap' if failures['gap'][1] > max_missing else 'short_gap')
+        outcome = None if found is None else ('returned' if found['success'] else 'lost')
+        if outcome is not None:
+            counts[outcome] += 1
+        for kind in hit:
+            kinds[kind]['injected'] += 1
+            if outcome is not None:
+                kinds[kind][outcome] += 1
+    return counts, kinds
+
+
+def print_report(match, state, stats, pairs, spurious, counts, kinds):
+    frames = stats['frames']
+    matched = sum(found is not None for _, found in pairs)
+    update_fps = frames / stats['update_seconds'] if stats['update_seconds'] > 0 else 0.0
+    
+    print("\n" + "=" * 70)
+    print("🏋 RAID STATE STRESS TEST")
+    print("=" * 70)
+    print(f"Match: {frames} frames ({frames / match.fps / 60:.1f} min), {len(match.raids)} scripted raids")
+    print(f"Detections: {stats['detections'] / max(1, frames):.1f} per frame (max {stats['max_detections']}), "
+          f"up to {stats['max_tracks']} live tracks, {state.evicted_tracks} evicted")
+    print(f"Raids: {matched}/{len(pairs)} scripted raids found, {len(spurious)} unexpected | "
+          f"{counts['returned']} returned, {counts['lost']} lost")
+    print(f"Raider recoveries: {stats['recoveries']}")
+    
+    labels = {'switch': "Raider id switches", 'short_gap': "Raider gaps within max_missing",
+              'long_gap': "Raider gaps beyond max_missing"}
+    for kind, label in labels.items():
+        k = kinds[kind]
+        if k['injected']:
+            print(f"{label}: {k['injected']} injected | found raids {k['returned']} returned, {k['lost']} lost")
+    
+    for raid in spurious[:10]:
+        print(f"❌ Unexpected raid: P{raid['raider_id']} frames {raid['start_frame']}-{raid['end_frame']}")
+    if len(spurious) > 10:
+        print(f"   ... and {len(spurious) - 10} more")
+    
+    print("-" * 70)
+    print(f"⚡ Raid state: {update_fps:.1f} FPS ({1000 / update_fps if update_fps else 0:.3f} ms/frame), "
+          f"{update_fps / match.fps:.1f}x real time")
+    print(f"   Wall time {stats['wall_seconds']:.1f}s including stream generation")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the raid state machine with synthetic tracking output")
+    parser.add_argument("--raids", type=int, default=50, help="Scripted raids; the match lasts as long as they need")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--players", type=int, default=7, help="Players per team")
+    parser.add_argument("--extras", type=int, default=2, help="People standing outside the play box")
+    parser.add_argument("--seed", type=int, default=0)
+    
+    failures = parser.add_argument_group("tracker failures")
+    failures.add_argument("--id-switches", type=float, default=0.0, help="New track ids per person per minute")
+    failures.add_argument("--occlusions", type=float, default=0.0, help="Missed stretches per person per minute")
+    failures.add_argument("--gap-frames", type=int, nargs=2, default=(5, 150), metavar=("MIN", "MAX"),
+                          help="Length of a missed stretch in frames")
+    failures.add_argument("--raider-switches", type=float, default=0.0,
+                          help="Chance per raid of a raider id switch across the midline")
+    failures.add_argument("--raider-gaps", type=float, default=0.0,
+                          help="Chance per raid of the raider going missing across the midline")
+    failures.add_argument("--far-jitter", type=float, default=0.0, help="Pixel noise at the far sideline")
+    failures.add_argument("--dropout", type=float, default=0.0, help="Chance a far keypoint is undetected")
+    failures.add_argument("--crowd", type=int, default=0, help="People standing outside the play box")
+    failures.add_argument("--ghosts", type=float, default=0.0, help="Short-lived false detections per second")
+    failures.add_argument("--max-detections", type=int, default=50)
+    
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="Seconds a detected raid start may differ from the script")
+    parser.add_argument("--no-rasters", action="store_true", help="Compute court geometry instead of using rasters")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="REPORT",
+                        help="Time geometry, tracking and raid state separately; optionally save the report")
+    parser.add_argument("--verbose", action="store_true", help="Print the raid state machine's log")
+    args = parser.parse_args()
+    
+    match = SyntheticMatch(args.width, args.height, args.fps, args.raids, args.players, args.extras, args.seed)
+    stream = TrackingStream(match, id_switches=args.id_switches, occlusions=args.occlusions,
+                            gap_frames=tuple(args.gap_frames), raider_switches=args.raider_switches,
+                            raider_gaps=args.raider_gaps, far_jitter=args.far_jitter, dropout=args.dropout,
+                            crowd=args.crowd, ghosts=args.ghosts, max_detections=args.max_detections,
+                            seed=args.seed)
+    court = SimplifiedCourtDynamics(**match.court_config())
+    if not args.no_rasters:
+        court.enable_rasters((args.height, args.width))
+    
+    profiler = StageProfiler() if args.profile is not None else None
+    print(f"🏋 Streaming {match.num_frames} frames ({len(match.raids)} raids) through the raid state machine")
+    state, stats = run(stream, court, profiler, args.verbose)
+    
+    # Raids are reported under the track id they started with; compare them by person
+    detected = [dict(raid, raider_id=stream.person_of.get(raid['raider_id'], -1)) for raid in state.raids]
+    pairs, spurious = match.compare(detected, args.tolerance)
+    counts, kinds = outcome_counts(pairs, stream.injected, state.params.max_missing)
+    print_report(match, state, stats, pairs, spurious, counts, kinds)
+    
+    if profiler is not None:
+        print(profiler.summary())
+        if args.profile:
+            profiler.save(args.profile)
+            print(f"✓ Profile saved to: {args.profile}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Raid Threshold Sweep
+Replays the cached detections of one match through the raid state machine for a grid of thresholds
+"""
+
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from extraction.raid_state import RaidParams
+
+# Per-process replay inputs, loaded once by init_worker
+_replay = {}
+
+
+def parse_grid(items):
+    """Turn ["cross_votes=5,6", ...] into a list of RaidParams overrides, one per grid point"""
+    known = RaidParams().as_dict()
+    axes = []
+    for item in items:
+        name, _, values = item.partition('=')
+        name = name.strip()
+        if name not in known:
+            raise ValueError(f"Unknown raid parameter '{name}' (choose from: {', '.join(known)})")
+        cast = type(known[name])
+        axes.append([(name, cast(v)) for v in values.split(',') if v.strip()])
+    return [dict(point) for point in itertools.product(*axes)]
+
+
+def init_worker(video_path, cache_path, fingerprint, fps):
+    from court.simplified_court import SimplifiedCourtDynamics
+    from extraction.detections import DetectionCache
+    
+    cache = DetectionCache(cache_path, fingerprint)
+    if not cache.load():
+        raise RuntimeError(f"Detection cache {cache_path} is missing or stale")
+    _replay['cache'] = cache
+    # No rasters: replays only make vectorized FrameGeometry queries, which are faster computed
+    _replay['court'] = SimplifiedCourtDynamics.load_from_config(video_path)
+    _replay['fps'] = fps
+
+
+def replay(overrides):
+    """Worker: run the raid state machine over every cached frame with one parameter setting"""
+    from extraction.raid_state import RaidStateMachine
+    
+    cache = _replay['cache']
+    start = time.perf_counter()
+    state = RaidStateMachine(_replay['court'], _replay['fps'], RaidParams(**overrides), verbose=False)
+    for frame_count in range(1, cache.num_frames + 1):
+        # Frames skipped by adaptive inference are None, as in the extraction run
+        state.update(frame_count, cache.get(frame_count))
+    state.finish(cache.num_frames)
+    
+    raids = state.raids
+    return {
+        'params': overrides,
+        'raids': len(raids),
+        'successful': sum(r['success'] for r in raids),
+        'avg_duration': sum(r['duration'] for r in raids) / len(raids) if raids else 0.0,
+        'start_frames': [r['start_frame'] for r in raids],
+        'seconds': time.perf_counter() - start
+    }
+
+
+def print_results(results, baseline):
+    print("\n" + "=" * 70)
+    print("📊 RAID THRESHOLD SWEEP")
+    print("=" * 70)
+    for r in results:
+        setting = ", ".join(f"{k}={v}" for k, v in r['params'].items()) or "defaults"
+        marker = "  ◀ defaults" if r['params'] == baseline else ""
+        print(f"{r['raids']:3d} raids ({r['successful']} successful, avg {r['avg_duration']:.1f}s) | "
+              f"{setting} [{r['seconds']:.1f}s]{marker}")
+
+
+def save_results(results, output_path):
+    names = sorted({k for r in results for k in r['params']})
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(names + ['raids', 'successful', 'avg_duration', 'start_frames'])
+        for r in results:
+            writer.writerow([r['params'].get(k, '') for k in names] +
+                            [r['raids'], r['successful'], f"{r['avg_duration']:.3f}",
+                             ' '.join(str(f) for f in r['start_frames'])])
+    print(f"Saved to: {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep raid detection thresholds over cached detections of one match")
+    parser.add_argument("video", help="Match video with a detection cache (data_extract.py --cache)")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="RaidParams values to sweep; repeat for a full grid")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Settings replayed at once")
+    parser.add_argument("--adaptive", action="store_true", help="Use the cache of an --adaptive run")
+    parser.add_argument("--crop-court", action="store_true", help="Use the cache of a --crop-court run")
+    parser.add_argument("--output", default=None, help="Results CSV (default: data/extracted/<video>_raid_sweep.csv)")
+    args = parser.parse_args()
+    
+    try:
+        grid = parse_grid(args.grid)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    from scripts.data_extract import DataExtractor
+    from extraction.inference import CropRegion
+    
+    extractor = DataExtractor(args.video)
+    if args.crop_court:
+        extractor.pose_tracker.crop = CropRegion.around_play_box(extractor.court_dynamics, extractor.frame_shape)
+    cache = extractor.open_detection_cache(args.adaptive)
+    extractor.cap.release()
+    if not cache.load():
+        print(f"❌ No valid detection cache for {args.video}")
+        print(f"Run: python scripts/data_extract.py {args.video} --headless --cache")
+        sys.exit(1)
+    
+    defaults = {}
+    if defaults not in grid:
+        grid.insert(0, defaults)
+    workers = max(1, min(args.workers, len(grid)))
+    print(f"🔬 Replaying {cache.num_frames} cached frames for {len(grid)} settings with {workers} workers")
+    
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                             initargs=(args.video, cache.path, cache.fingerprint, extractor.fps)) as pool:
+        results = list(pool.map(replay, grid))
+    
+    print_results(results, defaults)
+    print(f"Wall time: {time.perf_counter() - start:.1f}s")
+    
+    video_name = os.path.splitext(os.path.basename(args.video))[0]
+    output_path = args.output or os.path.join(ROOT_DIR, "data", "extracted", f"{video_name}_raid_sweep.csv")
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    save_results(results, output_path)
+
+
+if __name__ == "__main__":
+    main()
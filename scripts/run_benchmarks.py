@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+Times court geometry, raid metrics, profiling, ranking and UI data loading, and compares runs with a stored baseline
+"""
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from benchmarks.cases import select
+from benchmarks.harness import compare, load_results, machine_info, run_benchmark, save_results
+
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, "data", "benchmarks", "baseline.json")
+
+STATUS_ICONS = {'regression': "❌", 'faster': "⚡", 'same': "✓", 'new': "•", 'size changed': "⚠", 'skipped': "-"}
+
+
+def format_ms(ms):
+    if ms is None:
+        return "-"
+    return f"{ms:.3f}ms" if ms < 1000 else f"{ms / 1000:.2f}s"
+
+
+def run(cases, repeat, min_time):
+    results = {}
+    for case in cases:
+        result = run_benchmark(case, repeat, min_time)
+        results[case.name] = result
+        if 'skipped' in result:
+            print(f"  {case.name:<34} skipped: {result['skipped']}")
+        else:
+            print(f"  {case.name:<34} best {format_ms(result['best_ms']):>10}  median {format_ms(result['median_ms']):>10}"
+                  f"  ±{format_ms(result['stdev_ms'])}  ({result['loops']} loops x {repeat})")
+    return results
+
+
+def print_comparison(rows, baseline, tolerance):
+    print("\n" + "=" * 70)
+    print(f"📊 COMPARISON WITH BASELINE ({baseline.get('created', 'unknown date')}, tolerance {100 * tolerance:.0f}%)")
+    print("=" * 70)
+    if baseline.get('machine') != machine_info():
+        print("⚠ The baseline was recorded on a different machine or software versions")
+    for name, base_ms, current_ms, ratio, status in rows:
+        change = f"{100 * (ratio - 1):+6.1f}%" if ratio is not None else ""
+        print(f"{STATUS_ICONS[status]} {name:<34} {format_ms(base_ms):>10} -> {format_ms(current_ms):>10} "
+              f"{change:>8}  {status}")
+    regressions = sum(1 for row in rows if row[4] == 'regression')
+    print("-" * 70)
+    print(f"{regressions} regression(s), {sum(1 for row in rows if row[4] == 'faster')} faster")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and compare it with a baseline")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="Run benchmarks whose name starts with any of these (court, metrics, ui, ...)")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed rounds per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per round")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, default=None, metavar="PATH",
+                        help=f"Store the results (default: {os.path.relpath(DEFAULT_BASELINE, ROOT_DIR)})")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, default=None, metavar="PATH",
+                        help="Compare with a stored baseline; exits 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Slowdown of the best time per call flagged as a regression (0.1 = 10%%)")
+    args = parser.parse_args()
+    
+    cases = select(args.only)
+    if args.list:
+        for case in cases:
+            print(f"{case.name:<34} {case.description}")
+        return
+    if not cases:
+        print(f"❌ No benchmark matches: {' '.join(args.only)}")
+        sys.exit(1)
+    
+    baseline = None
+    if args.compare:
+        if not os.path.exists(args.compare):
+            print(f"❌ No baseline at {args.compare}")
+            print("Record one with: python scripts/run_benchmarks.py --save")
+            sys.exit(1)
+        baseline = load_results(args.compare)
+    
+    print(f"⏱ Running {len(cases)} benchmarks ({args.repeat} rounds of at least {args.min_time:g}s)")
+    results = run(cases, args.repeat, args.min_time)
+    
+    if args.save:
+        save_results(results, args.save, {'repeat': args.repeat, 'min_time': args.min_time})
+        print(f"✓ Results saved to: {args.save}")
+    
+    if baseline is not None:
+        regressions = print_comparison(compare(results, baseline, args.tolerance), baseline, args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
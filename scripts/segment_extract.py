@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Segment-Parallel Raid Extraction
+Splits one long match video into overlapping segments, extracts them in parallel and stitches the raid state
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from scripts.batch_extract import has_court_config, limit_threads
+
+
+def plan_segments(total_frames, segments, warmup_frames):
+    """
+    Split frames 1..total_frames into contiguous segments.
+    
+    Returns (seg_start, seg_end, run_start) tuples: a segment covers frames
+    (seg_start, seg_end] and its worker starts decoding at run_start,
+    warmup_frames earlier, so that player baselines and tracks are
+    established by the time it reaches its own frames.
+    """
+    segments = max(1, min(segments, total_frames))
+    bounds = [round(total_frames * i / segments) for i in range(segments + 1)]
+    return [(bounds[i], bounds[i + 1], max(0, bounds[i] - warmup_frames)) for i in range(segments)]
+
+
+def player_snapshot(all_players, raid_active):
+    """Comparable raid state: raid flag plus last position and baseline of every tracked player"""
+    players = sorted(track.last_position()[:2] + (track.baseline_side,)
+                     for track in all_players.values() if len(track))
+    return raid_active, players
+
+
+def snapshots_match(a, b, max_distance=40):
+    """True if both runs are idle and every player has a counterpart with the same baseline"""
+    (raid_a, players_a), (raid_b, players_b) = a, b
+    if raid_a or raid_b or len(players_a) != len(players_b):
+        return False
+    
+    remaining = list(players_b)
+    for x, y, baseline in players_a:
+        match = None
+        for other in remaining:
+            if other[2] == baseline and abs(other[0] - x) <= max_distance and abs(other[1] - y) <= max_distance:
+                match = other
+                break
+        if match is None:
+            return False
+        remaining.remove(match)
+    return True
+
+
+def extract_segment(video_path, segment, keyframes_dir, options, sync_frames=0, seed_players=None):
+    """
+    Worker: extract one segment.
+    
+    Extraction runs past seg_end while a raid is still active, so a raid that
+    spans the boundary is completed by the segment it started in; end_frame
+    is the idle frame where the worker stopped, and final_players its player
+    state there. Snapshots of the first sync_frames frames after seg_start
+    are kept to check this run against the previous segment's final state.
+    Keyframes go to a container of the segment in its own directory.
+    """
+    from scripts.data_extract import DataExtractor
+    
+    seg_start, seg_end, run_start = segment
+    summary = {'segment': segment, 'raids': [], 'frames': 0, 'seconds': 0.0, 'error': None,
+               'end_frame': run_start, 'final_players': {}, 'final_snapshot': None, 'snapshots': {},
+               'keyframes': None}
+    
+    start = time.perf_counter()
+    try:
+        extractor = DataExtractor(video_path)
+        extractor.keyframes_dir = os.path.join(keyframes_dir, f"segment_{seg_start}_{seg_end}")
+        os.makedirs(extractor.keyframes_dir, exist_ok=True)
+        summary['keyframes'] = extractor.keyframe_path()
+        
+        state = {}
+        
+        def on_frame(frame_count, all_players):
+            state['frame'] = frame_count
+            state['players'] = all_players
+            if seg_start <= frame_count <= seg_start + sync_frames:
+                summary['snapshots'][frame_count] = player_snapshot(all_players, extractor.raid_active)
+        
+        summary['raids'] = extractor.extract_data(display=False, start_frame=run_start, end_frame=seg_end,
+                                                  seed_players=seed_players, on_frame=on_frame, **options)
+        summary['frames'] = extractor.frames_processed
+        summary['end_frame'] = state.get('frame', run_start)
+        summary['final_players'] = state.get('players', {})
+        summary['final_snapshot'] = player_snapshot(summary['final_players'], False)
+    except Exception as e:
+        summary['error'] = str(e)
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def stitch_segments(summaries, rerun):
+    """
+    Chain segment results into the raid list of a sequential run.
+    
+    The first segment starts at frame 0 and is exact. Each following segment
+    is handed over at the idle frame where the previous one stopped: if its
+    own state at that frame matches (same baselines, no raid active), its
+    raids after the handover are kept as they are. Otherwise it started with
+    the wrong baselines, e.g. because its warm-up began mid-raid, and
+    rerun(segment, seed_players) extracts it again from the handover frame,
+    seeded with the previous segment's player state.
+    
+    Returns (raids, reruns, keyframe_sources) where keyframe_sources gives
+    the (keyframe container, raid number in that segment) of every raid.
+    """
+    previous = summaries[0]
+    if previous['error']:
+        raise RuntimeError(f"Segment {previous['segment']} failed: {previous['error']}")
+    raids = list(previous['raids'])
+    keyframe_sources = [(previous['keyframes'], n) for n in range(1, len(raids) + 1)]
+    reruns = 0
+    
+    for current in summaries[1:]:
+        seg_start, seg_end, _ = current['segment']
+        handover = previous['end_frame']
+        
+        if handover >= seg_end:
+            # The previous segment's last raid ran through this whole segment
+            continue
+        
+        snapshot = current['snapshots'].get(handover)
+        if current['error'] or snapshot is None or not snapshots_match(previous['final_snapshot'], snapshot):
+            print(f"🔁 Segment {seg_start + 1}-{seg_end} out of sync at frame {handover}, re-running from there")
+            current = rerun((handover, seg_end, handover), previous['final_players'])
+            reruns += 1
+            if current['error']:
+                raise RuntimeError(f"Segment {current['segment']} failed: {current['error']}")
+        
+        for n, raid in enumerate(current['raids'], 1):
+            if raid['start_frame'] > handover:
+                raids.append(raid)
+                keyframe_sources.append((current['keyframes'], n))
+        previous = current
+    
+    return raids, reruns, keyframe_sources
+
+
+def print_summary(summaries, raids, reruns, wall_seconds, workers):
+    print("\n" + "=" * 70)
+    print("📊 SEGMENT EXTRACTION SUMMARY")
+    print("=" * 70)
+    
+    total_frames = 0
+    for s in summaries:
+        seg_start, seg_end, run_start = s['segment']
+        label = f"frames {seg_start + 1}-{seg_end}"
+        if s['error']:
+            print(f"❌ {label}: {s['error']}")
+            continue
+        fps = s['frames'] / s['seconds'] if s['seconds'] > 0 else 0
+        total_frames += s['frames']
+        print(f"✓ {label}: {s['frames']} frames (warm-up {seg_start - run_start}) "
+              f"in {s['seconds']:.1f}s ({fps:.1f} FPS)")
+    
+    print("-" * 70)
+    print(f"Raids: {len(raids)} | Segments: {len(summaries)} ({reruns} re-run) | Workers: {workers}")
+    print(f"Wall time: {wall_seconds:.1f}s | Frames decoded: {total_frames} | "
+          f"Throughput: {total_frames / wall_seconds if wall_seconds > 0 else 0:.1f} FPS")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract raid metrics from one long match video in parallel segments")
+    parser.add_argument("video", help="Match video path")
+    parser.add_argument("--segments", type=int, default=4, help="Number of time segments")
+    parser.add_argument("--workers", type=int, default=None, help="Segments processed at once (default: --segments)")
+    parser.add_argument("--threads-per-worker", type=int, default=max(1, (os.cpu_count() or 2) // 4),
+                        help="torch/OpenCV threads per worker")
+    parser.add_argument("--warmup-seconds", type=float, default=10.0,
+                        help="Video decoded before each segment to settle baselines and tracks")
+    parser.add_argument("--sync-seconds", type=float, default=60.0,
+                        help="How far into a segment the handover from the previous one is checked")
+    parser.add_argument("--output-dir", default=os.path.join(ROOT_DIR, "data", "extracted"),
+                        help="Where the *_raid_metrics.csv file is written")
+    parser.add_argument("--batch-size", type=int, default=1, help="Frames per pose inference batch")
+    parser.add_argument("--adaptive", action="store_true", help="Cheaper inference between raids")
+    parser.add_argument("--crop-court", action="store_true", help="Only run pose inference on the play box region")
+    parser.add_argument("--cache", action="store_true", help="Replay cached detections when valid (see data_extract.py)")
+    parser.add_argument("--jpeg-quality", type=int, default=95, help="JPEG quality of saved keyframes (0-100)")
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.video):
+        print(f"❌ Video not found: {args.video}")
+        sys.exit(1)
+    if not has_court_config(args.video):
+        print("Run: python court/setup_play_area.py <video>")
+        sys.exit(1)
+    
+    cap = cv2.VideoCapture(args.video)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    cap.release()
+    if total_frames <= 0:
+        print(f"❌ Could not read frame count of {args.video}")
+        sys.exit(1)
+    
+    segments = plan_segments(total_frames, args.segments, int(args.warmup_seconds * fps))
+    workers = max(1, min(args.workers or len(segments), len(segments)))
+    sync_frames = int(args.sync_seconds * fps)
+    options = {'batch_size': args.batch_size, 'adaptive': args.adaptive, 'crop_to_court': args.crop_court,
+               'use_cache': args.cache, 'jpeg_quality': args.jpeg_quality}
+    
+    video_name = os.path.splitext(os.path.basename(args.video))[0]
+    # Per-segment keyframe containers, merged into the video's container at the end
+    keyframes_dir = os.path.join(ROOT_DIR, "data", "keyframes", f"{video_name}_segments")
+    
+    print(f"🎬 {total_frames} frames in {len(segments)} segments with {workers} workers x {args.threads_per_worker} threads")
+    
+    start = time.perf_counter()
+    summaries = []
+    # spawn: torch and OpenCV thread pools do not survive fork reliably
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=limit_threads, initargs=(args.threads_per_worker,)) as pool:
+        futures = [pool.submit(extract_segment, args.video, segment, keyframes_dir, options, sync_frames)
+                   for segment in segments]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            seg_start, seg_end, _ = summary['segment']
+            status = "❌ failed" if summary['error'] else "✅ done"
+            print(f"{status}: frames {seg_start + 1}-{seg_end} ({summary['seconds']:.1f}s)")
+        
+        summaries.sort(key=lambda s: s['segment'])
+        
+        def rerun(segment, seed_players):
+            return pool.submit(extract_segment, args.video, segment, keyframes_dir, options,
+                               0, seed_players).result()
+        
+        try:
+            raids, reruns, keyframe_sources = stitch_segments(summaries, rerun)
+        except RuntimeError as e:
+            print(f"❌ {e}; no CSV written")
+            sys.exit(1)
+    
+    print_summary(summaries, raids, reruns, time.perf_counter() - start, workers)
+    
+    from extraction.keyframes import container_path, merge_containers
+    
+    keyframes_path = merge_containers(container_path(os.path.dirname(keyframes_dir), args.video), keyframe_sources,
+                                      info={'video': os.path.abspath(args.video), 'fps': fps})
+    shutil.rmtree(keyframes_dir, ignore_errors=True)
+    print(f"Keyframes: {keyframes_path}")
+    
+    from analytics.raid_extractor import RaidMetricsExtractor
+    from court.simplified_court import SimplifiedCourtDynamics
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f"{video_name}_raid_metrics.csv")
+    metrics_extractor = RaidMetricsExtractor(SimplifiedCourtDynamics.load_from_config(args.video), fps)
+    metrics_extractor.export_to_csv(raids, output_path)
+    print(f"Saved to: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Synthetic Match Video
+Renders scripted kabaddi matches with their court configuration and checks the extractor against the script
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from court.simplified_court import CONFIG_DIR
+from synthetic.match import SyntheticMatch, truth_path
+
+# Synthetic courts are kept out of config/play_area.json unless asked for
+SYNTHETIC_CONFIG = os.path.join(CONFIG_DIR, 'synthetic_play_area.json')
+
+
+def save_court_config(video_path, config, config_file=None):
+    """Add or replace the play_area.json entry of a video"""
+    config_file = config_file or os.path.join(CONFIG_DIR, 'play_area.json')
+    all_configs = {}
+    if os.path.exists(config_file):
+        with open(config_file, 'r') as f:
+            all_configs = json.load(f)
+    all_configs[video_path] = config
+    with open(config_file, 'w') as f:
+        json.dump(all_configs, f, indent=2)
+    return config_file
+
+
+def render(args):
+    match = SyntheticMatch(args.width, args.height, args.fps, args.raids, args.players, args.extras, args.seed)
+    print(f"🎨 Rendering {match.num_frames} frames at {args.width}x{args.height}, "
+          f"{2 * args.players + args.extras} people, {args.raids} raids")
+    start = time.perf_counter()
+    path = match.render(args.video)
+    print(f"✓ Video: {args.video} ({time.perf_counter() - start:.1f}s)")
+    print(f"✓ Ground truth: {path}")
+    print(f"✓ Court configuration: {save_court_config(args.video, match.court_config(), args.config)}")
+
+
+def check(args):
+    from scripts.data_extract import DataExtractor
+    from synthetic.stub_pose import StubPoseTracker
+    
+    match = SyntheticMatch.load(truth_path(args.video))
+    extractor = DataExtractor(args.video, config_file=args.config)
+    extractor.pose_tracker = StubPoseTracker(match, jitter=args.jitter)
+    
+    start = time.perf_counter()
+    raids = extractor.extract_data(display=False, batch_size=args.batch_size, adaptive=args.adaptive,
+                                   crop_to_court=args.crop_court, profile_path=args.profile)
+    seconds = time.perf_counter() - start
+    pairs, spurious = match.compare(raids, args.tolerance)
+    
+    print("\n" + "=" * 70)
+    print("🧪 SYNTHETIC MATCH CHECK")
+    print("=" * 70)
+    matched = 0
+    for expected, found in pairs:
+        label = f"P{expected['raider_id']} from frame {expected['start_frame']}"
+        if found is None:
+            print(f"❌ {label}: not detected")
+            continue
+        flags = [name for name in ('crossed_baulk', 'crossed_bonus') if bool(found[name]) != expected[name]]
+        if not flags:
+            matched += 1
+        status = f"⚠ wrong {', '.join(flags)}" if flags else "✓"
+        print(f"{status} {label}: detected {found['start_frame']}-{found['end_frame']} "
+              f"(expected {expected['start_frame']}-{expected['end_frame']}), "
+              f"baulk={bool(found['crossed_baulk'])} bonus={bool(found['crossed_bonus'])}")
+    for raid in spurious:
+        print(f"❌ Unexpected raid: P{raid['raider_id']} frames {raid['start_frame']}-{raid['end_frame']}")
+    
+    frames = extractor.frames_processed
+    print("-" * 70)
+    print(f"{matched}/{len(pairs)} scripted raids matched, {len(spurious)} unexpected | "
+          f"{frames} frames in {seconds:.1f}s ({frames / seconds if seconds > 0 else 0:.1f} FPS, no model)")
+    return matched == len(pairs) and not spurious
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render synthetic kabaddi matches and benchmark the extractor on them")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    render_parser = commands.add_parser("render", help="Render a match video, its ground truth and court configuration")
+    render_parser.add_argument("video", help="Output video path (.mp4)")
+    render_parser.add_argument("--width", type=int, default=1920)
+    render_parser.add_argument("--height", type=int, default=1080)
+    render_parser.add_argument("--fps", type=float, default=30.0)
+    render_parser.add_argument("--raids", type=int, default=6, help="Scripted raids, teams alternating")
+    render_parser.add_argument("--players", type=int, default=7, help="Players per team")
+    render_parser.add_argument("--extras", type=int, default=2, help="People standing outside the play box")
+    render_parser.add_argument("--seed", type=int, default=0)
+    render_parser.add_argument("--config", default=SYNTHETIC_CONFIG,
+                               help="Court configuration file to add the video to; pass config/play_area.json "
+                                    "to run the other extraction scripts on it")
+    
+    check_parser = commands.add_parser("check", help="Run DataExtractor with the stub pose model and compare raids")
+    check_parser.add_argument("video", help="Video written by the render command")
+    check_parser.add_argument("--batch-size", type=int, default=1)
+    check_parser.add_argument("--adaptive", action="store_true")
+    check_parser.add_argument("--crop-court", action="store_true")
+    check_parser.add_argument("--jitter", type=float, default=0.0, help="Pixel noise added to detections")
+    check_parser.add_argument("--tolerance", type=float, default=1.0,
+                              help="Seconds a detected raid start may differ from the script")
+    check_parser.add_argument("--profile", default=None, metavar="REPORT", help="Save a stage profile to this JSON file")
+    check_parser.add_argument("--config", default=SYNTHETIC_CONFIG, help="Court configuration file the video was rendered to")
+    args = parser.parse_args()
+    
+    if args.command == "render":
+        render(args)
+    elif not check(args):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -39,13 +39,13 @@ class KabaddiAnalyticsApp:
         # Create main interface
         self.create_main_interface()
         
-    def load_data(self):
-        """Load extracted raid data and calculate rankings"""
+    def load_data(self, csv_path=None):
+        """Load extracted raid data (synthetic_data.csv unless csv_path is given) and calculate rankings"""
         self.data = []
         root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         
         # Force load synthetic data
-        csv_path = os.path.join(root_dir, "data", "synthetic", "synthetic_data.csv")
+        csv_path = csv_path or os.path.join(root_dir, "data", "synthetic", "synthetic_data.csv")
         print(f"\n{'='*70}")
         print(f"LOADING DATA FROM: {csv_path}")
         print(f"File exists: {os.path.exists(csv_path)}")
@@ -437,7 +437,8 @@ class KabaddiAnalyticsApp:
             from scripts.data_extract import DataExtractor
             
             extractor = DataExtractor(VIDEO_PATH)
-            raids = extractor.extract_data(display=True)  # Changed to True to show live processing
+            # Raid starts, line crossings and raid ends are logged as they happen
+            raids = extractor.extract_data(display=True, on_event=lambda event: self.log_status(event.describe()))
             
             self.log_status(f"Extraction complete! Total raids: {len(raids)}")
             
@@ -1,41 +1,144 @@
 import tkinter as tk
-from tkinter import messagebox, simpledialog
+from tkinter import filedialog, messagebox, simpledialog
+import glob
 import os
+import sys
+import threading
+from collections import OrderedDict
 import cv2
 from PIL import Image, ImageTk
 
+# Go up two levels: src/ui -> src -> root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT_DIR)
+
+from extraction.keyframes import KEYFRAME_EXTENSION, KeyframeContainer, pack_loose_keyframes
+from raid_player import find_raid_metrics, load_raids, open_raid_player
+
+KEYFRAME_DIRS = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "keyframes"),
+    os.path.join("data", "keyframes"),
+    os.path.join(ROOT_DIR, "data", "keyframes")
+]
+
+# Loose JPEG keyframes of older runs are packed into this container once
+LOOSE_CONTAINER = "earlier_runs" + KEYFRAME_EXTENSION
+
+DISPLAY_SIZE = (900, 550)
+
+
+class KeyframePrefetcher:
+    """
+    Display-ready keyframe images, decoded ahead of navigation.
+    
+    A background thread reads, decodes, converts and resizes requested
+    keyframes into an LRU of at most `capacity` RGB images, so the Tk thread
+    never waits on disk or JPEG decoding. PhotoImages must be created and
+    released on the Tk thread, so they live in a separate, smaller LRU that
+    only the Tk thread touches (get_photo).
+    """
+    
+    def __init__(self, capacity=32, photo_capacity=8, size=DISPLAY_SIZE):
+        self.capacity = capacity
+        self.photo_capacity = photo_capacity
+        self.size = size
+        self._images = OrderedDict()  # key -> RGB image, or None if it could not be read
+        self._photos = OrderedDict()  # key -> PhotoImage (Tk thread only)
+        self._queue = []              # (key, container, entry), most urgent last
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="keyframe-prefetch", daemon=True)
+        self._thread.start()
+    
+    def request(self, items):
+        """Decode (key, container, entry) items in the background, in order; replaces earlier requests"""
+        with self._lock:
+            self._queue = [item for item in reversed(items) if item[0] not in self._images]
+        self._wakeup.set()
+    
+    def get_photo(self, key):
+        """
+        PhotoImage of a keyframe: None while it is still being decoded,
+        False if it could not be read. Call from the Tk thread only.
+        """
+        photo = self._photos.get(key)
+        if photo is not None:
+            self._photos.move_to_end(key)
+            return photo
+        with self._lock:
+            if key not in self._images:
+                return None
+            self._images.move_to_end(key)
+            image = self._images[key]
+        if image is None:
+            return False
+        
+        photo = self._photos[key] = ImageTk.PhotoImage(Image.fromarray(image))
+        while len(self._photos) > self.photo_capacity:
+            self._photos.popitem(last=False)
+        return photo
+    
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while not self._stopped:
+                with self._lock:
+                    if not self._queue:
+                        break
+                    key, container, entry = self._queue.pop()
+                    if key in self._images:
+                        continue
+                
+                image = container.read_image(entry)
+                if image is not None:
+                    image = cv2.cvtColor(cv2.resize(image, self.size), cv2.COLOR_BGR2RGB)
+                with self._lock:
+                    self._images[key] = image
+                    while len(self._images) > self.capacity:
+                        self._images.popitem(last=False)
+    
+    def close(self):
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(timeout=1.0)
+        self._photos.clear()
+
+
+def find_keyframe_containers():
+    """Keyframe containers of all processed videos, most recent first"""
+    paths = set()
+    for directory in KEYFRAME_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        found = glob.glob(os.path.join(directory, "*" + KEYFRAME_EXTENSION))
+        if not found and any(f.endswith('.jpg') for f in os.listdir(directory)):
+            packed = os.path.join(directory, LOOSE_CONTAINER)
+            if pack_loose_keyframes(directory, packed):
+                found = [packed]
+        paths.update(os.path.realpath(p) for p in found)
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+
 def open_keyframe_viewer(parent_root):
     """Open keyframe viewer window"""
-    keyframes_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "keyframes")
-    if not os.path.exists(keyframes_dir):
-        keyframes_dir = os.path.join("data", "keyframes")
+    containers = {}
+    for path in find_keyframe_containers():
+        try:
+            container = KeyframeContainer(path)
+        except (OSError, ValueError, KeyError):
+            continue
+        if container.entries:
+            containers[os.path.splitext(os.path.basename(path))[0]] = container
     
-    if not os.path.exists(keyframes_dir):
+    if not containers:
         messagebox.showinfo("Info", "No key frames found. Please run video processing first.")
         return
     
-    frame_files = [f for f in os.listdir(keyframes_dir) if f.endswith('.jpg')]
-    if not frame_files:
-        messagebox.showinfo("Info", "No key frames available. Please run video processing first.")
-        return
-    
-    # Organize frames by raid and event type
-    raids_data = {}
-    for fname in frame_files:
-        parts = fname.replace('.jpg', '').split('_')
-        if len(parts) >= 4:
-            raid_num = int(parts[1])
-            event_type = parts[2]
-            
-            if raid_num not in raids_data:
-                raids_data[raid_num] = {'start': None, 'baulk': None, 'bonus': None, 'end': None, 'lost': None}
-            
-            if event_type in raids_data[raid_num] and raids_data[raid_num][event_type] is None:
-                raids_data[raid_num][event_type] = fname
-    
-    if not raids_data:
-        messagebox.showinfo("Info", "No valid raid key frames found.")
-        return
+    # Raid number -> {event type: index entry} of the selected video
+    current_video = tk.StringVar(value=next(iter(containers)))
+    raids_data = containers[current_video.get()].raids()
     
     # Create viewer window
     live_window = tk.Toplevel(parent_root)
@@ -49,6 +152,18 @@ def open_keyframe_viewer(parent_root):
     tk.Label(live_window, text="Navigate through raid events: Start → Baulk → Bonus → End", 
             font=("Arial", 11), fg='#ecf0f1', bg='#2c3e50').pack()
     
+    if len(containers) > 1:
+        def select_video(name):
+            raids_data.clear()
+            raids_data.update(containers[name].raids())
+            current_raid.set(min(raids_data.keys()))
+            current_event_idx.set(0)
+            update_display()
+        
+        video_menu = tk.OptionMenu(live_window, current_video, *containers, command=select_video)
+        video_menu.config(font=("Arial", 11), bg='#34495e', fg='white')
+        video_menu.pack(pady=5)
+    
     # Current state
     current_raid = tk.IntVar(value=min(raids_data.keys()))
     event_sequence = ['start', 'baulk', 'bonus', 'end']
@@ -77,6 +192,34 @@ def open_keyframe_viewer(parent_root):
     message_label = tk.Label(image_frame, text="", font=("Arial", 16, "bold"), 
                             fg='#e74c3c', bg='#34495e')
     
+    prefetcher = KeyframePrefetcher()
+    pending = {'job': None}
+    
+    def prefetch_order(raid_num, event_idx):
+        """Keyframes to decode: the shown one, the rest of its raid nearest first, then the adjacent raids"""
+        video = current_video.get()
+        by_distance = sorted(range(len(event_sequence)), key=lambda i: (abs(i - event_idx), i < event_idx))
+        wanted = [(raid_num, event_sequence[i]) for i in by_distance]
+        raid_keys = sorted(raids_data.keys())
+        position = raid_keys.index(raid_num)
+        if position + 1 < len(raid_keys):
+            wanted.append((raid_keys[position + 1], event_sequence[0]))
+        if position > 0:
+            previous = raids_data[raid_keys[position - 1]]
+            wanted += [(raid_keys[position - 1], e) for e in reversed(event_sequence) if e in previous][:1]
+        return [((video, raid, event), containers[video], raids_data[raid][event])
+                for raid, event in wanted if event in raids_data[raid]]
+    
+    def show_keyframe(key):
+        """Show a keyframe once the prefetch thread has decoded it, polling without blocking the UI"""
+        pending['job'] = None
+        photo = prefetcher.get_photo(key)
+        if photo is None:
+            pending['job'] = live_window.after(15, show_keyframe, key)
+        elif photo:
+            frame_label.configure(image=photo)
+            frame_label.image = photo
+    
     def update_display():
         raid_num = current_raid.get()
         event_idx = current_event_idx.get()
@@ -87,22 +230,17 @@ def open_keyframe_viewer(parent_root):
         event_info.set(f"Event: {event_type.upper()} ({event_idx + 1}/4)")
         
         # Check if this event exists for current raid
-        frame_file = raids_data[raid_num].get(event_type)
+        entry = raids_data[raid_num].get(event_type)
+        if pending['job'] is not None:
+            live_window.after_cancel(pending['job'])
+            pending['job'] = None
+        prefetcher.request(prefetch_order(raid_num, event_idx))
         
-        if frame_file:
-            # Show image
+        if entry:
+            # Show image: decoded in the background, usually before it is needed
             message_label.pack_forget()
             frame_label.pack(fill='both', expand=True)
-            
-            frame_path = os.path.join(keyframes_dir, frame_file)
-            if os.path.exists(frame_path):
-                img = cv2.imread(frame_path)
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                img = cv2.resize(img, (900, 550))
-                
-                photo = ImageTk.PhotoImage(Image.fromarray(img))
-                frame_label.configure(image=photo)
-                frame_label.image = photo
+            show_keyframe((current_video.get(), raid_num, event_type))
         else:
             # Show "not detected" message
             frame_label.pack_forget()
@@ -172,6 +310,26 @@ def open_keyframe_viewer(parent_root):
             current_event_idx.set(0)
             update_display()
     
+    def play_raid():
+        """Play the current raid from the source video"""
+        video_name = current_video.get()
+        video_path = containers[video_name].info.get('video')
+        if not video_path or not os.path.exists(video_path):
+            video_path = filedialog.askopenfilename(title=f"Select the video of {video_name}",
+                                                    filetypes=[("Video files", "*.mp4 *.avi *.mov *.mkv")])
+            if not video_path:
+                return
+        csv_path = find_raid_metrics(video_name, video_path) or filedialog.askopenfilename(
+            title="Select the raid metrics CSV", filetypes=[("CSV files", "*.csv")])
+        if not csv_path:
+            return
+        try:
+            raids = load_raids(csv_path)
+        except (OSError, KeyError, ValueError) as e:
+            messagebox.showerror("Error", f"Cannot read raid frames from {csv_path}: {e}")
+            return
+        open_raid_player(live_window, video_path, raids, current_raid.get())
+    
     # Navigation buttons
     tk.Button(button_frame, text="◀ Previous", command=prev_event, 
              bg='#95a5a6', fg='white', font=("Arial", 12, "bold"), 
@@ -185,5 +343,17 @@ def open_keyframe_viewer(parent_root):
              bg='#e67e22', fg='white', font=("Arial", 12, "bold"), 
              padx=20, pady=10, width=12).pack(side='left', padx=10)
     
+    tk.Button(button_frame, text="▶ Play Raid", command=play_raid, 
+             bg='#27ae60', fg='white', font=("Arial", 12, "bold"), 
+             padx=20, pady=10, width=12).pack(side='left', padx=10)
+    
+    def close():
+        if pending['job'] is not None:
+            live_window.after_cancel(pending['job'])
+        prefetcher.close()
+        live_window.destroy()
+    
+    live_window.protocol("WM_DELETE_WINDOW", close)
+    
     # Initial display
     update_display()
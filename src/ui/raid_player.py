@@ -0,0 +1,247 @@
+"""
+Raid Playback
+Plays raids back from the source match video using the start/end frames of the raid metrics CSV
+"""
+
+import csv
+import os
+import threading
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import messagebox
+
+import cv2
+from PIL import Image, ImageTk
+
+# Go up two levels: src/ui -> src -> root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DISPLAY_SIZE = (900, 550)
+
+
+class VideoFrameReader:
+    """
+    Random access to the decoded frames of one video (frame numbers start at 1).
+    
+    Decoded frames (after `transform`, e.g. resizing for display) are kept
+    in an LRU cache of cache_size frames. A background thread reads ahead
+    of the playback position: after set_position(n) it decodes frames
+    n+1 .. n+read_ahead, within the range set by set_range(), one after the
+    other, so playback and short scrubs are served from the cache and the
+    capture only seeks when the position jumps.
+    """
+    
+    def __init__(self, video_path, cache_size=120, read_ahead=45, transform=None):
+        self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Failed to open video: {video_path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.cache_size = max(cache_size, read_ahead + 1)
+        self.read_ahead = read_ahead
+        self.transform = transform
+        
+        self._frames = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._capture_lock = threading.Lock()
+        self._next_frame = 1  # frame the capture returns on the next read()
+        self._position = 0
+        self._end = self.total_frames
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._read_ahead_loop, name="read-ahead", daemon=True)
+        self._thread.start()
+    
+    def _cached(self, frame_number):
+        with self._cache_lock:
+            frame = self._frames.get(frame_number)
+            if frame is not None:
+                self._frames.move_to_end(frame_number)
+            return frame
+    
+    def get(self, frame_number):
+        """Decoded frame, or None past the end of the video"""
+        frame = self._cached(frame_number)
+        return frame if frame is not None else self._decode(frame_number)
+    
+    def _decode(self, frame_number):
+        with self._capture_lock:
+            # The other thread may have decoded it while we waited
+            frame = self._cached(frame_number)
+            if frame is not None or self._stopped:
+                return frame
+            
+            if frame_number != self._next_frame:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number - 1)
+            ret, frame = self.cap.read()
+            if not ret:
+                self._next_frame = None
+                return None
+            self._next_frame = frame_number + 1
+        
+        if self.transform is not None:
+            frame = self.transform(frame)
+        with self._cache_lock:
+            self._frames[frame_number] = frame
+            while len(self._frames) > self.cache_size:
+                self._frames.popitem(last=False)
+        return frame
+    
+    def set_range(self, start, end):
+        """Limit read-ahead to frames start..end (one raid)"""
+        self._end = min(end, self.total_frames) if self.total_frames > 0 else end
+        self.set_position(start)
+    
+    def set_position(self, frame_number):
+        """Current playback position; read-ahead continues from here"""
+        self._position = frame_number
+        self._wakeup.set()
+    
+    def _next_missing(self):
+        position = self._position
+        with self._cache_lock:
+            for frame_number in range(position + 1, min(position + self.read_ahead, self._end) + 1):
+                if frame_number not in self._frames:
+                    return frame_number
+        return None
+    
+    def _read_ahead_loop(self):
+        while not self._stopped:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while not self._stopped:
+                frame_number = self._next_missing()
+                if frame_number is None or self._decode(frame_number) is None:
+                    break
+    
+    def close(self):
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(timeout=1.0)
+        with self._capture_lock:
+            self.cap.release()
+
+
+def find_raid_metrics(video_name, video_path=None):
+    """Raid metrics CSV written for a video by data_extract.py or the UI, if any"""
+    candidates = [os.path.join(ROOT_DIR, "data", "extracted", f"{video_name}_raid_metrics.csv"),
+                  os.path.join("data", "extracted", f"{video_name}_raid_metrics.csv")]
+    if video_path:
+        candidates.append(os.path.splitext(video_path)[0] + "_raid_metrics.csv")
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_raids(csv_path):
+    """(start_frame, end_frame) of every raid in a raid metrics CSV, in raid order"""
+    with open(csv_path, newline='') as f:
+        return [(int(float(row['start_frame'])), int(float(row['end_frame']))) for row in csv.DictReader(f)]
+
+
+def open_raid_player(parent_root, video_path, raids, raid_number=1):
+    """Open a playback window for raids [(start_frame, end_frame), ...] of video_path, starting at raid_number"""
+    if not raids:
+        messagebox.showinfo("Info", "No raids to play back.")
+        return
+    
+    def to_display(frame):
+        return cv2.cvtColor(cv2.resize(frame, DISPLAY_SIZE), cv2.COLOR_BGR2RGB)
+    
+    try:
+        reader = VideoFrameReader(video_path, transform=to_display)
+    except RuntimeError as e:
+        messagebox.showerror("Error", str(e))
+        return
+    
+    window = tk.Toplevel(parent_root)
+    window.title(f"Raid Playback - {os.path.basename(video_path)}")
+    window.geometry("1000x780")
+    window.configure(bg='#2c3e50')
+    
+    state = {'raid': min(max(1, raid_number), len(raids)), 'frame': 0, 'playing': False, 'job': None}
+    
+    info = tk.StringVar()
+    tk.Label(window, textvariable=info, font=("Arial", 14, "bold"),
+            fg='#3498db', bg='#2c3e50').pack(pady=10)
+    
+    frame_label = tk.Label(window, bg='#34495e')
+    frame_label.pack(padx=20, pady=5)
+    
+    def show(frame_number):
+        start, end = raids[state['raid'] - 1]
+        state['frame'] = frame_number
+        reader.set_position(frame_number)
+        frame = reader.get(frame_number)
+        if frame is not None:
+            photo = ImageTk.PhotoImage(Image.fromarray(frame))
+            frame_label.configure(image=photo)
+            frame_label.image = photo
+        info.set(f"Raid #{state['raid']} ({state['raid']}/{len(raids)}) | Frame {frame_number} "
+                 f"({start}-{end}) | {(frame_number - start) / reader.fps:.1f}s")
+    
+    def on_scrub(value):
+        frame_number = int(float(value))
+        if frame_number != state['frame']:
+            show(frame_number)
+    
+    slider = tk.Scale(window, orient='horizontal', length=900, showvalue=False, command=on_scrub,
+                      bg='#2c3e50', fg='white', highlightthickness=0)
+    slider.pack(pady=5)
+    
+    def tick():
+        state['job'] = None
+        if not state['playing']:
+            return
+        _, end = raids[state['raid'] - 1]
+        if state['frame'] >= end:
+            toggle_play()
+            return
+        show(state['frame'] + 1)
+        slider.set(state['frame'])
+        state['job'] = window.after(int(1000 / reader.fps), tick)
+    
+    def toggle_play():
+        state['playing'] = not state['playing']
+        play_button.config(text="⏸ Pause" if state['playing'] else "▶ Play")
+        if state['playing'] and state['job'] is None:
+            if state['frame'] >= raids[state['raid'] - 1][1]:
+                show(raids[state['raid'] - 1][0])
+            tick()
+    
+    def select_raid(raid):
+        if not 1 <= raid <= len(raids):
+            return
+        state['raid'] = raid
+        start, end = raids[raid - 1]
+        reader.set_range(start, end)
+        slider.configure(from_=start, to=end)
+        show(start)
+        slider.set(start)
+    
+    def close():
+        state['playing'] = False
+        if state['job'] is not None:
+            window.after_cancel(state['job'])
+        reader.close()
+        window.destroy()
+    
+    button_frame = tk.Frame(window, bg='#2c3e50')
+    button_frame.pack(pady=10)
+    
+    tk.Button(button_frame, text="◀ Previous Raid", command=lambda: select_raid(state['raid'] - 1),
+             bg='#95a5a6', fg='white', font=("Arial", 12, "bold"),
+             padx=20, pady=10, width=14).pack(side='left', padx=10)
+    
+    play_button = tk.Button(button_frame, text="▶ Play", command=toggle_play,
+                            bg='#27ae60', fg='white', font=("Arial", 12, "bold"),
+                            padx=20, pady=10, width=10)
+    play_button.pack(side='left', padx=10)
+    
+    tk.Button(button_frame, text="Next Raid ▶", command=lambda: select_raid(state['raid'] + 1),
+             bg='#3498db', fg='white', font=("Arial", 12, "bold"),
+             padx=20, pady=10, width=14).pack(side='left', padx=10)
+    
+    window.protocol("WM_DELETE_WINDOW", close)
+    select_raid(state['raid'])
@@ -0,0 +1,349 @@
+"""
+Synthetic Match
+Deterministic scripted kabaddi match on a generated court: player motion, raids, rendering and ground truth
+"""
+
+import bisect
+import json
+import math
+import os
+
+import cv2
+import numpy as np
+
+# Court in meters: midline at u = 0, end lines at u = -6.5 / 6.5, sidelines at v = 0 / 10
+HALF_LENGTH = 6.5
+COURT_WIDTH = 10.0
+BAULK_DEPTH = 3.75
+BONUS_DEPTH = 4.75
+
+# Standing figure: (dx, dy) of the COCO keypoints from the feet, in body heights
+FIGURE = np.array([
+    (0.00, -0.93),                  # nose
+    (0.02, -0.95), (-0.02, -0.95),  # eyes
+    (0.04, -0.94), (-0.04, -0.94),  # ears
+    (0.11, -0.80), (-0.11, -0.80),  # shoulders
+    (0.15, -0.63), (-0.15, -0.63),  # elbows
+    (0.16, -0.47), (-0.16, -0.47),  # wrists
+    (0.07, -0.50), (-0.07, -0.50),  # hips
+    (0.07, -0.27), (-0.07, -0.27),  # knees
+    (0.07, -0.03), (-0.07, -0.03),  # ankles
+])
+# Stride per keypoint while running: legs swing against the arms
+STRIDE = np.zeros(17)
+STRIDE[[13, 15]] = (0.05, 0.10)
+STRIDE[[14, 16]] = (-0.05, -0.10)
+STRIDE[[9, 10]] = (-0.05, 0.05)
+SKELETON = ((5, 6), (5, 7), (7, 9), (6, 8), (8, 10), (5, 11), (6, 12), (11, 12),
+            (11, 13), (13, 15), (12, 14), (14, 16))
+
+TEAM_COLORS = ((40, 40, 220), (220, 120, 30))  # BGR
+EXTRA_COLOR = (150, 150, 150)
+MAT_COLOR = (95, 150, 200)
+LOBBY_COLOR = (80, 120, 160)
+
+# Frame number stamp: one black/white block per bit, bottom left corner
+STAMP_BITS = 20
+
+# Raider speeds in m/s and the hold at the deepest point in seconds
+WALK_SPEED = 1.2
+RUN_SPEED = 3.0
+HOLD_SECONDS = 0.4
+# Raid depths well clear of the baulk and bonus lines, so the expected crossings are unambiguous
+DEPTH_CLASSES = (2.6, 4.25, 5.6)
+
+
+def truth_path(video_path):
+    """Ground truth file written next to a rendered video"""
+    return os.path.splitext(video_path)[0] + "_truth.json"
+
+
+class SyntheticMatch:
+    """
+    A scripted match on a synthetic court, fully determined by its settings.
+    
+    Court coordinates are meters: u along the court from the midline (team 0
+    defends u < 0, team 1 u > 0) and v across it from the far sideline. The
+    camera is an affine view without perspective, so the court lines are
+    exactly parallel, as SimplifiedCourtDynamics assumes, and depths measured
+    in the image are exact.
+    
+    Teams take turns raiding: the raider walks up to the midline, runs to one
+    of DEPTH_CLASSES on the other half, holds and returns home, while the
+    defenders shift towards them. `extras` people stand outside the play box.
+    Every frame carries its frame number as a binary stamp, which
+    StubPoseTracker reads to return that frame's ground truth.
+    """
+    
+    def __init__(self, width=1920, height=1080, fps=30.0, raids=6, players_per_team=7, extras=2, seed=0):
+        self.width = width
+        self.height = height
+        self.fps = float(fps)
+        self.num_raids = raids
+        self.players_per_team = players_per_team
+        self.extras = extras
+        self.seed = seed
+        
+        self._layout()
+        self._place_players()
+        self._script_raids()
+    
+    def settings(self):
+        return {'width': self.width, 'height': self.height, 'fps': self.fps, 'raids': self.num_raids,
+                'players_per_team': self.players_per_team, 'extras': self.extras, 'seed': self.seed}
+    
+    @classmethod
+    def load(cls, path):
+        """Rebuild the match of a ground truth file"""
+        with open(path) as f:
+            return cls(**json.load(f)['settings'])
+    
+    # ----- geometry -----
+    
+    def _layout(self):
+        # The court spans 80% of the width; the view is squashed vertically like a raised camera
+        self.scale = 0.8 * self.width / (2 * HALF_LENGTH)
+        self.tilt = min(0.55, 0.6 * self.height / (COURT_WIDTH * self.scale))
+        self.body_height = 1.4 * self.scale
+        court_height = COURT_WIDTH * self.scale * self.tilt
+        self.origin = (self.width / 2, max(self.body_height + 4, (self.height - court_height) / 2))
+        self.stamp_block = max(6, self.height // 120)
+    
+    def to_pixels(self, u, v):
+        """Image coordinates of court points (arrays of meters)"""
+        return (self.origin[0] + np.asarray(u) * self.scale,
+                self.origin[1] + np.asarray(v) * self.scale * self.tilt)
+    
+    def _line(self, u0, v0, u1, v1):
+        x, y = self.to_pixels([u0, u1], [v0, v1])
+        return [[int(round(x[0])), int(round(y[0]))], [int(round(x[1])), int(round(y[1]))]]
+    
+    def court_config(self):
+        """play_area.json entry of this court; the play box includes a margin around the lines"""
+        margin = 0.5
+        top = -self.body_height / (self.scale * self.tilt)  # heads at the far sideline stay inside
+        box = [self._line(-HALF_LENGTH - margin, COURT_WIDTH + margin, -HALF_LENGTH - margin, top),
+               self._line(HALF_LENGTH + margin, top, HALF_LENGTH + margin, COURT_WIDTH + margin)]
+        return {
+            'play_box': [box[0][0], box[0][1], box[1][0], box[1][1]],
+            'midline': self._line(0, COURT_WIDTH, 0, 0),
+            'baulk_line': self._line(BAULK_DEPTH, 0, BAULK_DEPTH, COURT_WIDTH),
+            'bonus_line': self._line(BONUS_DEPTH, COURT_WIDTH, BONUS_DEPTH, 0),
+            'end_line': self._line(HALF_LENGTH, 0, HALF_LENGTH, COURT_WIDTH)
+        }
+    
+    # ----- script -----
+    
+    def _place_players(self):
+        """Home positions: each team in an arc on its half, extras beyond the end lines"""
+        n = self.players_per_team
+        ids, homes, teams = [], [], []
+        for team in (0, 1):
+            side = -1 if team == 0 else 1
+            for k in range(n):
+                spread = abs(2 * (k + 0.5) / n - 1)
+                ids.append(team * n + k + 1)
+                homes.append((side * (3.0 + 1.5 * spread), 2.0 + 6.5 * (k + 0.5) / n))
+                teams.append(team)
+        for k in range(self.extras):
+            side = -1 if k % 2 == 0 else 1
+            ids.append(100 + k + 1)
+            homes.append((side * (HALF_LENGTH + 1.1), 2.0 + 6.5 * ((k // 2) + 0.5) / max(1, (self.extras + 1) // 2)))
+            teams.append(-1)
+        
+        self.ids = np.array(ids, np.int32)
+        self.homes = np.array(homes, np.float64)
+        self.teams = np.array(teams)
+        self.index = {pid: i for i, pid in enumerate(ids)}
+        rng = np.random.default_rng(self.seed + 1)
+        self.phases = rng.uniform(0, 2 * math.pi, (len(ids), 2))
+    
+    def _script_raids(self):
+        """Waypoints (time, u, v) of every raid and the expected outcome"""
+        rng = np.random.default_rng(self.seed)
+        n = self.players_per_team
+        self.raids = []
+        t = 3.0  # baselines are established before the first raid
+        for r in range(self.num_raids):
+            team = r % 2
+            side = -1 if team == 0 else 1
+            raider = team * n + (r // 2) % n + 1
+            home_u, home_v = self.homes[self.index[raider]]
+            depth = float(rng.choice(DEPTH_CLASSES) + rng.uniform(-0.15, 0.15))
+            target_v = float(rng.uniform(2.5, 7.5))
+            
+            points = [(home_u, home_v), (side * 0.6, home_v), (-side * depth, target_v),
+                      (-side * depth, target_v), (side * 0.6, home_v), (home_u, home_v)]
+            speeds = (WALK_SPEED, RUN_SPEED, None, RUN_SPEED, WALK_SPEED)
+            times = [t]
+            for (a, b), speed in zip(zip(points, points[1:]), speeds):
+                step = HOLD_SECONDS if speed is None else math.hypot(b[0] - a[0], b[1] - a[1]) / speed
+                times.append(times[-1] + step)
+            
+            raid = {'raider_id': raider, 'team': team, 'depth': depth,
+                    'times': times, 'points': [list(p) for p in points]}
+            raid.update(self._expected(raid, side))
+            self.raids.append(raid)
+            t = times[-1] + float(rng.uniform(3.0, 5.0))
+        # Raids never overlap, so the one active at a time is found by its start
+        self._raid_starts = [raid['times'][0] for raid in self.raids]
+        self.num_frames = int(math.ceil(t * self.fps))
+    
+    def _expected(self, raid, side):
+        """Frames at which the raider is across the midline, and the lines they pass"""
+        first = int(math.floor(raid['times'][0] * self.fps)) + 1
+        last = int(math.ceil(raid['times'][-1] * self.fps)) + 1
+        across = [f for f in range(first, last + 1) if self._raider_u(raid, f) * side < 0]
+        return {'start_frame': across[0], 'end_frame': across[-1] + 1,
+                'crossed_baulk': raid['depth'] >= BAULK_DEPTH, 'crossed_bonus': raid['depth'] >= BONUS_DEPTH}
+    
+    def _raider_u(self, raid, frame_count):
+        return float(np.interp(self.time(frame_count), raid['times'], [p[0] for p in raid['points']]))
+    
+    def time(self, frame_count):
+        """Seconds into the match of a frame (frame numbers start at 1)"""
+        return (frame_count - 1) / self.fps
+    
+    def positions(self, t):
+        """(P, 2) court positions of every person at time t, and a (P,) bool of who is running"""
+        sway = np.stack([0.12 * np.sin(2 * math.pi * t / 3.1 + self.phases[:, 0]),
+                         0.15 * np.sin(2 * math.pi * t / 4.3 + self.phases[:, 1])], axis=1)
+        positions = self.homes + sway
+        running = np.zeros(len(self.ids), bool)
+        
+        r = bisect.bisect_right(self._raid_starts, t) - 1
+        if r >= 0 and t <= self.raids[r]['times'][-1]:
+            raid = self.raids[r]
+            times = raid['times']
+            i = self.index[raid['raider_id']]
+            points = np.array(raid['points'])
+            u, v = np.interp(t, times, points[:, 0]), np.interp(t, times, points[:, 1])
+            positions[i] = (u, v)
+            running[i] = not (times[2] <= t <= times[3])
+            
+            # Defenders shift towards a raider on their half
+            defenders = self.teams == 1 - raid['team']
+            defend_side = -1 if raid['team'] == 1 else 1
+            engage = min(1.0, max(0.0, u * defend_side / 2.0))
+            positions[defenders, 1] += 0.3 * engage * (v - positions[defenders, 1])
+            pulled = positions[defenders, 0] - 0.4 * engage * defend_side
+            positions[defenders, 0] = defend_side * np.maximum(0.8, pulled * defend_side)
+        return positions, running
+    
+    # ----- detections and rendering -----
+    
+    def figures(self, positions, swing):
+        """(P, 4) boxes and (P, 17, 2) keypoints in pixels of people at court positions, legs swung by swing (-1..1)"""
+        feet_x, feet_y = self.to_pixels(positions[:, 0], positions[:, 1])
+        h = self.body_height
+        dx = FIGURE[None, :, 0] + swing[:, None] * STRIDE[None, :]
+        keypoints = np.stack([feet_x[:, None] + dx * h, feet_y[:, None] + FIGURE[None, :, 1] * h], axis=2)
+        
+        pad = 0.04 * h
+        boxes = np.stack([keypoints[..., 0].min(axis=1) - pad, keypoints[..., 1].min(axis=1) - 0.05 * h,
+                          keypoints[..., 0].max(axis=1) + pad, feet_y], axis=1)
+        return boxes, keypoints
+    
+    def people(self, frame_count):
+        """Ground truth of a frame: ids, (P, 4) boxes, (P,) confidences and (P, 17, 2) keypoints in pixels"""
+        t = self.time(frame_count)
+        positions, running = self.positions(t)
+        swing = np.where(running, np.sin(2 * math.pi * 1.8 * t + self.phases[:, 0]), 0.0)
+        boxes, keypoints = self.figures(positions, swing)
+        conf = np.where(self.teams >= 0, 0.85, 0.5)
+        return self.ids.copy(), boxes.astype(np.float32), conf.astype(np.float32), keypoints.astype(np.float32)
+    
+    def _background(self):
+        image = np.zeros((self.height, self.width, 3), np.uint8)
+        image[:] = LOBBY_COLOR
+        config = self.court_config()
+        corners = np.array(self._line(-HALF_LENGTH, 0, HALF_LENGTH, 0) +
+                           self._line(HALF_LENGTH, COURT_WIDTH, -HALF_LENGTH, COURT_WIDTH), np.int32)
+        cv2.fillPoly(image, [corners], MAT_COLOR)
+        thickness = max(2, self.width // 640)
+        cv2.polylines(image, [corners], True, (255, 255, 255), thickness)
+        lines = [config['midline'], config['baulk_line'], config['bonus_line'],
+                 self._line(-BAULK_DEPTH, 0, -BAULK_DEPTH, COURT_WIDTH),
+                 self._line(-BONUS_DEPTH, 0, -BONUS_DEPTH, COURT_WIDTH)]
+        for (x1, y1), (x2, y2) in lines:
+            cv2.line(image, (x1, y1), (x2, y2), (255, 255, 255), thickness)
+        return image
+    
+    def render_frame(self, frame_count, background=None):
+        """BGR image of one frame"""
+        image = (self._background() if background is None else background).copy()
+        ids, boxes, conf, keypoints = self.people(frame_count)
+        thickness = max(2, int(self.body_height / 30))
+        
+        # Far people first, so nearer ones are drawn over them
+        for i in np.argsort(boxes[:, 3], kind='stable'):
+            color = TEAM_COLORS[self.teams[i]] if self.teams[i] >= 0 else EXTRA_COLOR
+            points = np.round(keypoints[i]).astype(np.int32)
+            for a, b in SKELETON:
+                cv2.line(image, tuple(points[a].tolist()), tuple(points[b].tolist()), color, thickness)
+            neck = tuple(((points[5] + points[6]) // 2).tolist())
+            cv2.line(image, tuple(points[0].tolist()), neck, color, thickness)
+            cv2.circle(image, tuple(points[0].tolist()), max(3, int(0.06 * self.body_height)), color, -1)
+        
+        self.stamp(image, frame_count)
+        return image
+    
+    def stamp(self, image, frame_count):
+        b = self.stamp_block
+        for bit in range(STAMP_BITS):
+            value = 255 if (frame_count >> bit) & 1 else 0
+            image[-b:, bit * b:(bit + 1) * b] = value
+    
+    def read_stamp(self, image):
+        """Frame number stamped into a (possibly compressed) frame of this match"""
+        b = self.stamp_block
+        inner = slice(b // 4, b - b // 4)
+        frame_count = 0
+        for bit in range(STAMP_BITS):
+            block = image[-b:, bit * b:(bit + 1) * b][inner, inner]
+            if block.mean() > 127:
+                frame_count |= 1 << bit
+        return frame_count
+    
+    def render(self, video_path, progress=True):
+        """Write the match video and its ground truth file; returns the ground truth path"""
+        os.makedirs(os.path.dirname(video_path) or '.', exist_ok=True)
+        writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (self.width, self.height))
+        if not writer.isOpened():
+            raise RuntimeError(f"Cannot write video: {video_path}")
+        background = self._background()
+        try:
+            for frame_count in range(1, self.num_frames + 1):
+                writer.write(self.render_frame(frame_count, background))
+                if progress and frame_count % (10 * int(self.fps)) == 0:
+                    print(f"  rendered {frame_count}/{self.num_frames} frames")
+        finally:
+            writer.release()
+        
+        path = truth_path(video_path)
+        with open(path, 'w') as f:
+            json.dump(self.ground_truth(), f, indent=2)
+        return path
+    
+    def ground_truth(self):
+        raids = [{k: raid[k] for k in ('raider_id', 'start_frame', 'end_frame', 'crossed_baulk', 'crossed_bonus', 'depth')}
+                 for raid in self.raids]
+        return {'settings': self.settings(), 'frames': self.num_frames, 'court': self.court_config(), 'raids': raids}
+    
+    def compare(self, detected, tolerance_seconds=1.0):
+        """
+        Match detected raid metrics to the script by raider id and start frame.
+        
+        Returns (pairs, spurious): one (expected, detected or None) pair per
+        scripted raid, and the detected raids that match none.
+        """
+        tolerance = tolerance_seconds * self.fps
+        unmatched = list(detected)
+        pairs = []
+        for raid in self.raids:
+            found = next((r for r in unmatched if r['raider_id'] == raid['raider_id']
+                          and abs(r['start_frame'] - raid['start_frame']) <= tolerance), None)
+            if found is not None:
+                unmatched.remove(found)
+            pairs.append((raid, found))
+        return pairs, unmatched
@@ -0,0 +1,95 @@
+"""
+Stub Pose Tracker
+Stand-in for the pose model on synthetic matches: returns each frame's ground truth as tracking output
+"""
+
+import numpy as np
+
+from extraction.inference import PoseTracker
+
+
+class _Array:
+    """NumPy array behind the tensor calls FrameDetections.from_results makes"""
+    
+    __slots__ = ('data',)
+    
+    def __init__(self, data):
+        self.data = data
+    
+    def cpu(self):
+        return self
+    
+    def numpy(self):
+        return self.data
+
+
+class _Boxes:
+    def __init__(self, ids, boxes, conf):
+        self.id = _Array(ids) if len(ids) else None
+        self.xyxy = _Array(boxes)
+        self.conf = _Array(conf)
+    
+    def __len__(self):
+        return len(self.xyxy.data)
+
+
+class _Keypoints:
+    def __init__(self, keypoints):
+        self.xy = _Array(keypoints)
+
+
+class _Result:
+    def __init__(self, ids, boxes, conf, keypoints):
+        self.boxes = _Boxes(ids, boxes, conf)
+        self.keypoints = _Keypoints(keypoints)
+
+
+class StubPoseTracker(PoseTracker):
+    """
+    PoseTracker that reads the frame number stamped into a synthetic frame
+    and returns that frame's people with perfect track ids, shaped like
+    model.track output, so everything from FrameDetections.from_results on
+    runs unchanged.
+    
+    The crop and max_det of an inference budget are honoured: people whose
+    box centre is outside the crop are not detected. jitter adds
+    deterministic per-frame noise of that many pixels to boxes and keypoints.
+    """
+    
+    def __init__(self, match, jitter=0.0, crop=None):
+        super().__init__(model_path=f"synthetic-{match.seed}", crop=crop)
+        self.match = match
+        self.jitter = jitter
+    
+    @property
+    def model(self):
+        raise RuntimeError("StubPoseTracker has no model")
+    
+    def cache_settings(self):
+        settings = super().cache_settings()
+        settings.update(stub=self.match.settings(), jitter=self.jitter)
+        return settings
+    
+    def detect(self, frame, budget=None):
+        """Ground truth _Result of one frame"""
+        frame_count = self.match.read_stamp(frame)
+        ids, boxes, conf, keypoints = self.match.people(frame_count)
+        
+        if self.jitter:
+            rng = np.random.default_rng(frame_count)
+            boxes = boxes + rng.normal(0, self.jitter, boxes.shape).astype(np.float32)
+            keypoints = keypoints + rng.normal(0, self.jitter, keypoints.shape).astype(np.float32)
+        
+        keep = np.ones(len(ids), bool)
+        if self.crop is not None:
+            cx, cy = (boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2
+            keep = (cx >= self.crop.x0) & (cx < self.crop.x1) & (cy >= self.crop.y0) & (cy < self.crop.y1)
+        order = np.argsort(-conf[keep], kind='stable')[:self.track_args(budget)['max_det']]
+        select = np.flatnonzero(keep)[order]
+        return _Result(ids[select].astype(np.float32), boxes[select], conf[select], keypoints[select])
+    
+    def track(self, frame, budget=None):
+        return [self.detect(frame, budget)]
+    
+    def track_batch(self, frames, budget=None):
+        return [[self.detect(frame, budget)] for frame in frames]
@@ -0,0 +1,194 @@
+"""
+Synthetic Tracking Stream
+Per-frame tracker output of a scripted match, without video, with id switches, occlusions, jitter and clutter
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+from extraction.detections import NUM_KEYPOINTS, FrameDetections
+from synthetic.match import COURT_WIDTH, HALF_LENGTH
+
+# Crowd stands beyond the end lines, outside the play box
+CROWD_DEPTH = (HALF_LENGTH + 0.8, HALF_LENGTH + 1.5)
+# Ghost detections (reflections, referees' limbs) last this many frames at most
+GHOST_FRAMES = 10
+
+
+class TrackingStream:
+    """
+    FrameDetections of every frame of a SyntheticMatch, shaped like the
+    output of a real tracker on the match, generated on the fly so matches
+    of any length stream in constant memory. Frames must be generated in
+    order (iterate the stream, or call frame() with 1, 2, 3, ...).
+    
+    Tracker failures, all off by default and reproducible from `seed`:
+    - id_switches: new track ids per person per minute
+    - occlusions: missed stretches of gap_frames per person per minute; a
+      person missing longer than track_buffer frames comes back with a new id
+    - raider_switches / raider_gaps: chance per raid that the raider's id
+      switches, or that the raider goes missing, while across the midline
+    - far_jitter: pixel noise on people at the far sideline, falling to zero
+      at the near one; dropout is the chance a far keypoint is undetected
+    - crowd: people standing outside the play box
+    - ghosts: short-lived false detections in the play box per second
+    
+    Detections beyond max_detections are cut by confidence, like max_det.
+    person_of maps every track id handed out to the match person id (ghosts
+    and the crowd are not listed).
+    """
+    
+    def __init__(self, match, id_switches=0.0, occlusions=0.0, gap_frames=(5, 150), track_buffer=30,
+                 raider_switches=0.0, raider_gaps=0.0, far_jitter=0.0, dropout=0.0, crowd=0, ghosts=0.0,
+                 max_detections=50, seed=0):
+        self.match = match
+        self.id_switches = id_switches
+        self.occlusions = occlusions
+        self.gap_frames = gap_frames
+        self.track_buffer = track_buffer
+        self.far_jitter = far_jitter
+        self.dropout = dropout
+        self.ghosts = ghosts
+        self.max_detections = max_detections
+        self.rng = np.random.default_rng(seed)
+        
+        people = len(match.ids)
+        self.track_ids = match.ids.astype(np.int64)
+        self.person_of = {int(pid): int(pid) for pid in match.ids}
+        self.hidden_until = np.zeros(people, np.int64)
+        self._next_id = 1000
+        self._expected_frame = 1
+        
+        # Per-frame chances of the per-minute rates
+        per_minute = 60 * match.fps
+        self._switch_chance = id_switches / per_minute
+        self._occlusion_chance = occlusions / per_minute
+        
+        self._script_raider_failures(raider_switches, raider_gaps)
+        self._place_crowd(crowd)
+        self._ghosts = []  # [track id, last frame, box, conf]
+    
+    def _new_id(self):
+        self._next_id += 1
+        return self._next_id - 1
+    
+    def _script_raider_failures(self, raider_switches, raider_gaps):
+        """Frames of the injected raider failures; injected[r] describes raid r's"""
+        rng = np.random.default_rng(self.rng.integers(1 << 31))
+        self.injected = []
+        self._events = defaultdict(list)
+        for raid in self.match.raids:
+            i = self.match.index[raid['raider_id']]
+            first, last = raid['start_frame'] + 1, raid['end_frame'] - 1
+            failures = {'switch': None, 'gap': None}
+            if rng.random() < raider_switches:
+                frame_count = int(rng.integers(first, last + 1))
+                failures['switch'] = frame_count
+                self._events[frame_count].append(('switch', i, 0))
+            if rng.random() < raider_gaps:
+                frame_count = int(rng.integers(first, last + 1))
+                length = int(rng.integers(self.gap_frames[0], self.gap_frames[1] + 1))
+                failures['gap'] = (frame_count, length)
+                self._events[frame_count].append(('gap', i, length))
+            self.injected.append(failures)
+    
+    def _place_crowd(self, crowd):
+        match = self.match
+        sides = np.where(np.arange(crowd) % 2 == 0, -1.0, 1.0)
+        u = sides * self.rng.uniform(*CROWD_DEPTH, crowd)
+        v = self.rng.uniform(0.0, COURT_WIDTH, crowd)
+        boxes, keypoints = match.figures(np.stack([u, v], axis=1), np.zeros(crowd))
+        self._crowd_ids = np.array([self._new_id() for _ in range(crowd)], np.int64)
+        self._crowd_boxes = boxes
+        self._crowd_keypoints = keypoints
+        self._crowd_conf = self.rng.uniform(0.25, 0.6, crowd)
+    
+    def _hide(self, i, frame_count, length):
+        self.hidden_until[i] = frame_count + length - 1
+        # The tracker has dropped the track by the time the person is seen again
+        if length > self.track_buffer:
+            self._switch(i)
+    
+    def _switch(self, i):
+        track_id = self._new_id()
+        self.track_ids[i] = track_id
+        self.person_of[track_id] = int(self.match.ids[i])
+    
+    def _farness(self, boxes):
+        """1 at the far sideline, 0 at the near one, from the feet of each box"""
+        match = self.match
+        v = (boxes[:, 3] - match.origin[1]) / (match.scale * match.tilt)
+        return np.clip(1.0 - v / COURT_WIDTH, 0.0, 1.0)
+    
+    def _update_ghosts(self, frame_count):
+        rng = self.rng
+        self._ghosts = [g for g in self._ghosts if g[1] >= frame_count]
+        for _ in range(rng.poisson(self.ghosts / self.match.fps)):
+            u, v = rng.uniform(-HALF_LENGTH, HALF_LENGTH), rng.uniform(0.0, COURT_WIDTH)
+            x, y = self.match.to_pixels(u, v)
+            w, h = rng.uniform(0.2, 0.5) * self.match.body_height, rng.uniform(0.3, 1.0) * self.match.body_height
+            self._ghosts.append([self._new_id(), frame_count + int(rng.integers(0, GHOST_FRAMES)),
+                                 (x - w / 2, y - h, x + w / 2, y), rng.uniform(0.3, 0.5)])
+    
+    def frame(self, frame_count):
+        """FrameDetections of the next frame"""
+        if frame_count != self._expected_frame:
+            raise ValueError(f"Frames must be generated in order: expected {self._expected_frame}, got {frame_count}")
+        self._expected_frame += 1
+        rng = self.rng
+        ids, boxes, conf, keypoints = self.match.people(frame_count)
+        people = len(ids)
+        
+        for kind, i, length in self._events.pop(frame_count, ()):
+            if kind == 'switch':
+                self._switch(i)
+            else:
+                self._hide(i, frame_count, length)
+        if self._switch_chance:
+            for i in np.flatnonzero(rng.random(people) < self._switch_chance):
+                self._switch(i)
+        if self._occlusion_chance:
+            starts = (rng.random(people) < self._occlusion_chance) & (self.hidden_until < frame_count)
+            for i in np.flatnonzero(starts):
+                self._hide(i, frame_count, int(rng.integers(self.gap_frames[0], self.gap_frames[1] + 1)))
+        
+        visible = self.hidden_until < frame_count
+        ids, boxes, conf, keypoints = self.track_ids[visible], boxes[visible], conf[visible], keypoints[visible]
+        
+        if self.far_jitter or self.dropout:
+            farness = self._farness(boxes)
+            if self.far_jitter:
+                noise = (self.far_jitter * farness)[:, None]
+                boxes = boxes + rng.normal(0.0, 1.0, boxes.shape) * noise
+                keypoints = keypoints + rng.normal(0.0, 1.0, keypoints.shape) * noise[..., None]
+            if self.dropout:
+                missed = rng.random(keypoints.shape[:2]) < (self.dropout * farness)[:, None]
+                keypoints = np.where(missed[..., None], 0.0, keypoints)
+        
+        parts = [(ids, boxes, conf, keypoints)]
+        if len(self._crowd_ids):
+            parts.append((self._crowd_ids, self._crowd_boxes, self._crowd_conf, self._crowd_keypoints))
+        if self.ghosts:
+            self._update_ghosts(frame_count)
+            if self._ghosts:
+                # Ghosts have no pose: every keypoint is undetected
+                parts.append((np.array([g[0] for g in self._ghosts], np.int64), np.array([g[2] for g in self._ghosts]),
+                              np.array([g[3] for g in self._ghosts]),
+                              np.zeros((len(self._ghosts), NUM_KEYPOINTS, 2))))
+        
+        ids, boxes, conf, keypoints = (np.concatenate(arrays) for arrays in zip(*parts))
+        if len(ids) > self.max_detections:
+            keep = np.argsort(-conf, kind='stable')[:self.max_detections]
+            ids, boxes, conf, keypoints = ids[keep], boxes[keep], conf[keep], keypoints[keep]
+        return FrameDetections(ids.astype(np.int32), boxes.astype(np.float32), conf.astype(np.float32),
+                               keypoints.astype(np.float32))
+    
+    def __iter__(self):
+        """(frame_count, FrameDetections) of the remaining frames"""
+        for frame_count in range(self._expected_frame, self.match.num_frames + 1):
+            yield frame_count, self.frame(frame_count)
+    
+    @property
+    def num_frames(self):
+        return self.match.num_frames
@@ -0,0 +1,20 @@
+"""
+Checkpoint Tests
+A resume must survive a checkpoint file cut short by a kill
+"""
+
+from extraction.checkpoint import ExtractionCheckpoint
+from extraction.tracks import PlayerTrack
+
+
+def test_truncated_checkpoint_loads_as_no_checkpoint(tmp_path):
+    path = tmp_path / "match.npz"
+    track = PlayerTrack(30, 1)
+    track.append(10, 20, 1, [[0, 0]] * 17, 1, 0.9)
+    ExtractionCheckpoint(str(path), "run").save(1, {7: track}, [])
+    path.write_bytes(path.read_bytes()[:40])
+    
+    checkpoint = ExtractionCheckpoint(str(path), "run")
+    
+    assert not checkpoint.load(lambda last_seen: PlayerTrack(30, last_seen))
+    assert checkpoint.frame == 0 and checkpoint.players == {}
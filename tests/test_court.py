@@ -0,0 +1,51 @@
+"""
+Court Raster Tests
+Queries answered from per-pixel maps must match the computed geometry
+"""
+
+import numpy as np
+
+from court.simplified_court import CourtRaster, SimplifiedCourtDynamics
+from synthetic.match import SyntheticMatch
+
+
+def courts():
+    match = SyntheticMatch(640, 360, 30.0, raids=1)
+    computed = SimplifiedCourtDynamics(**match.court_config())
+    rastered = SimplifiedCourtDynamics(**match.court_config())
+    rastered.raster = CourtRaster.build(rastered, (match.height, match.width))
+    return match, computed, rastered
+
+
+def test_point_queries_match_computed_geometry():
+    match, computed, rastered = courts()
+    rng = np.random.default_rng(0)
+    # Integer pixels, fractional points and points outside the frame
+    points = [tuple(p) for p in rng.integers(-20, match.width + 20, (500, 2)).tolist()]
+    points += [tuple(p) for p in rng.uniform(0, match.height, (100, 2)).tolist()]
+    
+    for point in points:
+        assert rastered.is_inside_play_box(point) == computed.is_inside_play_box(point), point
+        assert abs(rastered.get_penetration_depth(point) - computed.get_penetration_depth(point)) < 1e-9, point
+
+
+def test_array_queries_match_computed_geometry():
+    match, computed, rastered = courts()
+    points = np.random.default_rng(1).integers(-20, match.width + 20, (2000, 2))
+    
+    assert np.array_equal(rastered.inside_play_box(points), computed.inside_play_box(points))
+    assert np.allclose(rastered.depths(points), computed.depths(points))
+    assert np.array_equal(rastered.zones(points), computed.zones(points))
+
+
+def test_corrupt_raster_cache_is_rebuilt(tmp_path):
+    match, computed, _ = courts()
+    shape = (match.height, match.width)
+    path = tmp_path / f"court_{match.width}x{match.height}_{computed.config_digest()[:16]}.npz"
+    path.write_bytes(b"PK\x03\x04truncated")
+    
+    raster = CourtRaster.load_or_build(computed, shape, str(tmp_path))
+    
+    assert np.array_equal(raster.inside, CourtRaster.build(computed, shape).inside)
+    assert np.array_equal(CourtRaster.load_or_build(computed, shape, str(tmp_path)).depth, raster.depth)
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
@@ -0,0 +1,16 @@
+"""
+Detection Cache Tests
+A partially written cache must fall back to running inference
+"""
+
+from extraction.detections import DetectionCache, FrameDetections
+
+
+def test_truncated_cache_does_not_load(tmp_path):
+    path = tmp_path / "match.npz"
+    cache = DetectionCache(str(path), "run")
+    cache.record(1, FrameDetections.empty())
+    cache.save(1)
+    path.write_bytes(path.read_bytes()[:40])
+    
+    assert not DetectionCache(str(path), "run").load()
@@ -0,0 +1,62 @@
+"""
+Raid Event Tests
+Streaming raid events from a running extraction
+"""
+
+import json
+import threading
+
+from extraction.events import BAULK_CROSSED, RAID_END, RAID_START, EventLog, RaidEvent
+from scripts.data_extract import DataExtractor
+
+
+def scripted_extractor(events):
+    """A DataExtractor whose extract_data emits the given events instead of running the model"""
+    extractor = DataExtractor.__new__(DataExtractor)
+    extractor.stop_requested = threading.Event()
+    extractor.calls = []
+    
+    def extract_data(on_event=None, **kwargs):
+        extractor.calls.append(kwargs)
+        for event in events:
+            on_event(event)
+        return []
+    extractor.extract_data = extract_data
+    return extractor
+
+
+def test_iter_events_also_calls_the_callers_on_event():
+    events = [RaidEvent(RAID_START, 10, 0.3, 1, 4), RaidEvent(RAID_END, 40, 1.3, 1, 4)]
+    extractor = scripted_extractor(events)
+    seen = []
+    
+    yielded = list(extractor.iter_events(on_event=seen.append, use_cache=True))
+    
+    assert yielded == events
+    assert seen == events
+    assert extractor.calls == [{'display': False, 'use_cache': True}]
+
+
+def test_resumed_event_log_has_no_duplicates(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    first_raid = [RaidEvent(RAID_START, 10, 0.3, 1, 4), RaidEvent(RAID_END, 40, 1.3, 1, 4)]
+    second_raid = [RaidEvent(RAID_START, 90, 3.0, 2, 7), RaidEvent(BAULK_CROSSED, 120, 4.0, 2, 7)]
+    checkpoint_frame = 60
+    
+    # The first run is killed during the second raid, mid-write
+    with EventLog(path) as log:
+        for event in first_raid + second_raid:
+            log.write(event)
+    with open(path, 'a') as f:
+        f.write('{"type": "raid_e')
+    
+    # Resumed from the checkpoint between the raids, the second raid is emitted again
+    with EventLog(path, append=True) as log:
+        log.discard_after(checkpoint_frame)
+        for event in second_raid + [RaidEvent(RAID_END, 150, 5.0, 2, 7)]:
+            log.write(event)
+    
+    with open(path) as f:
+        written = [json.loads(line) for line in f]
+    assert [(e['type'], e['frame']) for e in written] == [
+        (RAID_START, 10), (RAID_END, 40), (RAID_START, 90), (BAULK_CROSSED, 120), (RAID_END, 150)]
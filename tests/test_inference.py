@@ -0,0 +1,102 @@
+"""
+Pose Inference Tests
+Batched tracking must produce the same tracks as model.track
+"""
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from court.simplified_court import SimplifiedCourtDynamics
+from extraction.detections import FrameDetections
+from extraction.inference import PoseTracker
+from extraction.raid_state import RaidStateMachine
+from synthetic.match import SyntheticMatch
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("ultralytics")
+
+# Frames the model sees nobody on, and an extra who is gone around them
+# for longer than the tracker keeps lost tracks only if the gap counts
+EMPTY_FRAMES = range(60, 70)
+EXTRA_ID, EXTRA_MISSING = 101, range(50, 85)
+
+
+class GroundTruthModel:
+    """
+    Stands in for YOLO on a synthetic match: predict returns each frame's
+    people as untracked ultralytics Results, and track runs ultralytics' own
+    tracking callbacks around predict, as YOLO.track does.
+    """
+    
+    def __init__(self, match):
+        self.match = match
+        self.predictor = None
+    
+    def _result(self, image):
+        from ultralytics.engine.results import Results
+        
+        frame_count = self.match.read_stamp(image)
+        ids, boxes, conf, keypoints = self.match.people(frame_count)
+        keep = np.ones(len(ids), bool) if frame_count not in EMPTY_FRAMES else np.zeros(len(ids), bool)
+        if frame_count in EXTRA_MISSING:
+            keep &= ids != EXTRA_ID
+        
+        data = np.concatenate([boxes, conf[:, None], np.zeros((len(ids), 1), np.float32)], axis=1)[keep]
+        kpts = np.concatenate([keypoints, np.ones(keypoints.shape[:2] + (1,), np.float32)], axis=2)[keep]
+        return Results(image, path="synthetic.mp4", names={0: 'person'},
+                       boxes=torch.as_tensor(data), keypoints=torch.as_tensor(kpts))
+    
+    def predict(self, images, **kwargs):
+        return [self._result(image) for image in images]
+    
+    def track(self, image, persist=True, tracker=PoseTracker.TRACKER, **kwargs):
+        from ultralytics.trackers.track import on_predict_postprocess_end, on_predict_start
+        
+        if self.predictor is None:
+            self.predictor = SimpleNamespace(args=SimpleNamespace(task='pose', tracker=tracker),
+                                             dataset=SimpleNamespace(bs=1, mode='image'), save_dir=Path('.'))
+            on_predict_start(self.predictor, persist=persist)
+        self.predictor.results = self.predict([image])
+        on_predict_postprocess_end(self.predictor, persist=persist)
+        return self.predictor.results
+
+
+def run(match, batch_size):
+    """Per-frame detections and raids of the match, tracked one frame at a time or in batches"""
+    tracker = PoseTracker("synthetic")
+    tracker._model = GroundTruthModel(match)
+    state = RaidStateMachine(SimplifiedCourtDynamics(**match.court_config()), match.fps, verbose=False)
+    background = match._background()
+    
+    detections = []
+    for first in range(1, match.num_frames + 1, batch_size):
+        frames = [match.render_frame(f, background) for f in range(first, min(first + batch_size, match.num_frames + 1))]
+        if batch_size == 1:
+            outputs = [tracker.track(frames[0])]
+        else:
+            outputs = tracker.track_batch(frames)
+        for results in outputs:
+            detections.append(FrameDetections.from_results(results))
+            state.update(len(detections), detections[-1])
+    state.finish(match.num_frames)
+    return detections, state.raids
+
+
+def test_batched_tracking_matches_model_track_across_empty_frames():
+    match = SyntheticMatch(1280, 720, 30.0, raids=1)
+    
+    tracked, tracked_raids = run(match, batch_size=1)
+    batched, batched_raids = run(match, batch_size=4)
+    
+    assert len(tracked) == len(batched) == match.num_frames
+    for frame_count, (a, b) in enumerate(zip(tracked, batched), start=1):
+        assert np.array_equal(a.ids, b.ids), frame_count
+        assert np.allclose(a.boxes, b.boxes), frame_count
+    assert all(len(tracked[f - 1]) == 0 for f in EMPTY_FRAMES)
+    
+    assert tracked_raids
+    assert [(r['raider_id'], r['start_frame'], r['end_frame']) for r in batched_raids] == \
+        [(r['raider_id'], r['start_frame'], r['end_frame']) for r in tracked_raids]
@@ -0,0 +1,82 @@
+"""
+Raid State Machine Tests
+Track eviction must bound live tracks without forgetting established baselines
+"""
+
+from court.simplified_court import SimplifiedCourtDynamics
+from extraction.detections import FrameDetections
+from extraction.raid_state import RaidParams, RaidStateMachine
+from synthetic.match import SyntheticMatch
+from synthetic.tracking_stream import TrackingStream
+
+
+def test_established_baselines_survive_a_burst_of_new_tracks():
+    match = SyntheticMatch(1280, 720, 30.0, raids=1)
+    params = RaidParams()
+    state = RaidStateMachine(SimplifiedCourtDynamics(**match.court_config()), match.fps, params, verbose=False)
+    stream = TrackingStream(match)
+    
+    frame_count = 1
+    while frame_count <= 2 * params.baseline_frames:
+        state.update(frame_count, stream.frame(frame_count))
+        frame_count += 1
+    baselines = {tid: track.baseline_side for tid, track in state.players.items() if track.baseline_side is not None}
+    assert len(baselines) >= 10
+    
+    # Every player is re-tracked under a new id on each of a few frames
+    # (an id-switch storm), so the baseline tracks become the least recent
+    for burst in range(1, 10):
+        detections = stream.frame(frame_count)
+        state.update(frame_count, FrameDetections(detections.ids + 1000 * burst, detections.boxes,
+                                                  detections.conf, detections.keypoints))
+        frame_count += 1
+    
+    assert state.evicted_tracks > 0
+    for tid, side in baselines.items():
+        assert tid in state.players, tid
+        assert state.players[tid].baseline_side == side
+    assert len(state.players) <= params.max_tracks
+
+
+def test_live_tracks_stay_capped_through_id_switches():
+    match = SyntheticMatch(1280, 720, 30.0, raids=4)
+    params = RaidParams(max_tracks=24)
+    state = RaidStateMachine(SimplifiedCourtDynamics(**match.court_config()), match.fps, params, verbose=False)
+    # Every person gets a new id every few seconds, so most tracks establish a
+    # baseline before they are abandoned, and abandoned tracks live on for
+    # lost_player_frames
+    stream = TrackingStream(match, id_switches=20.0, seed=3)
+    
+    for frame_count in range(1, match.num_frames + 1):
+        state.update(frame_count, stream.frame(frame_count))
+        assert len(state.players) <= params.max_tracks + len(state.protected_tracks()), frame_count
+    state.finish(match.num_frames)
+    
+    assert state.evicted_tracks > 0
+    assert state.raids
+
+
+def test_defenders_stay_protected_while_the_raider_is_missing():
+    match = SyntheticMatch(1280, 720, 30.0, raids=1)
+    state = RaidStateMachine(SimplifiedCourtDynamics(**match.court_config()), match.fps, verbose=False)
+    stream = TrackingStream(match)
+    
+    frame_count = 1
+    while not state.raid_active:
+        state.update(frame_count, stream.frame(frame_count))
+        frame_count += 1
+    raider_id = state.raider_id
+    raider_side = state.players[raider_id].baseline_side
+    defenders = {tid for tid, track in state.players.items() if track.baseline_side == -raider_side}
+    assert defenders and defenders <= state.protected_tracks()
+    
+    # The raider's track times out while the raid is still active
+    state.players.pop(raider_id)
+    state.expiry.discard(raider_id)
+    detections = stream.frame(frame_count)
+    keep = detections.ids != raider_id
+    state.update(frame_count, FrameDetections(detections.ids[keep], detections.boxes[keep],
+                                              detections.conf[keep], detections.keypoints[keep]))
+    
+    assert state.raid_active and state.raider_id not in state.players
+    assert defenders <= state.protected_tracks()